@@ -22,6 +22,89 @@ class AppConfig:
     APP_SETTINGS_FILE = DATA_DIR / "app_settings.json"
     REPORTS_INDEX = REPORTS_DIR / "_reports_index.json"
 
+    # Журнал изменений пользователей
+    USERS_JOURNAL_COMPACT_THRESHOLD = 1000  # записей до свертки в снимок
+    USERS_JOURNAL_FSYNC = True
+
+    # Хранилище: "sqlite" (по умолчанию) или "json" (users.json, login_log.csv)
+    STORAGE_BACKEND = "sqlite"
+    SQLITE_DB_NAME = "app.db"
+
+    # Неудачные входы, которые держатся в памяти для проверок блокировки
+    FAILURE_CACHE_SIZE = 1000
+
+    # Окно подсчета неудачных входов для блокировки, сек
+    # (MAX_LOGIN_ATTEMPTS попыток за окно -> блокировка на LOCKOUT_TIME)
+    LOGIN_ATTEMPT_WINDOW = 3600
+
+    # Журнал входов: фоновая запись и ротация
+    LOG_ASYNC = True
+    LOG_QUEUE_SIZE = 10000
+    LOG_BATCH_SIZE = 500
+    LOG_FSYNC_INTERVAL = 1.0  # секунд
+    LOG_ROTATE_BYTES = 10 * 1024 * 1024
+    LOG_ROTATE_SECONDS = 30 * 24 * 3600
+    LOG_ROTATE_KEEP = 12
+    LOG_ROTATE_GZIP = True
+
+    # Пул потоков хеширования паролей (None - по числу ядер)
+    HASH_WORKERS = None
+    LOGIN_POLL_INTERVAL = 50  # мс между проверками результата входа
+
+    # Хеширование паролей: алгоритм по умолчанию и цель калибровки
+    # (python -m core.hashing --target-ms 250)
+    HASH_ALGORITHM = "pbkdf2-sha256"
+    HASH_TARGET_MS = 250
+
+    # Сессии: "memory", "sqlite" или "file"
+    SESSION_BACKEND = "sqlite"
+    SESSION_MAX_AGE = 24 * 3600  # абсолютный тайм-аут, сек
+    SESSION_IDLE_TIMEOUT = 2 * 3600  # тайм-аут простоя, сек (0 - отключен)
+    SESSION_TOUCH_INTERVAL = 60  # как часто сохранять активность, сек
+
+    # Документы
+    DOCS_WHEEL_ROWS = 3  # строк на щелчок колесика в списке документов
+    SEARCH_INDEX_DB = "search_index.db"
+    ANALYZE_CHUNK_SIZE = 1024 * 1024  # символов на кусок при потоковом анализе
+    LOAD_CHUNK_SIZE = 256 * 1024  # символов на шаг постепенной загрузки в редактор
+    PIECE_SIZE = 4 * 1024  # символов в куске дерева текста документа (PieceTable)
+    VIEWER_THRESHOLD = 64 * 1024 * 1024  # с какого размера предлагать режим просмотра, байт
+    VIEWER_BLOCK_SIZE = 64 * 1024  # байт на блок индекса строк в режиме просмотра
+    SEARCH_AUTOMATON_TERMS = 64  # терминов, с которых поиск идет автоматом Ахо-Корасик
+    SEARCH_SLICE = 1024 * 1024  # символов на часть фонового поиска (результаты выдаются по частям)
+    FIND_DELAY = 150  # мс после нажатия клавиши до поиска в строке поиска
+    HIGHLIGHT_BATCH = 2000  # диапазонов подсветки в одном вызове tag_add
+    REPLACE_PREVIEW_LIMIT = 500  # совпадений в предпросмотре замены
+    REPLACE_STREAM_OVERLAP = 4096  # символов: самое длинное совпадение при замене в файлах
+    REPLACE_WIDGET_EDIT_LIMIT = 5000  # замен в редакторе, больше - одной правкой всего диапазона
+
+    # Резервные копии: фрагменты с дедупликацией и сжатием (backups/backups.db)
+    BACKUP_DB = "backups.db"
+    BACKUP_CHUNK_MIN = 16 * 1024  # байт, границы фрагментов выбираются по тексту
+    BACKUP_CHUNK_MAX = 256 * 1024
+    BACKUP_COMPRESS_LEVEL = 1  # выше - заметно медленнее при небольшом выигрыше
+    # Хранение версий по группам ключей: последние keep версий, не старше days дней
+    BACKUP_RETENTION = {
+        "documents": {"keep": 20, "days": 90},
+        "users": {"keep": 30, "days": None},
+    }
+
+    # История версий документов (разницы между сохранениями + периодические снимки)
+    HISTORY_KEYFRAME_INTERVAL = 20  # версий между полными снимками
+    HISTORY_MAX_VERSIONS = 500  # версий на документ
+    HISTORY_MAX_SIZE = 32 * 1024 * 1024  # документы крупнее в историю не пишутся, байт
+    HISTORY_DIFF_LIMIT = 20000  # строк в измененной части, больше - полный снимок
+
+    # История правок (отмена/повтор) редактора
+    UNDO_MEMORY_LIMIT = 32 * 1024 * 1024  # байт в памяти, старые шаги выгружаются или забываются
+    UNDO_SPILL_LIMIT = 256 * 1024 * 1024  # байт старых шагов во временном файле (0 - не выгружать)
+    UNDO_GROUP_DELAY = 1.0  # сек паузы в наборе, после которой начинается новый шаг отмены
+    UNDO_COMPRESS_THRESHOLD = 4096  # символов, с которых текст правки хранится сжатым
+
+    # Автосохранение (в фоновом потоке)
+    AUTOSAVE_INTERVAL = 30  # сек между проверками несохраненных изменений
+    AUTOSAVE_DOCUMENT = False  # писать изменения в файл документа (иначе - только копия для восстановления)
+
     @classmethod
     def init_directories(cls):
         """Создание всех необходимых директорий"""
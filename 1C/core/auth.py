@@ -1,52 +1,77 @@
 """
 Модуль аутентификации и управления пользователями
 """
+import getpass
 import json
-import hashlib
 import secrets
-import csv
 import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from config import AppPaths, AppConfig
+from core import hashing
+from core.backups import BackupStore
+from core.sessions import SessionStore, open_session_backend
+from core.storage import open_user_store, open_login_log
 
 
 class PasswordHasher:
-    """Класс для безопасного хеширования паролей"""
+    """Класс для безопасного хеширования паролей
+
+    PBKDF2 из hashlib отпускает GIL, поэтому пул потоков позволяет
+    проверять пароли вне потока Tk и хешировать пачки паролей
+    параллельно на всех ядрах.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        """Общий пул потоков хеширования (создается при первом обращении)"""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=AppConfig.HASH_WORKERS or os.cpu_count() or 1,
+                    thread_name_prefix="password-hash"
+                )
+            return cls._executor
+
+    @classmethod
+    def hash_password_async(cls, password: str) -> Future:
+        """Хеширование пароля в пуле потоков"""
+        return cls.executor().submit(cls.hash_password, password)
+
+    @classmethod
+    def verify_password_async(cls, hashed_password: str, provided_password: str) -> Future:
+        """Проверка пароля в пуле потоков"""
+        return cls.executor().submit(cls.verify_password, hashed_password, provided_password)
+
+    @classmethod
+    def hash_many(cls, passwords: List[str]) -> List[str]:
+        """Параллельное хеширование списка паролей"""
+        return list(cls.executor().map(cls.hash_password, passwords))
 
     @staticmethod
     def hash_password(password: str) -> str:
-        """Хеширование пароля с уникальной солью"""
-        # Генерация уникальной соли для каждого пользователя
-        salt = secrets.token_bytes(32).hex()
-        # Используем PBKDF2 для замедления атак
-        iterations = 100000
-        dk = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            iterations
-        )
-        # Сохраняем соль и хеш
-        return f"{salt}${iterations}${dk.hex()}"
+        """Хеширование пароля с уникальной солью (алгоритм и стоимость
+        задаются политикой установки, см. core.hashing)"""
+        return hashing.hash_password(password)
 
     @staticmethod
     def verify_password(hashed_password: str, provided_password: str) -> bool:
         """Проверка пароля"""
-        try:
-            salt, iterations, stored_hash = hashed_password.split('$')
-            iterations = int(iterations)
-            dk = hashlib.pbkdf2_hmac(
-                'sha256',
-                provided_password.encode('utf-8'),
-                salt.encode('utf-8'),
-                iterations
-            )
-            return dk.hex() == stored_hash
-        except:
-            return False
+        return hashing.verify_password(hashed_password, provided_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """Нужно ли пересчитать хеш по текущей политике"""
+        return hashing.needs_rehash(hashed_password)
 
     @staticmethod
     def validate_password_complexity(password: str) -> Tuple[bool, str]:
@@ -72,14 +97,26 @@ class UserManager:
 
     def __init__(self):
         self.users_file = AppPaths.USERS_FILE
+        self.backups = BackupStore()
+        self.store = open_user_store(on_compact=self._create_backup)
         self.users = self.load_users()
         self.hasher = PasswordHasher()
 
-    def load_users(self) -> Dict:
-        """Загрузка пользователей из файла"""
-        default_users = {
+    def load_users(self):
+        """Загрузка пользователей; начальные учетные записи создаются
+        только для пустого хранилища"""
+        if not len(self.store):
+            self.save_users(self._default_users())
+
+        return self.store
+
+    @staticmethod
+    def _default_users() -> Dict:
+        """Учетные записи по умолчанию (хеши считаются только при заполнении)"""
+        admin_hash, editor_hash = PasswordHasher.hash_many(["User123!", "Anna2024!"])
+        return {
             "Иван_Петров": {
-                "password": PasswordHasher().hash_password("User123!"),
+                "password": admin_hash,
                 "role": "admin",
                 "full_name": "Иван Петров",
                 "email": "ivan.petrov@company.com",
@@ -89,7 +126,7 @@ class UserManager:
                 "avatar_color": "#3498db"
             },
             "Анна_Сидорова": {
-                "password": PasswordHasher().hash_password("Anna2024!"),
+                "password": editor_hash,
                 "role": "editor",
                 "full_name": "Анна Сидорова",
                 "email": "anna.sidorova@company.com",
@@ -100,65 +137,81 @@ class UserManager:
             }
         }
 
-        if self.users_file.exists():
-            try:
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    users = json.load(f)
-                return users
-            except Exception as e:
-                print(f"Ошибка загрузки пользователей: {e}")
-                return default_users
-        else:
-            self.save_users(default_users)
-            return default_users
-
     def save_users(self, users: Optional[Dict] = None):
-        """Сохранение пользователей в файл"""
-        if users is None:
-            users = self.users
-
-        # Создаем резервную копию
-        self._create_backup()
-
+        """Полное сохранение пользователей (свертка журнала в снимок)"""
         try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(users, f, indent=4, ensure_ascii=False)
+            if len(self.store):
+                self._create_backup()
+            if users is None:
+                self.store.compact()
+            else:
+                self.store.replace_all(users)
         except Exception as e:
             print(f"Ошибка сохранения пользователей: {e}")
             raise
 
     def _create_backup(self):
-        """Создание резервной копии файла пользователей"""
-        if self.users_file.exists():
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = AppPaths.BACKUPS_DIR / f"users_backup_{timestamp}.json"
-            import shutil
-            shutil.copy2(self.users_file, backup_file)
+        """Резервная копия учетных записей (без изменений - новой версии нет)"""
+        try:
+            users = {name: self.store[name] for name in self.store}
+            data = json.dumps(users, indent=4, ensure_ascii=False, sort_keys=True)
+            self.backups.backup_bytes("users", data.encode('utf-8'))
+        except Exception as e:
+            print(f"Ошибка создания резервной копии пользователей: {e}")
 
     def add_user(self, username: str, password: str, **kwargs) -> Tuple[bool, str]:
-        """Добавление нового пользователя"""
-        if username in self.users:
-            return False, "Пользователь с таким именем уже существует"
-
-        # Валидация пароля
-        is_valid, message = self.hasher.validate_password_complexity(password)
-        if not is_valid:
-            return False, message
-
-        # Создание пользователя
-        self.users[username] = {
-            "password": self.hasher.hash_password(password),
-            "role": kwargs.get("role", "user"),
-            "full_name": kwargs.get("full_name", username),
-            "email": kwargs.get("email", ""),
-            "department": kwargs.get("department", ""),
-            "created": datetime.now().isoformat(),
-            "last_login": "",
-            "avatar_color": self._generate_avatar_color(username)
-        }
+        """Добавление нового пользователя
+
+        Пароль хешируется в пуле потоков (add_users); при создании
+        нескольких пользователей сразу их стоит передать в add_users
+        одним списком - тогда пароли хешируются параллельно.
+        """
+        return self.add_users([(username, password, kwargs)])[0]
+
+    def add_users(self, users: List[Tuple[str, str, Dict]]) -> List[Tuple[bool, str]]:
+        """Массовое добавление пользователей
+
+        users - список (username, password, kwargs). Пароли хешируются
+        параллельно в пуле потоков PasswordHasher, записи сохраняются
+        одной пачкой. Результаты - в порядке users.
+        """
+        results: List[Tuple[bool, str]] = []
+        accepted = []
+        seen = set()
+
+        for username, password, _ in users:
+            if username in self.users or username in seen:
+                results.append((False, "Пользователь с таким именем уже существует"))
+                continue
+
+            is_valid, message = self.hasher.validate_password_complexity(password)
+            if not is_valid:
+                results.append((False, message))
+                continue
+
+            seen.add(username)
+            accepted.append(len(results))
+            results.append((True, "Пользователь успешно создан"))
+
+        hashes = self.hasher.hash_many([users[i][1] for i in accepted])
+
+        records = {}
+        for index, password_hash in zip(accepted, hashes):
+            username, _, kwargs = users[index]
+            records[username] = {
+                "password": password_hash,
+                "role": kwargs.get("role", "user"),
+                "full_name": kwargs.get("full_name", username),
+                "email": kwargs.get("email", ""),
+                "department": kwargs.get("department", ""),
+                "created": datetime.now().isoformat(),
+                "last_login": "",
+                "avatar_color": self._generate_avatar_color(username)
+            }
 
-        self.save_users()
-        return True, "Пользователь успешно создан"
+        if records:
+            self.store.put_many(records)
+        return results
 
     def authenticate(self, username: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
         """Аутентификация пользователя"""
@@ -170,11 +223,23 @@ class UserManager:
         if not self.hasher.verify_password(user["password"], password):
             return False, "Неверный пароль", None
 
-        # Обновляем время последнего входа
-        user["last_login"] = datetime.now().isoformat()
-        self.save_users()
+        # Обновляем время последнего входа (одна запись в хранилище)
+        changes = {"last_login": datetime.now().isoformat()}
+
+        # Хеш устаревшего формата или стоимости пересчитываем, пока пароль известен
+        if self.hasher.needs_rehash(user["password"]):
+            changes["password"] = self.hasher.hash_password(password)
+
+        self.store.patch(username, changes)
 
-        return True, "Успешная аутентификация", user
+        return True, "Успешная аутентификация", self.store[username]
+
+    def authenticate_async(self, username: str, password: str) -> Future:
+        """Аутентификация в пуле потоков хеширования
+
+        Результат future - тот же кортеж, что возвращает authenticate.
+        """
+        return self.hasher.executor().submit(self.authenticate, username, password)
 
     def get_user(self, username: str) -> Optional[Dict]:
         """Получение информации о пользователе"""
@@ -185,9 +250,7 @@ class UserManager:
         if username not in self.users:
             return False
 
-        user = self.users[username]
-        user.update(kwargs)
-        self.save_users()
+        self.store.patch(username, kwargs)
         return True
 
     def delete_user(self, username: str) -> bool:
@@ -195,8 +258,7 @@ class UserManager:
         if username not in self.users:
             return False
 
-        del self.users[username]
-        self.save_users()
+        self.store.remove(username)
         return True
 
     def list_users(self) -> List[Tuple[str, Dict]]:
@@ -205,11 +267,7 @@ class UserManager:
 
     def get_user_count(self) -> Dict[str, int]:
         """Статистика по пользователям"""
-        roles_count = {}
-        for user in self.users.values():
-            role = user.get("role", "unknown")
-            roles_count[role] = roles_count.get(role, 0) + 1
-        return roles_count
+        return self.store.count_by_role()
 
     @staticmethod
     def _generate_avatar_color(username: str) -> str:
@@ -222,98 +280,176 @@ class UserManager:
         return colors[hash_val % len(colors)]
 
 
+_user_manager = None
+_user_manager_lock = threading.Lock()
+
+
+def get_user_manager() -> UserManager:
+    """Общий для процесса менеджер пользователей (создается при первом вызове)"""
+    global _user_manager
+    if _user_manager is None:
+        with _user_manager_lock:
+            if _user_manager is None:
+                _user_manager = UserManager()
+    return _user_manager
+
+
+def local_client_address() -> str:
+    """Адрес клиента для журнала входов и ограничения попыток
+
+    Приложение локальное, поэтому клиента определяет имя пользователя ОС.
+    """
+    return getpass.getuser()
+
+
 class LoginLogger:
-    """Логирование попыток входа"""
+    """Логирование попыток входа
+
+    Последние неудачные попытки дополнительно держатся в памяти
+    в кольцевых буферах по IP. Буферы заполняются при запуске чтением
+    хвоста журнала и пополняются в log_attempt, поэтому
+    get_recent_failures и восстановление счетчиков LoginRateLimiter
+    не читают журнал вовсе. Экземпляр общий для процесса
+    (get_login_logger), иначе буферы разных окон расходились бы.
+    """
 
     def __init__(self):
         self.log_file = AppPaths.LOG_FILE
+        self.backend = open_login_log()
+        self.client_address = local_client_address()
 
-    def log_attempt(self, username: str, status: str, ip_address: str = "local"):
-        """Логирование попытки входа"""
+        # Буферы покрывают последние FAILURE_CACHE_SIZE записей журнала
+        self.cache_size = AppConfig.FAILURE_CACHE_SIZE
+        self._seq = 0
+        self._failures_by_ip = defaultdict(lambda: deque(maxlen=self.cache_size))
+        self._warm_cache()
+
+    def _warm_cache(self):
+        """Заполнение буферов из хвоста журнала"""
         try:
-            file_exists = self.log_file.exists()
+            for row in self.backend.recent(self.cache_size):
+                self._remember(row)
+        except Exception as e:
+            print(f"Ошибка чтения лога: {e}")
 
-            with open(self.log_file, 'a', encoding='utf-8', newline='') as f:
-                fieldnames = ["timestamp", "username", "status", "ip_address"]
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+    def _remember(self, row: Dict):
+        """Учет записи в кольцевых буферах"""
+        self._seq += 1
+        if row.get("status") != "FAILURE":
+            return
 
-                if not file_exists:
-                    writer.writeheader()
+        try:
+            ts = datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (KeyError, ValueError):
+            ts = 0.0
+
+        self._failures_by_ip[self._client_of(row)].append((self._seq, ts, row))
+
+    def _client_of(self, row: Dict) -> str:
+        """Адрес клиента записи (старые записи без адреса помечены local)"""
+        ip_address = row.get("ip_address")
+        if ip_address in (None, "", "local"):
+            return self.client_address
+        return ip_address
+
+    def log_attempt(self, username: str, status: str, ip_address: Optional[str] = None):
+        """Логирование попытки входа"""
+        row = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "username": username,
+            "status": status,
+            "ip_address": ip_address or self.client_address
+        }
+        self._remember(row)
 
-                writer.writerow({
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "username": username,
-                    "status": status,
-                    "ip_address": ip_address
-                })
+        try:
+            self.backend.append(row)
         except Exception as e:
             print(f"Ошибка записи лога: {e}")
 
     def get_recent_failures(self, ip_address: str, limit: int = 20) -> List[Dict]:
-        """Получение последних неудачных попыток для IP"""
-        failures = []
+        """Получение последних неудачных попыток для IP
+
+        Возвращает неудачные попытки с данного IP среди последних
+        limit записей журнала.
+        """
+        if limit <= self.cache_size:
+            oldest_seq = self._seq - limit
+            return [row for seq, _, row in self._failures_by_ip.get(ip_address, ())
+                    if seq > oldest_seq]
 
-        if not self.log_file.exists():
-            return failures
+        failures = []
 
         try:
-            with open(self.log_file, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-
-                # Фильтруем последние записи
-                for row in rows[-limit:]:
-                    if (row.get("ip_address") == ip_address and
-                            row.get("status") == "FAILURE"):
-                        failures.append(row)
+            # Окно больше буфера - читаем хвост журнала
+            for row in self.backend.recent(limit):
+                if (self._client_of(row) == ip_address and
+                        row.get("status") == "FAILURE"):
+                    failures.append(row)
         except Exception as e:
             print(f"Ошибка чтения лога: {e}")
 
         return failures
 
+    def recent_failure_times(self, window_seconds: float) -> Dict[str, List[float]]:
+        """Время неудачных попыток по IP за последние window_seconds секунд"""
+        cutoff = datetime.now().timestamp() - window_seconds
+        return {ip: [ts for _, ts, _ in entries if ts > cutoff]
+                for ip, entries in self._failures_by_ip.items()}
+
+
+_login_logger = None
+_login_logger_lock = threading.Lock()
+
+
+def get_login_logger() -> LoginLogger:
+    """Общий для процесса журнал входов (создается при первом вызове)"""
+    global _login_logger
+    if _login_logger is None:
+        with _login_logger_lock:
+            if _login_logger is None:
+                _login_logger = LoginLogger()
+    return _login_logger
+
 
 class SessionManager:
     """Управление сессиями"""
 
     def __init__(self):
-        self.active_sessions = {}
-        self.user_manager = UserManager()
-        self.logger = LoginLogger()
+        self.user_manager = get_user_manager()
+        self.store = SessionStore(open_session_backend(),
+                                  lookup_user=self.user_manager.get_user)
+        self.active_sessions = self.store.sessions
+        self.logger = get_login_logger()
 
     def create_session(self, username: str, user_info: Dict) -> str:
         """Создание новой сессии"""
         session_id = secrets.token_hex(16)
-        self.active_sessions[session_id] = {
-            "username": username,
-            "user_info": user_info,
-            "created": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat()
-        }
+        self.store.create(session_id, username, user_info)
         return session_id
 
     def validate_session(self, session_id: str) -> Optional[Dict]:
         """Проверка валидности сессии"""
-        if session_id in self.active_sessions:
-            self.active_sessions[session_id]["last_activity"] = datetime.now().isoformat()
-            return self.active_sessions[session_id]
-        return None
+        return self.store.get(session_id)
 
     def end_session(self, session_id: str):
         """Завершение сессии"""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        self.store.remove(session_id)
+
+    def cleanup_expired_sessions(self, max_age_hours: Optional[int] = None):
+        """Очистка устаревших сессий
 
-    def cleanup_expired_sessions(self, max_age_hours: int = 24):
-        """Очистка устаревших сессий"""
-        current_time = datetime.now()
-        expired = []
+        Без аргумента используются тайм-ауты из настроек (через кучу
+        сроков). С явным max_age_hours выполняется полный проход.
+        """
+        self.store.expire()
 
-        for session_id, session_data in self.active_sessions.items():
-            created = datetime.fromisoformat(session_data["created"])
-            age_hours = (current_time - created).total_seconds() / 3600
+        if max_age_hours is None:
+            return
 
-            if age_hours > max_age_hours:
-                expired.append(session_id)
+        cutoff = time.monotonic() - max_age_hours * 3600
+        expired = [session_id for session_id, session in self.active_sessions.items()
+                   if session["_created"] < cutoff]
 
         for session_id in expired:
-            del self.active_sessions[session_id]
\ No newline at end of file
+            self.store.remove(session_id)
@@ -0,0 +1,262 @@
+"""
+Автосохранение и восстановление после сбоя
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import AppPaths, AppConfig
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(f) -> bool:
+    """Неблокирующая монопольная блокировка открытого файла"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class RecoveryJournal:
+    """Копии несохраненного текста для восстановления после сбоя
+
+    У каждого запущенного редактора своя запись в data/recovery: текст
+    (<id>.txt) и сведения о нем (<id>.json), оба файла пишутся атомарно.
+    Пока редактор работает, он держит заблокированным файл <id>.lock;
+    при сохранении документа и штатном выходе запись удаляется. Запись,
+    чей файл блокировки свободен, осталась от аварийно завершенной работы.
+    """
+
+    def __init__(self, username: str = "", recovery_dir: Optional[Path] = None):
+        self.dir = Path(recovery_dir) if recovery_dir else AppPaths.DATA_DIR / "recovery"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.username = username
+        self.entry_id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+        self._lock_file = open(self.dir / f"{self.entry_id}.lock", 'wb')
+        _try_lock(self._lock_file)
+
+    def _paths(self, entry_id: str):
+        return self.dir / f"{entry_id}.txt", self.dir / f"{entry_id}.json"
+
+    def _is_abandoned(self, entry_id: str) -> bool:
+        """Процесс - владелец записи завершился"""
+        try:
+            with open(self.dir / f"{entry_id}.lock", 'ab') as f:
+                return _try_lock(f)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp_file = path.with_name(path.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    def write(self, text: str, filepath: Optional[str]):
+        """Сохранение копии текущего текста"""
+        text_file, meta_file = self._paths(self.entry_id)
+        self._write_atomic(text_file, text.encode('utf-8'))
+        # Сведения пишутся последними: запись без них неполная и не предлагается
+        self._write_atomic(meta_file, json.dumps({
+            "filepath": filepath,
+            "username": self.username,
+            "saved": time.time(),
+            "size": len(text)
+        }, ensure_ascii=False).encode('utf-8'))
+
+    def clear(self, entry_id: Optional[str] = None):
+        """Удаление записи (по умолчанию - своей)"""
+        paths = list(self._paths(entry_id or self.entry_id))
+        if entry_id and entry_id != self.entry_id:
+            paths.append(self.dir / f"{entry_id}.lock")
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self, keep: bool = False):
+        """Завершение работы; keep - оставить запись для восстановления"""
+        if not keep:
+            self.clear()
+        self._lock_file.close()
+        try:
+            (self.dir / f"{self.entry_id}.lock").unlink()
+        except OSError:
+            pass
+
+    def pending(self) -> List[Dict]:
+        """Записи, оставшиеся после сбоя (новые первыми)"""
+        entries = []
+        for meta_file in self.dir.glob("*.json"):
+            entry_id = meta_file.stem
+            if entry_id == self.entry_id:
+                continue
+            if not self._is_abandoned(entry_id):
+                continue  # владелец еще работает
+            try:
+                with open(meta_file, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if self.username and meta.get("username") != self.username:
+                continue
+            meta["id"] = entry_id
+            meta["saved"] = datetime.fromtimestamp(meta["saved"])
+            entries.append(meta)
+
+        # Блокировки завершившихся процессов, не оставивших текста
+        for lock_file in self.dir.glob("*.lock"):
+            entry_id = lock_file.stem
+            if entry_id != self.entry_id and not self._paths(entry_id)[1].exists() \
+                    and self._is_abandoned(entry_id):
+                try:
+                    lock_file.unlink()
+                except OSError:
+                    pass
+
+        entries.sort(key=lambda entry: entry["saved"], reverse=True)
+        return entries
+
+    def read(self, entry_id: str) -> Optional[str]:
+        """Текст записи"""
+        text_file, _ = self._paths(entry_id)
+        try:
+            return text_file.read_text(encoding='utf-8')
+        except OSError as e:
+            print(f"Ошибка чтения копии для восстановления: {e}")
+            return None
+
+
+class AutosaveWorker:
+    """Фоновое сохранение документов
+
+    Окно только берет снимок документа (TextSnapshot, без копирования
+    текста) и ставит задачу в очередь; запись
+    документа (атомарная, через временный файл), резервные копии,
+    история версий и копия для восстановления выполняются этим потоком.
+    Из нескольких ожидающих автосохранений выполняется только последнее.
+    Результаты сохранений забирает окно из очереди results.
+    """
+
+    _STOP = object()
+
+    def __init__(self, doc_manager, journal: RecoveryJournal,
+                 save_documents: bool = AppConfig.AUTOSAVE_DOCUMENT):
+        self.doc_manager = doc_manager
+        self.journal = journal
+        self.save_documents = save_documents
+
+        self._queue = queue.Queue()
+        # (путь, поколение правок, успех, явное сохранение) - по одному на
+        # каждое сохранение и автосохранение; для автосохранения успех -
+        # текст записан в сам документ
+        self.results = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def save(self, filepath: str, content, generation: int):
+        """Явное сохранение документа (content - строка или TextSnapshot)"""
+        self._queue.put(("save", filepath, content, generation))
+
+    def autosave(self, filepath: Optional[str], content, generation: int):
+        """Автосохранение: в документ (если он уже есть на диске) или в копию
+        для восстановления"""
+        self._queue.put(("autosave", filepath, content, generation))
+
+    def clear_recovery(self):
+        self._queue.put(("clear",))
+
+    def flush(self, timeout: Optional[float] = None):
+        """Ожидание выполнения всех поставленных задач"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            tasks = [self._queue.get()]
+            while True:
+                try:
+                    tasks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Устаревшие автосохранения пропускаем - важна только последняя копия
+            last_autosave = max((i for i, task in enumerate(tasks)
+                                 if isinstance(task, tuple) and task[0] == "autosave"),
+                                default=None)
+
+            for i, task in enumerate(tasks):
+                if task is self._STOP:
+                    return
+                if isinstance(task, threading.Event):
+                    task.set()
+                    continue
+                if task[0] == "autosave" and i != last_autosave:
+                    _, filepath, _, generation = task
+                    self.results.put((filepath, generation, False, False))
+                    continue
+                try:
+                    self._execute(task)
+                except Exception as e:
+                    print(f"Ошибка автосохранения: {e}")
+
+    def _execute(self, task: tuple):
+        kind = task[0]
+        if kind == "save":
+            _, filepath, content, generation = task
+            ok = self.doc_manager.save_document(filepath, self._chunks(content))
+            self.results.put((filepath, generation, ok, True))
+        elif kind == "autosave":
+            _, filepath, content, generation = task
+            saved = False
+            try:
+                if filepath and self.save_documents and \
+                        self.doc_manager.save_document(filepath, self._chunks(content), record=False):
+                    self.journal.clear()
+                    saved = True
+                else:
+                    self.journal.write(content if isinstance(content, str) else content.text(),
+                                       filepath)
+            finally:
+                self.results.put((filepath, generation, saved, False))
+        elif kind == "clear":
+            self.journal.clear()
+
+    @staticmethod
+    def _chunks(content):
+        """Снимок пишется кусками, без склейки в одну строку"""
+        return content if isinstance(content, str) else content.chunks()
+
+    def close(self):
+        """Выполнение оставшихся задач и остановка потока"""
+        if self._closed:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._closed = True
@@ -0,0 +1,321 @@
+"""
+Хранилище резервных копий с дедупликацией
+"""
+import hashlib
+import os
+import re
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import AppPaths, AppConfig
+from core.storage import SqliteDatabase
+
+
+# Имена старых полных копий: doc.txt.backup_20240115_103000, users_backup_20240115_103000.json
+LEGACY_DOC_RE = re.compile(r"^(?P<name>.+)\.backup_(?P<ts>\d{8}_\d{6})$")
+LEGACY_USERS_RE = re.compile(r"^users_backup_(?P<ts>\d{8}_\d{6})\.json$")
+
+
+class BackupStore:
+    """Версии файлов в виде списков сжатых фрагментов
+
+    Содержимое режется на фрагменты по границам строк, причем граница
+    выбирается по самому тексту (хеш байтов перед переводом строки), а не
+    по смещению: правка в середине файла меняет только соседние
+    фрагменты. Фрагменты хранятся один раз под своим SHA-256 и сжаты
+    zlib, версия - это список их хешей. Сохранение без изменений не
+    создает новой версии.
+
+    Версии группируются по ключам ("documents/имя.txt", "users"), для
+    каждого ключа действует своя политика хранения.
+    """
+
+    DIGEST_SIZE = 32
+    CUT_WINDOW = 16
+    CUT_MASK = 0x3FF
+
+    def __init__(self, db: Optional[SqliteDatabase] = None,
+                 min_chunk: int = AppConfig.BACKUP_CHUNK_MIN,
+                 max_chunk: int = AppConfig.BACKUP_CHUNK_MAX,
+                 level: int = AppConfig.BACKUP_COMPRESS_LEVEL):
+        self.db = db or SqliteDatabase.open(AppPaths.BACKUPS_DIR / AppConfig.BACKUP_DB)
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.level = level
+
+        with self.db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backup_chunks (
+                    digest BLOB PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    refs INTEGER NOT NULL
+                ) WITHOUT ROWID""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backup_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    digest BLOB NOT NULL,
+                    mtime_ns INTEGER,
+                    chunks BLOB NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backup_versions_key "
+                         "ON backup_versions(key, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backup_policies (
+                    key TEXT PRIMARY KEY,
+                    keep INTEGER,
+                    days REAL
+                )""")
+
+    # --- Фрагменты ---
+
+    def split(self, data: bytes) -> Iterator[bytes]:
+        """Разбиение на фрагменты по границам, зависящим от содержимого"""
+        start, size = 0, len(data)
+        while start < size:
+            end = min(size, start + self.max_chunk)
+            position = data.find(b'\n', start + self.min_chunk, end)
+            while position != -1:
+                window = data[max(start, position - self.CUT_WINDOW):position]
+                if zlib.crc32(window) & self.CUT_MASK == 0:
+                    end = position + 1
+                    break
+                position = data.find(b'\n', position + 1, end)
+            yield data[start:end]
+            start = end
+
+    def _store_chunks(self, conn, chunks: List[bytes]) -> bytes:
+        """Запись новых фрагментов и учет ссылок; возвращает список хешей"""
+        digests = [hashlib.sha256(chunk).digest() for chunk in chunks]
+
+        known = set()
+        unique = list(set(digests))
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            known.update(row["digest"] for row in conn.execute(
+                f"SELECT digest FROM backup_chunks WHERE digest IN ({','.join('?' * len(batch))})",
+                batch))
+
+        new = {}
+        for digest, chunk in zip(digests, chunks):
+            if digest not in known and digest not in new:
+                new[digest] = chunk
+        conn.executemany(
+            "INSERT INTO backup_chunks (digest, data, size, refs) VALUES (?, ?, ?, 0)",
+            [(digest, zlib.compress(chunk, self.level), len(chunk))
+             for digest, chunk in new.items()]
+        )
+
+        counts: Dict[bytes, int] = {}
+        for digest in digests:
+            counts[digest] = counts.get(digest, 0) + 1
+        conn.executemany("UPDATE backup_chunks SET refs = refs + ? WHERE digest = ?",
+                         [(count, digest) for digest, count in counts.items()])
+
+        return b"".join(digests)
+
+    # --- Версии ---
+
+    def latest(self, key: str) -> Optional[Dict]:
+        """Последняя версия ключа"""
+        rows = self.db.query(
+            "SELECT id, created, size, digest, mtime_ns FROM backup_versions "
+            "WHERE key = ? ORDER BY id DESC LIMIT 1", (key,))
+        return dict(rows[0]) if rows else None
+
+    def backup_bytes(self, key: str, data: bytes, mtime_ns: Optional[int] = None,
+                     created: Optional[float] = None) -> int:
+        """Сохранение версии; если содержимое не изменилось - id последней"""
+        digest = hashlib.sha256(data).digest()
+
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT id, digest FROM backup_versions WHERE key = ? ORDER BY id DESC LIMIT 1",
+                (key,)).fetchone()
+            if row is not None and row["digest"] == digest:
+                conn.execute("UPDATE backup_versions SET mtime_ns = ? WHERE id = ?",
+                             (mtime_ns, row["id"]))
+                return row["id"]
+
+            chunks = self._store_chunks(conn, list(self.split(data)))
+            version_id = conn.execute(
+                "INSERT INTO backup_versions (key, created, size, digest, mtime_ns, chunks) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, created or time.time(), len(data), digest, mtime_ns, chunks)
+            ).lastrowid
+
+        self.prune(key)
+        return version_id
+
+    def backup_file(self, key: str, filepath: str) -> Optional[int]:
+        """Сохранение версии файла
+
+        Если размер и время изменения совпадают с последней версией,
+        файл даже не читается.
+        """
+        path = Path(filepath)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        latest = self.latest(key)
+        if latest is not None and latest["mtime_ns"] == stat.st_mtime_ns \
+                and latest["size"] == stat.st_size:
+            return latest["id"]
+
+        return self.backup_bytes(key, path.read_bytes(), mtime_ns=stat.st_mtime_ns)
+
+    def versions(self, key: str) -> List[Dict]:
+        """Версии ключа (новые первыми)"""
+        return [{
+            "id": row["id"],
+            "created": datetime.fromtimestamp(row["created"]),
+            "size": row["size"]
+        } for row in self.db.query(
+            "SELECT id, created, size FROM backup_versions WHERE key = ? ORDER BY id DESC",
+            (key,))]
+
+    def rename_key(self, old_key: str, new_key: str):
+        """Перенос версий под новый ключ (переименование документа)"""
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE backup_versions SET key = ? WHERE key = ?", (new_key, old_key))
+            conn.execute("UPDATE OR REPLACE backup_policies SET key = ? WHERE key = ?",
+                         (new_key, old_key))
+
+    def read_version(self, version_id: int) -> Optional[bytes]:
+        """Содержимое версии"""
+        rows = self.db.query("SELECT chunks FROM backup_versions WHERE id = ?", (version_id,))
+        if not rows:
+            return None
+
+        chunk_list = rows[0]["chunks"]
+        digests = [chunk_list[i:i + self.DIGEST_SIZE]
+                   for i in range(0, len(chunk_list), self.DIGEST_SIZE)]
+
+        data = {}
+        unique = list(set(digests))
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            for row in self.db.query(
+                    f"SELECT digest, data FROM backup_chunks "
+                    f"WHERE digest IN ({','.join('?' * len(batch))})", batch):
+                data[row["digest"]] = zlib.decompress(row["data"])
+
+        return b"".join(data[digest] for digest in digests)
+
+    def restore(self, version_id: int, target: str) -> bool:
+        """Восстановление версии в файл (через временный файл)"""
+        data = self.read_version(version_id)
+        if data is None:
+            return False
+
+        target = Path(target)
+        tmp_file = target.with_name(target.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, target)
+        return True
+
+    # --- Хранение ---
+
+    def set_policy(self, key: str, keep: Optional[int] = None, days: Optional[float] = None):
+        """Собственная политика хранения для ключа"""
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO backup_policies (key, keep, days) VALUES (?, ?, ?)",
+                         (key, keep, days))
+
+    def policy(self, key: str) -> Dict:
+        """Политика ключа: собственная или по умолчанию для его группы"""
+        rows = self.db.query("SELECT keep, days FROM backup_policies WHERE key = ?", (key,))
+        if rows:
+            return {"keep": rows[0]["keep"], "days": rows[0]["days"]}
+        group = key.split('/', 1)[0]
+        return dict(AppConfig.BACKUP_RETENTION.get(group, {"keep": 10, "days": None}))
+
+    def prune(self, key: str) -> int:
+        """Удаление версий сверх политики; последняя версия не удаляется никогда"""
+        policy = self.policy(key)
+        rows = self.db.query(
+            "SELECT id, created FROM backup_versions WHERE key = ? ORDER BY id DESC", (key,))
+
+        cutoff = time.time() - policy["days"] * 86400 if policy.get("days") else None
+        expired = [row["id"] for index, row in enumerate(rows) if index > 0 and (
+            (policy.get("keep") and index >= policy["keep"]) or
+            (cutoff is not None and row["created"] < cutoff))]
+
+        for version_id in expired:
+            self.delete_version(version_id)
+        return len(expired)
+
+    def delete_version(self, version_id: int):
+        """Удаление версии и фрагментов, на которые больше никто не ссылается"""
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT chunks FROM backup_versions WHERE id = ?",
+                               (version_id,)).fetchone()
+            if row is None:
+                return
+
+            counts: Dict[bytes, int] = {}
+            chunk_list = row["chunks"]
+            for i in range(0, len(chunk_list), self.DIGEST_SIZE):
+                digest = chunk_list[i:i + self.DIGEST_SIZE]
+                counts[digest] = counts.get(digest, 0) + 1
+
+            conn.executemany("UPDATE backup_chunks SET refs = refs - ? WHERE digest = ?",
+                             [(count, digest) for digest, count in counts.items()])
+            conn.execute("DELETE FROM backup_chunks WHERE refs <= 0")
+            conn.execute("DELETE FROM backup_versions WHERE id = ?", (version_id,))
+
+    def stats(self) -> Dict:
+        """Объем данных в версиях и фактически занятый фрагментами"""
+        versions = self.db.query(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size FROM backup_versions")[0]
+        chunks = self.db.query(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size, "
+            "COALESCE(SUM(LENGTH(data)), 0) AS stored FROM backup_chunks")[0]
+        return {
+            "versions": versions["n"],
+            "logical_size": versions["size"],
+            "chunks": chunks["n"],
+            "unique_size": chunks["size"],
+            "stored_size": chunks["stored"]
+        }
+
+    # --- Перенос старых копий ---
+
+    def import_legacy(self, backups_dir: Path = None):
+        """Перенос полных копий старого формата в хранилище (однократно)"""
+        if self.db.get_meta("backups_imported") is not None:
+            return
+
+        backups_dir = Path(backups_dir or AppPaths.BACKUPS_DIR)
+        legacy = []
+        for path in (backups_dir / "documents").glob("*.backup_*"):
+            match = LEGACY_DOC_RE.match(path.name)
+            if match:
+                legacy.append((match["ts"], f"documents/{match['name']}", path))
+        for path in backups_dir.glob("users_backup_*.json"):
+            match = LEGACY_USERS_RE.match(path.name)
+            if match:
+                legacy.append((match["ts"], "users", path))
+
+        # По возрастанию времени, чтобы порядок версий совпал с историей
+        for ts, key, path in sorted(legacy):
+            try:
+                created = datetime.strptime(ts, '%Y%m%d_%H%M%S').timestamp()
+                self.backup_bytes(key, path.read_bytes(), created=created)
+                path.unlink()
+            except Exception as e:
+                print(f"Ошибка переноса резервной копии {path}: {e}")
+
+        with self.db.transaction() as conn:
+            self.db.set_meta(conn, "backups_imported", str(len(legacy)))
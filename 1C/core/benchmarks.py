@@ -0,0 +1,183 @@
+"""
+Замеры производительности
+
+Запуск: python -m core.benchmarks [analyze] [find] [--size-mb N]
+"""
+import argparse
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+from core.editor import TextAnalyzer
+from core.search import SearchEngine
+
+
+def _analyze_text_legacy(text: str) -> Dict:
+    """Прежняя реализация analyze_text (для сравнения)"""
+    words = text.split()
+    lines = text.split('\n')
+
+    return {
+        "characters": len(text),
+        "words": len(words),
+        "lines": len(lines),
+        "spaces": text.count(' '),
+        "sentences": len(re.split(r'[.!?]+', text)),
+        "avg_word_length": sum(len(word) for word in words) / len(words) if words else 0,
+        "avg_line_length": sum(len(line) for line in lines) / len(lines) if lines else 0
+    }
+
+
+def _find_text_legacy(text: str, search_term: str, case_sensitive: bool = False):
+    """Прежняя реализация find_text (для сравнения)"""
+    if not case_sensitive:
+        text = text.lower()
+        search_term = search_term.lower()
+
+    positions = []
+    start = 0
+
+    while True:
+        pos = text.find(search_term, start)
+        if pos == -1:
+            break
+        positions.append((pos, pos + len(search_term)))
+        start = pos + 1
+
+    return positions
+
+
+def make_text(size_mb: float, seed: int = 0) -> str:
+    """Синтетический текст на кириллице и латинице"""
+    rng = random.Random(seed)
+    vocabulary = ("документ текст редактор поиск замена строка слово "
+                  "document text editor search replace line word").split()
+    punctuation = ["", "", "", ",", ".", "!", "?", "...", "\n"]
+    parts = []
+    size = 0
+    target = int(size_mb * 1024 * 1024)
+    while size < target:
+        part = rng.choice(vocabulary) + rng.choice(punctuation) + " "
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def measure(func: Callable, *args) -> Dict:
+    """Время и пиковая дополнительная память вызова
+
+    Время замеряется отдельным запуском: tracemalloc заметно
+    замедляет выделение памяти.
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"result": result, "seconds": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def _report(name: str, size_mb: float, run: Dict):
+    print(f"  {name:<12} {run['seconds']:8.3f} с  {size_mb / run['seconds']:8.1f} МБ/с  "
+          f"пик памяти {run['peak_mb']:8.1f} МБ")
+
+
+def bench_analyze(size_mb: float):
+    """Прежний и потоковый analyze_text на одном тексте"""
+    text = make_text(size_mb)
+    print(f"analyze_text, {size_mb} МБ:")
+
+    legacy = measure(_analyze_text_legacy, text)
+    _report("прежний", size_mb, legacy)
+
+    single = measure(TextAnalyzer.analyze_text, text)
+    _report("потоковый", size_mb, single)
+
+    path = Path(tempfile.mkstemp(suffix=".txt")[1])
+    try:
+        path.write_text(text, encoding='utf-8')
+        from_file = measure(TextAnalyzer.analyze_file, str(path))
+        _report("из файла", size_mb, from_file)
+    finally:
+        path.unlink()
+
+    assert legacy["result"] == single["result"] == from_file["result"]
+
+
+def bench_find(size_mb: float):
+    """Прежний find_text и SearchEngine: один термин, несколько, словарь"""
+    text = make_text(size_mb)
+    rng = random.Random(1)
+    print(f"find_text, {size_mb} МБ:")
+
+    term = "редактор"
+    legacy = measure(_find_text_legacy, text, term)
+    _report("прежний", size_mb, legacy)
+    engine = SearchEngine(term)
+    single = measure(lambda: engine.search(text))
+    _report("движок", size_mb, single)
+    assert legacy["result"] == single["result"].pairs()
+
+    # Несколько терминов: прежде - отдельный проход на каждый
+    terms = ["документ", "поиск", "word", "text", "строка", "replace", "editor", "замена"]
+
+    def legacy_many():
+        return sorted(pair for t in terms for pair in _find_text_legacy(text, t))
+
+    legacy = measure(legacy_many)
+    _report(f"прежний x{len(terms)}", size_mb, legacy)
+    engine = SearchEngine(terms)
+    many = measure(lambda: engine.search(text))
+    _report(f"движок x{len(terms)}", size_mb, many)
+    assert legacy["result"] == many["result"].pairs()
+
+    # Большой словарь: автомат Ахо-Корасик против прохода на каждый термин
+    # (на десятой части текста - по одному термину это слишком долго)
+    alphabet = "абвгдежзиклмнопрстуabcdefghij"
+    vocabulary = terms + ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 9)))
+                          for _ in range(500)]
+    sample = text[:len(text) // 10]
+
+    def legacy_vocabulary():
+        return sorted(pair for t in vocabulary for pair in _find_text_legacy(sample, t))
+
+    legacy = measure(legacy_vocabulary)
+    _report(f"прежний x{len(vocabulary)}", size_mb / 10, legacy)
+    engine = SearchEngine(vocabulary)
+    automaton = measure(lambda: engine.search(sample))
+    _report(f"автомат x{len(vocabulary)}", size_mb / 10, automaton)
+    assert legacy["result"] == automaton["result"].pairs()
+
+    path = Path(tempfile.mkstemp(suffix=".txt")[1])
+    try:
+        path.write_text(text, encoding='utf-8')
+        from_file = measure(SearchEngine(terms).search_file, str(path))
+        _report("из файла", size_mb, from_file)
+    finally:
+        path.unlink()
+    assert from_file["result"].pairs() == many["result"].pairs()
+
+
+BENCHMARKS = {"analyze": bench_analyze, "find": bench_find}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("names", nargs="*",
+                        help=f"замеры: {', '.join(sorted(BENCHMARKS))} (по умолчанию все)")
+    parser.add_argument("--size-mb", type=float, default=50)
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name](args.size_mb)
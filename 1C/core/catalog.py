@@ -0,0 +1,255 @@
+"""
+Каталог документов
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import AppPaths
+
+
+class DocumentCatalog:
+    """Кэшируемый каталог документов в папке docs
+
+    Содержимое папки сохраняется в data/docs_catalog.json вместе с
+    mtime самой папки. Папка пересканируется (os.scandir) только когда
+    ее mtime изменился, т.е. файлы создавались, удалялись или
+    переименовывались извне. Изменения, сделанные приложением,
+    вносятся точечно через invalidate().
+
+    Правка содержимого существующего файла другой программой не меняет
+    mtime папки, поэтому размер и дата такого файла в каталоге остаются
+    прежними до полного пересканирования refresh(force=True) (кнопка
+    "Обновить" в списке документов). Потребители, которым нужно знать
+    об изменениях, сравнивают счетчик version.
+    """
+
+    def __init__(self, docs_dir: Path, catalog_file: Optional[Path] = None):
+        self.docs_dir = Path(docs_dir)
+        self.catalog_file = Path(catalog_file) if catalog_file else \
+            AppPaths.DATA_DIR / "docs_catalog.json"
+
+        # имя файла -> {"size", "ctime", "mtime"}
+        self._entries: Dict[str, Dict] = {}
+        self._dir_mtime_ns = None
+        self._listing: Optional[List[Dict]] = None
+        self._stats: Optional[Dict] = None
+        self._orders: Dict[Tuple, List[str]] = {}
+        self.version = 0
+        self._lock = threading.RLock()
+
+        self._load()
+
+    # --- Хранение ---
+
+    def _load(self):
+        if not self.catalog_file.exists():
+            return
+        try:
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("docs_dir") == str(self.docs_dir):
+                self._entries = data.get("entries", {})
+                self._dir_mtime_ns = data.get("dir_mtime_ns")
+        except Exception as e:
+            print(f"Ошибка загрузки каталога документов: {e}")
+
+    def _save(self):
+        try:
+            tmp_file = self.catalog_file.with_name(self.catalog_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "docs_dir": str(self.docs_dir),
+                    "dir_mtime_ns": self._dir_mtime_ns,
+                    "entries": self._entries
+                }, f, ensure_ascii=False)
+            os.replace(tmp_file, self.catalog_file)
+        except Exception as e:
+            print(f"Ошибка сохранения каталога документов: {e}")
+
+    # --- Обновление ---
+
+    def _changed(self):
+        self._listing = None
+        self._stats = None
+        self._orders = {}
+        self.version += 1
+
+    def refresh(self, force: bool = False) -> bool:
+        """Пересканирование папки, если она изменилась; True - были изменения
+
+        Без force проверяется только mtime папки: правки содержимого
+        файлов извне так не видны, для них нужен force=True.
+        """
+        with self._lock:
+            try:
+                dir_mtime_ns = os.stat(self.docs_dir).st_mtime_ns
+            except OSError:
+                return False
+
+            if not force and dir_mtime_ns == self._dir_mtime_ns:
+                return False
+
+            entries = {}
+            with os.scandir(self.docs_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.txt'):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        entries[entry.name] = self._entry_from_stat(entry.stat())
+                    except OSError as e:
+                        print(f"Ошибка получения информации о файле {entry.path}: {e}")
+
+            changed = entries != self._entries
+            self._entries = entries
+            self._dir_mtime_ns = dir_mtime_ns
+            self._save()
+
+            if changed:
+                self._changed()
+            return changed
+
+    @staticmethod
+    def _entry_from_stat(stat: os.stat_result) -> Dict:
+        return {"size": stat.st_size, "ctime": stat.st_ctime, "mtime": stat.st_mtime}
+
+    def dir_mtime(self) -> Optional[int]:
+        """mtime папки (нс); снимается перед изменением файлов для invalidate()"""
+        try:
+            return os.stat(self.docs_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def invalidate(self, *filepaths: str, dir_mtime_ns: Optional[int] = None):
+        """Точечное обновление записей после изменения файлов приложением
+
+        dir_mtime_ns - mtime папки, снятый через dir_mtime() до изменения.
+        Если он не совпадает с сохраненным, папку меняли извне после
+        последнего сканирования - она пересканируется целиком. Без
+        dir_mtime_ns сохраненный mtime не сдвигается, и следующий
+        refresh() пересканирует папку.
+        """
+        docs_dir = self.docs_dir.resolve()
+        paths = [Path(filepath) for filepath in filepaths]
+        paths = [path for path in paths
+                 if path.parent.resolve() == docs_dir and path.suffix == '.txt']
+        if not paths:
+            return
+
+        with self._lock:
+            # Каталог еще ни разу не строился или папка менялась извне -
+            # сканируем ее целиком
+            if self._dir_mtime_ns is None or \
+                    (dir_mtime_ns is not None and dir_mtime_ns != self._dir_mtime_ns):
+                self.refresh(force=True)
+                return
+
+            for path in paths:
+                try:
+                    self._entries[path.name] = self._entry_from_stat(path.stat())
+                except FileNotFoundError:
+                    self._entries.pop(path.name, None)
+
+            if dir_mtime_ns is not None:
+                current = self.dir_mtime()
+                if current is not None:
+                    self._dir_mtime_ns = current
+
+            self._save()
+            self._changed()
+
+    # --- Запросы ---
+
+    def list_documents(self) -> List[Dict]:
+        """Список документов (новые первыми)"""
+        with self._lock:
+            self.refresh()
+
+            if self._listing is None:
+                listing = [{
+                    "path": str(self.docs_dir / name),
+                    "name": name,
+                    "size": entry["size"],
+                    "created": datetime.fromtimestamp(entry["ctime"]),
+                    "modified": datetime.fromtimestamp(entry["mtime"])
+                } for name, entry in self._entries.items()]
+                listing.sort(key=lambda x: x["modified"], reverse=True)
+                self._listing = listing
+
+            return list(self._listing)
+
+    def entries(self) -> Dict[str, Dict]:
+        """Копия записей каталога: имя файла -> {"size", "ctime", "mtime"}"""
+        with self._lock:
+            self.refresh()
+            return {name: dict(entry) for name, entry in self._entries.items()}
+
+    # Ключи сортировки для query()
+    SORT_KEYS = {
+        "name": lambda item: item[0].casefold(),
+        "size": lambda item: item[1]["size"],
+        "modified": lambda item: item[1]["mtime"],
+        "created": lambda item: item[1]["ctime"],
+    }
+
+    def _document(self, name: str) -> Dict:
+        entry = self._entries[name]
+        return {
+            "path": str(self.docs_dir / name),
+            "name": name,
+            "size": entry["size"],
+            "created": datetime.fromtimestamp(entry["ctime"]),
+            "modified": datetime.fromtimestamp(entry["mtime"])
+        }
+
+    def query(self, sort_by: str = "modified", reverse: bool = True,
+              name_filter: str = "", offset: int = 0,
+              limit: Optional[int] = None) -> Tuple[int, List[Dict]]:
+        """Страница документов с сортировкой и фильтром по имени
+
+        Возвращает (число подходящих документов, документы страницы).
+        Порядок для каждой комбинации сортировки и фильтра вычисляется
+        один раз до следующего изменения каталога; записи документов
+        строятся только для запрошенной страницы.
+        """
+        with self._lock:
+            self.refresh()
+
+            key = (sort_by, reverse, name_filter.casefold())
+            names = self._orders.get(key)
+
+            if names is None:
+                needle = key[2]
+                items = [item for item in self._entries.items()
+                         if not needle or needle in item[0].casefold()]
+                items.sort(key=self.SORT_KEYS[sort_by], reverse=reverse)
+                names = [name for name, _ in items]
+
+                if len(self._orders) >= 16:
+                    self._orders.clear()
+                self._orders[key] = names
+
+            end = None if limit is None else offset + limit
+            return len(names), [self._document(name) for name in names[offset:end]]
+
+    def stats(self) -> Dict:
+        """Статистика по документам"""
+        with self._lock:
+            docs = self.list_documents()
+
+            if self._stats is None:
+                total_size = sum(doc["size"] for doc in docs)
+                self._stats = {
+                    "count": len(docs),
+                    "total_size": total_size,
+                    "avg_size": total_size // len(docs) if docs else 0,
+                    "oldest": docs[-1]["modified"] if docs else None,
+                    "newest": docs[0]["modified"] if docs else None
+                }
+
+            return dict(self._stats)
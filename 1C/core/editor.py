@@ -2,15 +2,22 @@
 Основной функционал текстового редактора
 """
 import os
-import glob
+import random
+import threading
 import uuid
 import re
-import shutil
-from datetime import datetime
+from array import array
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from config import AppPaths, AppConfig
+from core.catalog import DocumentCatalog
+from core.search_index import SearchIndex
+from core.viewer import MappedDocument
+from core.backups import BackupStore
+from core.history import VersionHistory
+from core.replace import ReplaceEngine
+from core.search import SearchEngine
 
 
 class DocumentManager:
@@ -18,6 +25,18 @@ class DocumentManager:
 
     def __init__(self):
         self.docs_dir = AppPaths.DOCS_DIR
+        # Сохраняют и окно, и поток автосохранения
+        self._save_lock = threading.RLock()
+        self.catalog = DocumentCatalog(self.docs_dir)
+
+        # Версии документов: фрагменты с дедупликацией
+        self.backups = BackupStore()
+        self.backups.import_legacy()
+        self.history = VersionHistory(self.backups.db)
+
+        # Полнотекстовый индекс обновляется в фоне
+        self.search_index = SearchIndex(self.docs_dir)
+        self.search_index.schedule_sync(self.catalog)
 
     def create_document(self, content: str = "") -> str:
         """Создание нового документа"""
@@ -25,23 +44,58 @@ class DocumentManager:
         filename = f"doc_{doc_id}.txt"
         filepath = self.docs_dir / filename
 
+        dir_mtime_ns = self.catalog.dir_mtime()
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
 
+        self.catalog.invalidate(str(filepath), dir_mtime_ns=dir_mtime_ns)
+        self.search_index.schedule_update(str(filepath))
         return str(filepath)
 
-    def save_document(self, filepath: str, content: str) -> bool:
-        """Сохранение документа"""
+    def save_document(self, filepath: str, content: Union[str, Iterable[str]],
+                      record: bool = True) -> bool:
+        """Сохранение документа
+
+        content - строка или последовательность кусков текста. Текст
+        пишется во временный файл рядом с документом, который затем
+        атомарно заменяет его: при сбое на диске остается прежняя версия.
+        record=False - без резервной копии и версии в истории
+        (автосохранение не вытесняет сохраненные пользователем версии).
+        """
+        with self._save_lock:
+            return self._write_document(filepath, content, record)
+
+    def _write_document(self, filepath: str, content: Union[str, Iterable[str]],
+                        record: bool = True) -> bool:
+        tmp_path = Path(filepath).with_name(Path(filepath).name + ".tmp")
+        dir_mtime_ns = self.catalog.dir_mtime()
         try:
-            # Создаем резервную копию если файл существует
-            if Path(filepath).exists():
+            # Резервная копия прежнего содержимого (на случай, если файл
+            # меняли вне редактора); новый текст попадает в историю версий
+            if record and Path(filepath).exists():
                 self._create_backup(filepath)
 
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                if isinstance(content, str):
+                    f.write(content)
+                else:
+                    for chunk in content:
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+            if record:
+                self._record_version(filepath, content if isinstance(content, str) else None)
+
+            self.catalog.invalidate(filepath, dir_mtime_ns=dir_mtime_ns)
+            self.search_index.schedule_update(filepath)
             return True
         except Exception as e:
             print(f"Ошибка сохранения документа: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
             return False
 
     def load_document(self, filepath: str) -> Optional[str]:
@@ -53,10 +107,37 @@ class DocumentManager:
             print(f"Ошибка загрузки документа: {e}")
             return None
 
+    def iter_document(self, filepath: str,
+                      chunk_size: int = AppConfig.LOAD_CHUNK_SIZE) -> Iterator[Tuple[str, int]]:
+        """Чтение документа кусками: (текст, прочитано байт)
+
+        Для постепенной загрузки больших файлов без второй полной копии
+        текста в памяти. Ошибки чтения передаются вызывающему.
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk, f.buffer.tell()
+
+    def open_mapped(self, filepath: str) -> Optional[MappedDocument]:
+        """Открытие документа для просмотра без загрузки в память"""
+        try:
+            return MappedDocument(filepath)
+        except Exception as e:
+            print(f"Ошибка открытия документа: {e}")
+            return None
+
     def delete_document(self, filepath: str) -> bool:
         """Удаление документа"""
         try:
+            # Удаленный документ остается восстановимым из резервных копий
+            self._create_backup(filepath)
+            dir_mtime_ns = self.catalog.dir_mtime()
             Path(filepath).unlink()
+            self.catalog.invalidate(filepath, dir_mtime_ns=dir_mtime_ns)
+            self.search_index.schedule_remove(filepath)
             return True
         except Exception as e:
             print(f"Ошибка удаления документа: {e}")
@@ -77,115 +158,526 @@ class DocumentManager:
             if new_path.exists():
                 return None
 
+            dir_mtime_ns = self.catalog.dir_mtime()
             old_path_obj.rename(new_path)
+            self.backups.rename_key(self._backup_key(str(old_path_obj)),
+                                    self._backup_key(str(new_path)))
+            self.history.rename_key(self._backup_key(str(old_path_obj)),
+                                    self._backup_key(str(new_path)))
+            self.catalog.invalidate(str(old_path_obj), str(new_path),
+                                    dir_mtime_ns=dir_mtime_ns)
+            self.search_index.schedule_rename(str(old_path_obj), str(new_path))
             return str(new_path)
         except Exception as e:
             print(f"Ошибка переименования: {e}")
             return None
 
-    def list_documents(self) -> List[Dict]:
-        """Список всех документов"""
-        docs = []
-
-        for filepath in glob.glob(str(self.docs_dir / "*.txt")):
+    def replace_in_documents(self, engine: ReplaceEngine, filepaths: Optional[List[str]] = None,
+                             dry_run: bool = False,
+                             progress: Optional[Callable[[int, int, str], None]] = None,
+                             cancel: Optional[threading.Event] = None) -> Dict[str, int]:
+        """Замена во всех документах (или в filepaths) без загрузки их в память
+
+        Возвращает число совпадений по документам, где они есть; dry_run -
+        только подсчет. progress(номер, всего, путь) вызывается перед
+        каждым файлом. Прерывание (cancel) останавливает обработку,
+        уже замененные документы остаются замененными.
+        """
+        if filepaths is None:
+            filepaths = [doc["path"] for doc in self.list_documents()]
+
+        counts = {}
+        for i, filepath in enumerate(filepaths):
+            if cancel is not None and cancel.is_set():
+                break
+            if progress is not None:
+                progress(i, len(filepaths), filepath)
             try:
-                stat = Path(filepath).stat()
-                docs.append({
-                    "path": filepath,
-                    "name": Path(filepath).name,
-                    "size": stat.st_size,
-                    "created": datetime.fromtimestamp(stat.st_ctime),
-                    "modified": datetime.fromtimestamp(stat.st_mtime)
-                })
+                if dry_run:
+                    found = engine.count_file(filepath, cancel)
+                else:
+                    with self._save_lock:
+                        self._create_backup(filepath)
+                        dir_mtime_ns = self.catalog.dir_mtime()
+                        found = engine.replace_file(filepath, cancel)
+                        if found:
+                            self._record_version(filepath)
+                            self.catalog.invalidate(filepath, dir_mtime_ns=dir_mtime_ns)
+                            self.search_index.schedule_update(filepath)
             except Exception as e:
-                print(f"Ошибка получения информации о файле {filepath}: {e}")
+                print(f"Ошибка замены в документе {filepath}: {e}")
+                continue
+            if found:
+                counts[filepath] = found
+        return counts
 
-        # Сортируем по дате изменения
-        docs.sort(key=lambda x: x["modified"], reverse=True)
-        return docs
+    def list_documents(self) -> List[Dict]:
+        """Список всех документов (отсортирован по дате изменения)"""
+        return self.catalog.list_documents()
 
     def get_document_stats(self) -> Dict:
         """Статистика по документам"""
-        docs = self.list_documents()
-        total_size = sum(doc["size"] for doc in docs)
+        return self.catalog.stats()
 
-        return {
-            "count": len(docs),
-            "total_size": total_size,
-            "avg_size": total_size // len(docs) if docs else 0,
-            "oldest": docs[-1]["modified"] if docs else None,
-            "newest": docs[0]["modified"] if docs else None
-        }
+    def search_documents(self, query: str, limit: int = 50) -> List[Dict]:
+        """Полнотекстовый поиск по всем документам"""
+        return self.search_index.search(query, limit)
+
+    def _backup_key(self, filepath: str) -> str:
+        """Ключ документа в хранилище резервных копий"""
+        path = Path(filepath)
+        if path.parent.resolve() == self.docs_dir.resolve():
+            return f"documents/{path.name}"
+        return f"documents/{path.resolve()}"
+
+    def _create_backup(self, filepath: str) -> Optional[int]:
+        """Создание резервной копии (без изменений файла - бесплатно)"""
+        try:
+            return self.backups.backup_file(self._backup_key(filepath), filepath)
+        except Exception as e:
+            print(f"Ошибка создания резервной копии: {e}")
+            return None
 
-    def _create_backup(self, filepath: str):
-        """Создание резервной копии"""
-        backup_dir = AppPaths.BACKUPS_DIR / "documents"
-        backup_dir.mkdir(exist_ok=True)
+    def _record_version(self, filepath: str, content: Optional[str] = None):
+        """Запись сохраненного текста в историю версий"""
+        try:
+            if content is None:
+                if Path(filepath).stat().st_size > AppConfig.HISTORY_MAX_SIZE:
+                    return
+                with open(filepath, 'r', encoding='utf-8', newline='') as f:
+                    content = f.read()
+            elif len(content) > AppConfig.HISTORY_MAX_SIZE:
+                return
+            self.history.record(self._backup_key(filepath), content)
+        except Exception as e:
+            print(f"Ошибка записи истории версий: {e}")
+
+    def list_versions(self, filepath: str) -> List[Dict]:
+        """История сохранений документа (новые первыми)"""
+        return self.history.versions(self._backup_key(filepath))
 
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = Path(filepath).name
-        backup_file = backup_dir / f"{filename}.backup_{timestamp}"
+    def read_version(self, version_id: int) -> Optional[str]:
+        """Текст версии из истории"""
+        return self.history.read(version_id)
 
-        shutil.copy2(filepath, backup_file)
+    def diff_versions(self, old_id: int, new_id: int) -> List[str]:
+        """Разница двух версий (unified diff)"""
+        return self.history.diff(old_id, new_id)
+
+    def restore_version(self, filepath: str, version_id: int) -> bool:
+        """Возврат документа к версии из истории (как новое сохранение)"""
+        content = self.history.read(version_id)
+        if content is None:
+            return False
+        return self.save_document(filepath, content)
 
-        # Удаляем старые бэкапы
-        self._cleanup_old_backups(backup_dir)
+    def list_backups(self, filepath: str) -> List[Dict]:
+        """Сохраненные версии документа (новые первыми)"""
+        return self.backups.versions(self._backup_key(filepath))
 
-    def _cleanup_old_backups(self, backup_dir: Path, keep_count: int = 10):
-        """Очистка старых резервных копий"""
-        backups = sorted(backup_dir.glob("*.backup_*"))
+    def read_backup(self, version_id: int) -> Optional[str]:
+        """Текст сохраненной версии"""
+        data = self.backups.read_version(version_id)
+        return None if data is None else data.decode('utf-8', errors='replace')
 
-        if len(backups) > keep_count:
-            for backup in backups[:-keep_count]:
-                backup.unlink()
+    def restore_backup(self, filepath: str, version_id: int) -> bool:
+        """Восстановление документа из версии (текущий текст тоже сохраняется)"""
+        content = self.read_backup(version_id)
+        if content is None:
+            return False
+        return self.save_document(filepath, content)
+
+
+class _Piece:
+    """Узел дерева кусков (декартово дерево по неявному ключу)
+
+    Узлы не меняются после создания: правка строит новые узлы только на
+    пути от корня, остальное дерево общее со старой версией. Поэтому
+    снимок - это просто ссылка на корень.
+    """
+
+    __slots__ = ('text', 'start', 'length', 'newlines', 'priority',
+                 'left', 'right', 'size', 'lines')
+
+    def __init__(self, text: str, start: int, length: int, newlines: int, priority: float,
+                 left: Optional['_Piece'] = None, right: Optional['_Piece'] = None):
+        self.text = text  # строка, часть которой [start, start + length) - этот кусок
+        self.start = start
+        self.length = length
+        self.newlines = newlines
+        self.priority = priority
+        self.left = left
+        self.right = right
+        # Суммы по поддереву
+        self.size = length + (left.size if left else 0) + (right.size if right else 0)
+        self.lines = newlines + (left.lines if left else 0) + (right.lines if right else 0)
+
+    def with_children(self, left: Optional['_Piece'], right: Optional['_Piece']) -> '_Piece':
+        return _Piece(self.text, self.start, self.length, self.newlines, self.priority,
+                      left, right)
+
+
+def _merge(left: Optional[_Piece], right: Optional[_Piece]) -> Optional[_Piece]:
+    """Склейка двух деревьев (весь left - перед right)"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return left.with_children(left.left, _merge(left.right, right))
+    return right.with_children(_merge(left, right.left), right.right)
+
+
+def _split(node: Optional[_Piece], offset: int) -> Tuple[Optional[_Piece], Optional[_Piece]]:
+    """Разрезание дерева: (первые offset символов, остальное)"""
+    if node is None:
+        return None, None
+    left_size = node.left.size if node.left else 0
+    if offset <= left_size:
+        left, right = _split(node.left, offset)
+        return left, node.with_children(right, node.right)
+    offset -= left_size
+    if offset >= node.length:
+        left, right = _split(node.right, offset - node.length)
+        return node.with_children(node.left, left), right
+
+    # Разрез внутри куска: обе половины ссылаются на ту же строку
+    newlines = node.text.count('\n', node.start, node.start + offset)
+    head = _Piece(node.text, node.start, offset, newlines, node.priority, node.left)
+    tail = _Piece(node.text, node.start + offset, node.length - offset,
+                  node.newlines - newlines, node.priority, None, node.right)
+    return head, tail
+
+
+def _build(text: str, piece_size: int) -> Optional[_Piece]:
+    """Дерево из строки: куски не длиннее piece_size, строка не копируется"""
+    root = None
+    for start in range(0, len(text), piece_size):
+        length = min(piece_size, len(text) - start)
+        root = _merge(root, _Piece(text, start, length,
+                                   text.count('\n', start, start + length), random.random()))
+    return root
+
+
+class TextSnapshot:
+    """Неизменяемый вид текста документа
+
+    Снимок получается за O(1) и не меняется при дальнейших правках,
+    поэтому его можно отдать фоновому потоку (сохранение, поиск,
+    статистика). Строки нумеруются с 0, смещения - в символах.
+    """
+
+    def __init__(self, root: Optional[_Piece] = None):
+        self.root = root
+
+    def __len__(self) -> int:
+        return self.root.size if self.root else 0
+
+    @property
+    def line_count(self) -> int:
+        return (self.root.lines if self.root else 0) + 1
+
+    def chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Текст [start, end) кусками, без склейки в одну строку"""
+        end = len(self) if end is None else min(end, len(self))
+        stack = []
+        node, base = self.root, 0  # base - смещение начала поддерева node
+        while stack or node is not None:
+            # Спуск к первому куску, который может пересекать [start, end)
+            while node is not None:
+                stack.append((node, base))
+                node_start = base + (node.left.size if node.left else 0)
+                node = node.left if start < node_start else None
+            node, base = stack.pop()
+            node_start = base + (node.left.size if node.left else 0)
+            node_end = node_start + node.length
+            if node_start >= end:
+                return
+            if node_end > start:
+                yield node.text[node.start + max(start, node_start) - node_start:
+                                node.start + min(end, node_end) - node_start]
+            node, base = node.right, node_end
+
+    def get(self, start: int = 0, end: Optional[int] = None) -> str:
+        return "".join(self.chunks(start, end))
+
+    def text(self) -> str:
+        """Весь текст одной строкой (копия - только там, где она нужна)"""
+        return self.get()
+
+    def line_start(self, line: int) -> int:
+        """Смещение начала строки line"""
+        if line <= 0:
+            return 0
+        node, base, newline = self.root, 0, line  # ищем newline-й перевод строки
+        while node is not None:
+            left_lines = node.left.lines if node.left else 0
+            if newline <= left_lines:
+                node = node.left
+                continue
+            newline -= left_lines
+            base += node.left.size if node.left else 0
+            if newline <= node.newlines:
+                position = node.start - 1
+                for _ in range(newline):
+                    position = node.text.find('\n', position + 1)
+                return base + position - node.start + 1
+            newline -= node.newlines
+            base += node.length
+            node = node.right
+        raise IndexError(f"нет строки {line}")
+
+    def line_of(self, offset: int) -> int:
+        """Номер строки, в которой находится смещение"""
+        node, line = self.root, 0
+        while node is not None:
+            left_size = node.left.size if node.left else 0
+            if offset <= left_size:
+                node = node.left
+                continue
+            line += node.left.lines if node.left else 0
+            offset -= left_size
+            if offset <= node.length:
+                return line + node.text.count('\n', node.start, node.start + offset)
+            line += node.newlines
+            offset -= node.length
+            node = node.right
+        return line
+
+    def offset(self, line: int, column: int) -> int:
+        """Индекс Tk (строка с 1, столбец) -> смещение"""
+        return self.line_start(line - 1) + column
+
+    def index(self, offset: int) -> Tuple[int, int]:
+        """Смещение -> индекс Tk (строка с 1, столбец)"""
+        line = self.line_of(offset)
+        return line + 1, offset - self.line_start(line)
+
+    def lines(self, first: int, count: int) -> List[str]:
+        """Текст строк [first, first + count) без переводов строки"""
+        end = first + count
+        stop = self.line_start(end) - 1 if end < self.line_count else len(self)
+        return self.get(self.line_start(first), stop).split('\n')
+
+
+class PieceTable(TextSnapshot):
+    """Текст документа - источник истины для редактора
+
+    Текст хранится кусками строк в сбалансированном (декартовом) дереве
+    с длиной и числом переводов строки в каждом поддереве, поэтому
+    вставка, удаление и переход между смещением и строкой стоят
+    O(log n) плюс просмотр одного куска (не длиннее piece_size).
+    Дерево неизменяемое, так что snapshot() бесплатен.
+
+    После каждой правки подписчики получают событие
+        ("insert", смещение, текст, источник)
+        ("delete", смещение, удаленный текст, источник)
+    где источник - то, что передал вызывающий (например, текстовое
+    поле, из которого пришла правка, чтобы не применять ее повторно).
+    """
+
+    # Подряд вставленные короткие куски (набор с клавиатуры) склеиваются,
+    # чтобы дерево не росло на узел с каждым символом
+    APPEND_LIMIT = 256
+
+    def __init__(self, text: str = "", piece_size: int = AppConfig.PIECE_SIZE):
+        self.piece_size = piece_size
+        super().__init__(_build(text, piece_size))
+        self.listeners: List[Callable[[tuple], None]] = []
+
+    def add_listener(self, callback: Callable[[tuple], None]):
+        """Подписка на правки"""
+        self.listeners.append(callback)
+
+    def _notify(self, event: tuple):
+        for callback in self.listeners:
+            callback(event)
+
+    def snapshot(self) -> TextSnapshot:
+        return TextSnapshot(self.root)
+
+    def insert(self, offset: int, text: str, origin=None):
+        if not text:
+            return
+        if not 0 <= offset <= len(self):
+            raise IndexError(f"смещение {offset} вне текста")
+        head, tail = _split(self.root, offset)
+
+        # Продолжение набора: дописываем к последнему короткому куску
+        last = head
+        while last is not None and last.right is not None:
+            last = last.right
+        if last is not None and last.length == len(last.text) and \
+                last.length + len(text) <= self.APPEND_LIMIT:
+            head = _split(head, head.size - last.length)[0]
+            middle = _build(last.text + text, self.piece_size)
+        else:
+            middle = _build(text, self.piece_size)
+
+        self.root = _merge(_merge(head, middle), tail)
+        self._notify(("insert", offset, text, origin))
+
+    def delete(self, start: int, end: int, origin=None) -> str:
+        """Удаление [start, end); возвращает удаленный текст"""
+        start, end = max(0, start), min(end, len(self))
+        if start >= end:
+            return ""
+        head, tail = _split(self.root, end)
+        head, middle = _split(head, start)
+        deleted = TextSnapshot(middle).text()
+        self.root = _merge(head, tail)
+        self._notify(("delete", start, deleted, origin))
+        return deleted
+
+    def replace(self, start: int, end: int, text: str, origin=None):
+        self.delete(start, end, origin)
+        self.insert(start, text, origin)
+
+    def set_text(self, text: str, origin=None):
+        """Замена всего текста"""
+        self.replace(0, len(self), text, origin)
+
+
+class LineStats:
+    """Построчная статистика буфера для строки состояния
+
+    Для каждой строки хранится число слов и символов, поэтому правка
+    пересчитывает только затронутые строки. Слова не переходят через
+    перевод строки, так что сумма по строкам совпадает с len(text.split()).
+    """
+
+    def __init__(self, text: str = ""):
+        self.reset(text)
+
+    def reset(self, text: str):
+        """Полный пересчет (загрузка документа)"""
+        self.line_words = array('l', [0])
+        self.line_chars = array('l', [0])
+        self.words = 0
+        self.line_chars_total = 0
+        self.splice(0, 1, text.split('\n'))
+
+    @property
+    def lines(self) -> int:
+        return len(self.line_words)
+
+    @property
+    def characters(self) -> int:
+        return self.line_chars_total + self.lines - 1
+
+    def splice(self, first: int, count: int, new_lines: List[str]):
+        """Замена строк [first, first + count) на new_lines (нумерация с 0)"""
+        end = first + count
+        self.words -= sum(self.line_words[first:end])
+        self.line_chars_total -= sum(self.line_chars[first:end])
+
+        words = array('l', [len(line.split()) for line in new_lines])
+        chars = array('l', [len(line) for line in new_lines])
+        self.line_words[first:end] = words
+        self.line_chars[first:end] = chars
+
+        self.words += sum(words)
+        self.line_chars_total += sum(chars)
+
+
+class TextStatsAccumulator:
+    """Потоковый подсчет статистики текста
+
+    Текст подается кусками через feed(); на каждый кусок приходится
+    один проход встроенными методами str, поэтому пиковая память
+    определяется размером куска, а не документа. Слова и группы знаков
+    препинания, разрезанные границей кусков, учитываются один раз.
+    """
+
+    SENTENCE_END_RE = re.compile(r'[.!?]+')
+    SENTENCE_END_CHARS = '.!?'
+
+    def __init__(self):
+        self.characters = 0
+        self.newlines = 0
+        self.spaces = 0
+        self.words = 0
+        self.word_chars = 0
+        self.sentence_breaks = 0
+        self._last_char = ''
+
+    def feed(self, chunk: str):
+        """Учет очередного куска текста"""
+        if not chunk:
+            return
+
+        self.characters += len(chunk)
+        self.newlines += chunk.count('\n')
+        self.spaces += chunk.count(' ')
+
+        words = chunk.split()
+        self.words += len(words)
+        self.word_chars += sum(map(len, words))
+        self.sentence_breaks += len(self.SENTENCE_END_RE.findall(chunk))
+
+        # Склейка на границе с предыдущим куском
+        first, last = chunk[0], self._last_char
+        if last and not last.isspace() and not first.isspace():
+            self.words -= 1
+        if last and last in self.SENTENCE_END_CHARS and first in self.SENTENCE_END_CHARS:
+            self.sentence_breaks -= 1
+
+        self._last_char = chunk[-1]
+
+    def result(self) -> Dict:
+        """Итоговая статистика (совпадает с прежним analyze_text)"""
+        lines = self.newlines + 1
+        return {
+            "characters": self.characters,
+            "words": self.words,
+            "lines": lines,
+            "spaces": self.spaces,
+            "sentences": self.sentence_breaks + 1,
+            "avg_word_length": self.word_chars / self.words if self.words else 0,
+            "avg_line_length": (self.characters - self.newlines) / lines
+        }
 
 
 class TextAnalyzer:
     """Анализ текста"""
 
     @staticmethod
-    def analyze_text(text: str) -> Dict:
+    def analyze_text(text: str, chunk_size: int = AppConfig.ANALYZE_CHUNK_SIZE) -> Dict:
         """Анализ текста"""
-        words = text.split()
-        lines = text.split('\n')
+        return TextAnalyzer.analyze_chunks(
+            text[i:i + chunk_size] for i in range(0, len(text), chunk_size)
+        )
 
-        return {
-            "characters": len(text),
-            "words": len(words),
-            "lines": len(lines),
-            "spaces": text.count(' '),
-            "sentences": len(re.split(r'[.!?]+', text)),
-            "avg_word_length": sum(len(word) for word in words) / len(words) if words else 0,
-            "avg_line_length": sum(len(line) for line in lines) / len(lines) if lines else 0
-        }
+    @staticmethod
+    def analyze_chunks(chunks: Iterable[str]) -> Dict:
+        """Анализ текста, поданного кусками"""
+        stats = TextStatsAccumulator()
+        for chunk in chunks:
+            stats.feed(chunk)
+        return stats.result()
 
     @staticmethod
-    def find_text(text: str, search_term: str, case_sensitive: bool = False) -> List[Tuple[int, int]]:
-        """Поиск текста"""
-        if not case_sensitive:
-            text = text.lower()
-            search_term = search_term.lower()
-
-        positions = []
-        start = 0
-
-        while True:
-            pos = text.find(search_term, start)
-            if pos == -1:
-                break
-            positions.append((pos, pos + len(search_term)))
-            start = pos + 1
+    def analyze_file(filepath: str, chunk_size: int = AppConfig.ANALYZE_CHUNK_SIZE) -> Dict:
+        """Анализ файла без загрузки его целиком в память"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return TextAnalyzer.analyze_chunks(iter(lambda: f.read(chunk_size), ''))
+
+    @staticmethod
+    def find_text(text: str, search_term: Union[str, Iterable[str]], case_sensitive: bool = False,
+                  regex: bool = False, whole_word: bool = False) -> List[Tuple[int, int]]:
+        """Поиск текста: (начало, конец) всех вхождений одного или нескольких терминов
 
-        return positions
+        Для больших результатов удобнее SearchEngine.search: позиции в array('q').
+        """
+        engine = SearchEngine(search_term, regex=regex, whole_word=whole_word,
+                              case_sensitive=case_sensitive)
+        return engine.search(text).pairs()
 
     @staticmethod
     def replace_text(text: str, old_text: str, new_text: str,
-                     case_sensitive: bool = False, count: int = -1) -> str:
-        """Замена текста"""
-        if not case_sensitive:
-            # Используем регулярное выражение с флагом игнорирования регистра
-            pattern = re.compile(re.escape(old_text), re.IGNORECASE)
-            result, replacements = pattern.subn(new_text, text, count)
-            return result
-        else:
-            return text.replace(old_text, new_text, count)
\ No newline at end of file
+                     case_sensitive: bool = False, count: int = -1,
+                     regex: bool = False, whole_word: bool = False) -> str:
+        """Замена текста (count < 0 - все вхождения)"""
+        engine = ReplaceEngine(old_text, new_text, regex=regex, whole_word=whole_word,
+                               case_sensitive=case_sensitive)
+        return engine.replace(text, count)[0]
@@ -0,0 +1,222 @@
+"""
+Алгоритмы хеширования паролей
+
+Формат хеша: $<алгоритм>$<параметры>$<соль hex>$<хеш hex>, например
+$pbkdf2-sha256$i=100000$9f...$4a... Старый формат salt$iterations$hash
+(PBKDF2-SHA256, соль - hex-строка в UTF-8) по-прежнему проверяется
+и считается устаревшим.
+"""
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from config import AppPaths, AppConfig
+
+
+class HashAlgorithm(ABC):
+    """Базовый класс алгоритма хеширования
+
+    min_params - рекомендуемый минимум стоимости. Калибровка его не
+    навязывает (можно выбрать более быстрый вход), но калибровка ниже
+    минимума сопровождается предупреждением.
+    """
+
+    name = ""
+    default_params: Dict[str, int] = {}
+    min_params: Dict[str, int] = {}
+
+    @abstractmethod
+    def derive(self, password: bytes, salt: bytes, params: Dict[str, int]) -> bytes:
+        """Вычисление хеша"""
+
+    @abstractmethod
+    def calibrate(self, target_ms: float) -> Dict[str, int]:
+        """Подбор параметров под целевое время хеширования"""
+
+    def below_minimum(self, params: Dict[str, int]) -> bool:
+        """Параметры слабее рекомендуемого минимума"""
+        return any(params.get(key, value) < value for key, value in self.min_params.items())
+
+    def _measure(self, params: Dict[str, int]) -> float:
+        """Время одного хеширования в миллисекундах"""
+        start = time.perf_counter()
+        self.derive(b"calibration", b"0" * 16, params)
+        return (time.perf_counter() - start) * 1000
+
+
+class Pbkdf2Sha256(HashAlgorithm):
+    """PBKDF2-HMAC-SHA256"""
+
+    name = "pbkdf2-sha256"
+    default_params = {"i": 100000}
+    min_params = {"i": 100000}
+
+    def derive(self, password: bytes, salt: bytes, params: Dict[str, int]) -> bytes:
+        return hashlib.pbkdf2_hmac('sha256', password, salt, params["i"])
+
+    def calibrate(self, target_ms: float) -> Dict[str, int]:
+        # Время растет линейно с числом итераций
+        probe = 20000
+        elapsed = max(self._measure({"i": probe}), 0.001)
+        return {"i": max(1, int(probe * target_ms / elapsed))}
+
+
+class Scrypt(HashAlgorithm):
+    """scrypt (hashlib.scrypt)"""
+
+    name = "scrypt"
+    default_params = {"n": 2 ** 14, "r": 8, "p": 1}
+    min_params = {"n": 2 ** 14, "r": 8, "p": 1}
+
+    def derive(self, password: bytes, salt: bytes, params: Dict[str, int]) -> bytes:
+        n, r, p = params["n"], params["r"], params["p"]
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def calibrate(self, target_ms: float) -> Dict[str, int]:
+        # n - степень двойки; удваиваем, пока не достигнем целевого времени
+        params = dict(self.default_params, n=2 ** 10)
+        while self._measure(params) < target_ms and params["n"] < 2 ** 20:
+            params["n"] *= 2
+        return params
+
+
+ALGORITHMS: Dict[str, HashAlgorithm] = {}
+
+
+def register_algorithm(algorithm: HashAlgorithm):
+    """Регистрация алгоритма хеширования"""
+    ALGORITHMS[algorithm.name] = algorithm
+
+
+register_algorithm(Pbkdf2Sha256())
+register_algorithm(Scrypt())
+
+
+class HashPolicy:
+    """Алгоритм и параметры стоимости для данной установки
+
+    Хранится в data/hashing.json; параметры подбираются calibrate().
+    """
+
+    def __init__(self, algorithm: str, params: Dict[str, Dict[str, int]]):
+        self.algorithm = algorithm
+        self.params = params
+
+    @property
+    def policy_file(self):
+        return AppPaths.DATA_DIR / "hashing.json"
+
+    def params_for(self, algorithm: str) -> Dict[str, int]:
+        return self.params.get(algorithm) or dict(ALGORITHMS[algorithm].default_params)
+
+    @classmethod
+    def load(cls) -> "HashPolicy":
+        policy = cls(AppConfig.HASH_ALGORITHM, {})
+        if policy.policy_file.exists():
+            try:
+                with open(policy.policy_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                policy.algorithm = data.get("algorithm", policy.algorithm)
+                policy.params = data.get("params", {})
+            except Exception as e:
+                print(f"Ошибка загрузки параметров хеширования: {e}")
+        return policy
+
+    def save(self):
+        with open(self.policy_file, 'w', encoding='utf-8') as f:
+            json.dump({"algorithm": self.algorithm, "params": self.params},
+                      f, indent=4, ensure_ascii=False)
+
+    def calibrate(self, target_ms: float = AppConfig.HASH_TARGET_MS,
+                  algorithm: Optional[str] = None) -> Dict[str, int]:
+        """Подбор и сохранение параметров под целевую задержку входа"""
+        if algorithm is not None:
+            self.algorithm = algorithm
+        params = ALGORITHMS[self.algorithm].calibrate(target_ms)
+        self.params[self.algorithm] = params
+        self.save()
+        return params
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> HashPolicy:
+    """Текущая политика хеширования (читается один раз)"""
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = HashPolicy.load()
+    return _policy
+
+
+def _format_params(params: Dict[str, int]) -> str:
+    return ",".join(f"{key}={value}" for key, value in sorted(params.items()))
+
+
+def _parse(hashed_password: str) -> Tuple[str, Dict[str, int], bytes, bytes]:
+    """Разбор хеша в (алгоритм, параметры, соль, хеш)"""
+    if hashed_password.startswith("$"):
+        _, name, params_str, salt_hex, hash_hex = hashed_password.split("$")
+        params = {key: int(value) for key, value in
+                  (item.split("=") for item in params_str.split(","))}
+        return name, params, bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+
+    # Старый формат: соль используется как текст
+    salt, iterations, stored_hash = hashed_password.split("$")
+    return "legacy", {"i": int(iterations)}, salt.encode('utf-8'), bytes.fromhex(stored_hash)
+
+
+def hash_password(password: str, policy: Optional[HashPolicy] = None) -> str:
+    """Хеширование пароля по текущей политике"""
+    policy = policy or get_policy()
+    algorithm = ALGORITHMS[policy.algorithm]
+    params = policy.params_for(algorithm.name)
+    salt = secrets.token_bytes(16)
+    dk = algorithm.derive(password.encode('utf-8'), salt, params)
+    return f"${algorithm.name}${_format_params(params)}${salt.hex()}${dk.hex()}"
+
+
+def verify_password(hashed_password: str, provided_password: str) -> bool:
+    """Проверка пароля со сравнением за постоянное время"""
+    try:
+        name, params, salt, stored = _parse(hashed_password)
+        algorithm = ALGORITHMS["pbkdf2-sha256" if name == "legacy" else name]
+        dk = algorithm.derive(provided_password.encode('utf-8'), salt, params)
+        return hmac.compare_digest(dk, stored)
+    except Exception:
+        return False
+
+
+def needs_rehash(hashed_password: str, policy: Optional[HashPolicy] = None) -> bool:
+    """Хеш создан устаревшим алгоритмом или с другими параметрами"""
+    policy = policy or get_policy()
+    try:
+        name, params, _, _ = _parse(hashed_password)
+    except Exception:
+        return True
+    return name != policy.algorithm or params != policy.params_for(name)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Калибровка хеширования паролей")
+    parser.add_argument("--target-ms", type=float, default=AppConfig.HASH_TARGET_MS)
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS))
+    args = parser.parse_args()
+
+    result = get_policy().calibrate(args.target_ms, args.algorithm)
+    algorithm = ALGORITHMS[get_policy().algorithm]
+    print(f"{algorithm.name}: {_format_params(result)}")
+    if algorithm.below_minimum(result):
+        print(f"Внимание: параметры ниже рекомендуемого минимума "
+              f"({_format_params(algorithm.min_params)}) - пароли будет проще подобрать")
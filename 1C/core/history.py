@@ -0,0 +1,249 @@
+"""
+История версий документов
+"""
+import difflib
+import json
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import AppPaths, AppConfig
+from core.storage import SqliteDatabase
+
+
+def line_delta(old: List[str], new: List[str]) -> Optional[list]:
+    """Разница между списками строк: [начало, конец] - строки старой
+    версии, строка - вставленный текст
+
+    Общие начало и конец отсекаются сразу, так что сравнивается только
+    измененная середина. None - если середина слишком велика для
+    сравнения (выгоднее сохранить версию целиком).
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    if min(len(old_mid), len(new_mid)) > AppConfig.HISTORY_DIFF_LIMIT:
+        return None
+
+    ops = []
+    if prefix:
+        ops.append([0, prefix])
+
+    matcher = difflib.SequenceMatcher(None, old_mid, new_mid)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([prefix + i1, prefix + i2])
+        elif j2 > j1:
+            ops.append("".join(new_mid[j1:j2]))
+
+    if suffix:
+        ops.append([len(old) - suffix, len(old)])
+    return ops
+
+
+def apply_delta(old: List[str], ops: list) -> List[str]:
+    """Восстановление новой версии из старой и разницы"""
+    new = []
+    for op in ops:
+        if isinstance(op, str):
+            new.extend(op.splitlines(keepends=True))
+        else:
+            new.extend(old[op[0]:op[1]])
+    return new
+
+
+class VersionHistory:
+    """История сохранений документов
+
+    Каждое сохранение записывается как построчная разница с предыдущей
+    версией, а через каждые HISTORY_KEYFRAME_INTERVAL версий (или когда
+    разница оказывается не меньше половины текста) - целиком. Любая
+    версия восстанавливается из ближайшего полного снимка применением
+    не более чем интервала разниц. Последняя версия каждого недавно
+    сохраненного документа держится в памяти для вычисления разницы.
+    """
+
+    CACHE_SIZE = 4
+
+    def __init__(self, db: Optional[SqliteDatabase] = None,
+                 keyframe_interval: int = AppConfig.HISTORY_KEYFRAME_INTERVAL,
+                 max_versions: int = AppConfig.HISTORY_MAX_VERSIONS):
+        self.db = db or SqliteDatabase.open(AppPaths.BACKUPS_DIR / AppConfig.BACKUP_DB)
+        self.keyframe_interval = keyframe_interval
+        self.max_versions = max_versions
+
+        # key -> (id последней версии, ее строки)
+        self._tips: "OrderedDict[str, tuple]" = OrderedDict()
+
+        with self.db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    lines INTEGER NOT NULL,
+                    keyframe INTEGER NOT NULL,
+                    base INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_key "
+                         "ON history_versions(key, id)")
+
+    # --- Запись ---
+
+    def record(self, key: str, text: str) -> int:
+        """Новая версия документа; без изменений - id последней"""
+        lines = text.splitlines(keepends=True)
+        tip = self._tip(key)
+
+        if tip is not None and tip[1] == lines:
+            return tip[0]
+
+        with self.db.transaction() as conn:
+            last = conn.execute(
+                "SELECT id, base, (SELECT COUNT(*) FROM history_versions v "
+                "WHERE v.key = h.key AND v.id > h.base) AS since_keyframe "
+                "FROM history_versions h WHERE key = ? ORDER BY id DESC LIMIT 1",
+                (key,)).fetchone()
+
+            # Версию мог добавить другой процесс - тогда разница считается от нее
+            if last is not None and (tip is None or tip[0] != last["id"]):
+                tip = (last["id"], self._lines(last["id"]))
+
+            ops = None
+            if tip is not None and last["since_keyframe"] < self.keyframe_interval:
+                ops = line_delta(tip[1], lines)
+                payload = json.dumps(ops, ensure_ascii=False) if ops is not None else None
+                # Разница размером с сам текст выгоднее снимка не будет
+                if payload is not None and len(payload) * 2 > len(text):
+                    ops = None
+
+            if ops is None:
+                data, keyframe = text, 1
+            else:
+                data, keyframe = payload, 0
+
+            version_id = conn.execute(
+                "INSERT INTO history_versions (key, created, size, lines, keyframe, base, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, time.time(), len(text), len(lines), keyframe,
+                 last["base"] if not keyframe else 0,
+                 zlib.compress(data.encode('utf-8'), AppConfig.BACKUP_COMPRESS_LEVEL))
+            ).lastrowid
+            if keyframe:
+                conn.execute("UPDATE history_versions SET base = id WHERE id = ?", (version_id,))
+
+        self._remember(key, version_id, lines)
+        self.prune(key)
+        return version_id
+
+    def _tip(self, key: str) -> Optional[tuple]:
+        """Последняя версия ключа (id, строки) - из памяти или из базы"""
+        if key in self._tips:
+            self._tips.move_to_end(key)
+            return self._tips[key]
+
+        rows = self.db.query(
+            "SELECT id FROM history_versions WHERE key = ? ORDER BY id DESC LIMIT 1", (key,))
+        if not rows:
+            return None
+
+        tip = (rows[0]["id"], self._lines(rows[0]["id"]))
+        self._remember(key, *tip)
+        return tip
+
+    def _remember(self, key: str, version_id: int, lines: List[str]):
+        self._tips[key] = (version_id, lines)
+        self._tips.move_to_end(key)
+        while len(self._tips) > self.CACHE_SIZE:
+            self._tips.popitem(last=False)
+
+    # --- Чтение ---
+
+    def versions(self, key: str) -> List[Dict]:
+        """Версии документа (новые первыми)"""
+        return [{
+            "id": row["id"],
+            "created": datetime.fromtimestamp(row["created"]),
+            "size": row["size"],
+            "lines": row["lines"],
+            "keyframe": bool(row["keyframe"])
+        } for row in self.db.query(
+            "SELECT id, created, size, lines, keyframe FROM history_versions "
+            "WHERE key = ? ORDER BY id DESC", (key,))]
+
+    def _lines(self, version_id: int) -> Optional[List[str]]:
+        """Строки версии: ближайший снимок + разницы после него"""
+        rows = self.db.query("SELECT key, base FROM history_versions WHERE id = ?",
+                             (version_id,))
+        if not rows:
+            return None
+
+        lines: List[str] = []
+        for row in self.db.query(
+                "SELECT keyframe, data FROM history_versions "
+                "WHERE key = ? AND id BETWEEN ? AND ? ORDER BY id",
+                (rows[0]["key"], rows[0]["base"], version_id)):
+            data = zlib.decompress(row["data"]).decode('utf-8')
+            if row["keyframe"]:
+                lines = data.splitlines(keepends=True)
+            else:
+                lines = apply_delta(lines, json.loads(data))
+        return lines
+
+    def read(self, version_id: int) -> Optional[str]:
+        """Текст версии"""
+        lines = self._lines(version_id)
+        return None if lines is None else "".join(lines)
+
+    def diff(self, old_id: int, new_id: int, context: int = 3) -> List[str]:
+        """Построчная разница двух версий (unified diff)"""
+        old, new = self._lines(old_id) or [], self._lines(new_id) or []
+        return list(difflib.unified_diff(old, new, f"версия {old_id}", f"версия {new_id}",
+                                         n=context))
+
+    # --- Обслуживание ---
+
+    def rename_key(self, old_key: str, new_key: str):
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE history_versions SET key = ? WHERE key = ?", (new_key, old_key))
+        if old_key in self._tips:
+            self._tips[new_key] = self._tips.pop(old_key)
+
+    def prune(self, key: str) -> int:
+        """Удаление старых версий сверх max_versions
+
+        Версии удаляются целыми отрезками от снимка до следующего снимка,
+        чтобы оставшиеся разницы всегда можно было применить.
+        """
+        keyframes = [row["id"] for row in self.db.query(
+            "SELECT id FROM history_versions WHERE key = ? AND keyframe = 1 ORDER BY id",
+            (key,))]
+        total = self.db.query("SELECT COUNT(*) AS n FROM history_versions WHERE key = ?",
+                              (key,))[0]["n"]
+
+        cut = None
+        for keyframe in keyframes[1:]:
+            older = self.db.query(
+                "SELECT COUNT(*) AS n FROM history_versions WHERE key = ? AND id < ?",
+                (key, keyframe))[0]["n"]
+            if total - older < self.max_versions:
+                break
+            cut = keyframe
+
+        if cut is None:
+            return 0
+        with self.db.transaction() as conn:
+            return conn.execute("DELETE FROM history_versions WHERE key = ? AND id < ?",
+                                (key, cut)).rowcount
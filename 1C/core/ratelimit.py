@@ -0,0 +1,119 @@
+"""
+Ограничение частоты попыток входа
+"""
+import time
+from typing import Dict, List, Optional
+
+from config import AppPaths, AppConfig
+from core.storage import SqliteDatabase
+
+
+class LoginRateLimiter:
+    """Ограничитель попыток входа со скользящим окном
+
+    Счетчик скользящего окна приближается двумя фиксированными окнами:
+    число попыток = текущее окно + предыдущее * доля его перекрытия.
+    Это O(1) на проверку при любом объеме истории. Состояние хранится
+    в SQLite, поэтому несколько процессов редактора на одной машине
+    видят одни и те же счетчики и блокировки.
+    """
+
+    def __init__(self, db: Optional[SqliteDatabase] = None,
+                 max_attempts: Optional[int] = None,
+                 window: Optional[int] = None,
+                 lockout_time: Optional[int] = None,
+                 logger=None):
+        self.db = db or SqliteDatabase.open(AppPaths.DATA_DIR / AppConfig.SQLITE_DB_NAME)
+        # Настройки читаются при создании, а не при импорте модуля
+        self.max_attempts = max_attempts or AppConfig.MAX_LOGIN_ATTEMPTS
+        self.window = window or AppConfig.LOGIN_ATTEMPT_WINDOW
+        self.lockout_time = lockout_time or AppConfig.LOCKOUT_TIME
+
+        with self.db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_windows (
+                    key TEXT NOT NULL,
+                    window INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (key, window)
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_lockouts (
+                    key TEXT PRIMARY KEY,
+                    until REAL NOT NULL
+                )""")
+
+        if logger is not None and self.db.get_meta("rate_limit_rebuilt") is None:
+            self.rebuild(logger.recent_failure_times(self.window * 2))
+
+    def rebuild(self, failures: Dict[str, List[float]]):
+        """Восстановление счетчиков из журнала входов
+
+        failures - время неудачных попыток по ключам (IP); ключи те же,
+        что передаются в record_failure (local_client_address для
+        локального входа и для старых записей "local").
+        """
+        now = time.time()
+        rows = []
+        for key, timestamps in failures.items():
+            counts: Dict[int, int] = {}
+            for ts in timestamps:
+                window = int(ts // self.window)
+                counts[window] = counts.get(window, 0) + 1
+            rows.extend((key, window, count) for window, count in counts.items())
+
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM rate_limit_windows")
+            conn.executemany(
+                "INSERT INTO rate_limit_windows (key, window, count) VALUES (?, ?, ?)", rows
+            )
+            self.db.set_meta(conn, "rate_limit_rebuilt", str(now))
+
+    def _estimate(self, conn, key: str, now: float) -> float:
+        """Оценка числа попыток за последние window секунд"""
+        current = int(now // self.window)
+        counts = {row["window"]: row["count"] for row in conn.execute(
+            "SELECT window, count FROM rate_limit_windows "
+            "WHERE key = ? AND window >= ?", (key, current - 1)
+        )}
+        elapsed = (now % self.window) / self.window
+        return counts.get(current, 0) + counts.get(current - 1, 0) * (1 - elapsed)
+
+    def locked_for(self, key: str) -> float:
+        """Оставшееся время блокировки в секундах (0 - не заблокирован)"""
+        rows = self.db.query("SELECT until FROM rate_limit_lockouts WHERE key = ?", (key,))
+        if not rows:
+            return 0.0
+        return max(0.0, rows[0]["until"] - time.time())
+
+    def record_failure(self, key: str) -> float:
+        """Учет неудачной попытки; возвращает длительность блокировки,
+        если после нее ключ заблокирован"""
+        now = time.time()
+        current = int(now // self.window)
+
+        with self.db.transaction() as conn:
+            # Немедленная блокировка записи: счетчик - общий для процессов
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO rate_limit_windows (key, window, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (key, window) DO UPDATE SET count = count + 1",
+                (key, current)
+            )
+            conn.execute("DELETE FROM rate_limit_windows WHERE key = ? AND window < ?",
+                         (key, current - 1))
+
+            if self._estimate(conn, key, now) >= self.max_attempts:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_lockouts (key, until) VALUES (?, ?)",
+                    (key, now + self.lockout_time)
+                )
+                return float(self.lockout_time)
+
+        return 0.0
+
+    def reset(self, key: str):
+        """Сброс счетчиков и блокировки ключа"""
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM rate_limit_windows WHERE key = ?", (key,))
+            conn.execute("DELETE FROM rate_limit_lockouts WHERE key = ?", (key,))
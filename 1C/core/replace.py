@@ -0,0 +1,269 @@
+"""
+Поиск и замена текста
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import AppConfig
+
+
+def compile_pattern(query: str, regex: bool = False, whole_word: bool = False,
+                    case_sensitive: bool = False) -> re.Pattern:
+    """Шаблон поиска; ошибка в регулярном выражении - re.error"""
+    pattern = query if regex else re.escape(query)
+    if whole_word:
+        pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(pattern, flags)
+
+
+def offsets_to_indices(text: str, offsets: Iterable[int]) -> List[Tuple[int, int]]:
+    """Смещения в тексте -> (строка с 1, столбец) за один проход
+
+    offsets должны идти по возрастанию. Для каждой позиции ищется только
+    следующий перевод строки, поэтому общая стоимость линейна, а не
+    "строка на каждое совпадение", как у индексов вида 1.0+Nc.
+    """
+    result = []
+    line, line_start = 1, 0
+    for offset in offsets:
+        newline = text.find('\n', line_start, offset)
+        while newline != -1:
+            line += 1
+            line_start = newline + 1
+            newline = text.find('\n', line_start, offset)
+        result.append((line, offset - line_start))
+    return result
+
+
+class ReplaceEngine:
+    """Поиск и замена: подстрока или регулярное выражение, с учетом
+    регистра и границ слов
+
+    Один и тот же объект заменяет в строке (replace), строит список
+    точечных правок (edits), ищет в снимке документа окнами (find_all,
+    find, preview) и потоково обрабатывает файлы (replace_stream,
+    replace_file), не загружая их целиком.
+    """
+
+    def __init__(self, query: str, replacement: str = "", regex: bool = False,
+                 whole_word: bool = False, case_sensitive: bool = False):
+        self.query = query
+        self.replacement = replacement
+        self.regex = regex
+        self.pattern = compile_pattern(query, regex, whole_word, case_sensitive)
+
+        # Проверка ссылок на группы в замене (\1, \g<name>) - сразу, а не на
+        # первом совпадении
+        if regex:
+            re.compile(self.pattern.pattern).sub(replacement, "")
+
+    def replacement_for(self, match: re.Match) -> str:
+        """Текст замены для совпадения"""
+        return match.expand(self.replacement) if self.regex else self.replacement
+
+    def matches(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[re.Match]:
+        """Непересекающиеся совпадения (пустые пропускаются)"""
+        for match in self.pattern.finditer(text, start, len(text) if end is None else end):
+            if match.end() > match.start():
+                yield match
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in self.matches(text))
+
+    def edits(self, text: str, count: int = -1) -> List[Tuple[int, int, str]]:
+        """Правки (начало, конец, новый текст) по возрастанию позиции"""
+        result = []
+        for match in self.matches(text):
+            if count >= 0 and len(result) >= count:
+                break
+            result.append((match.start(), match.end(), self.replacement_for(match)))
+        return result
+
+    def replace(self, text: str, count: int = -1) -> Tuple[str, int]:
+        """Замена в строке: (новый текст, число замен)"""
+        parts = []
+        position = 0
+        edits = self.edits(text, count)
+        for start, end, new in edits:
+            parts.append(text[position:start])
+            parts.append(new)
+            position = end
+        parts.append(text[position:])
+        return "".join(parts), len(edits)
+
+    # --- Поиск в снимке документа ---
+
+    # Символов перед окном поиска: для границ слов, ^ и просмотра назад
+    CONTEXT = 256
+
+    def find_all(self, snapshot, start: int = 0,
+                 window: int = AppConfig.SEARCH_SLICE,
+                 overlap: int = AppConfig.REPLACE_STREAM_OVERLAP) -> Iterator[Tuple[int, int, str]]:
+        """Правки (начало, конец, новый текст) в snapshot (TextSnapshot) с позиции start
+
+        Текст читается окнами по window символов с запасом overlap за
+        окном, а не копируется целиком; как и в replace_stream,
+        совпадения длиннее overlap символов могут оказаться усечены.
+        """
+        size = len(snapshot)
+        position = start
+        while position < size:
+            window_end = min(size, position + window)
+            base = max(0, position - self.CONTEXT)
+            text = snapshot.get(base, min(size, window_end + overlap))
+            for match in self.matches(text, position - base):
+                if base + match.start() >= window_end:
+                    break
+                yield base + match.start(), base + match.end(), self.replacement_for(match)
+                position = base + match.end()
+            position = max(position, window_end)
+
+    def find(self, snapshot, start: int = 0) -> Optional[Tuple[int, int, str]]:
+        """Первое совпадение в snapshot с позиции start; None - если его нет"""
+        return next(self.find_all(snapshot, start), None)
+
+    def match_at(self, snapshot, start: int, end: int,
+                 overlap: int = AppConfig.REPLACE_STREAM_OVERLAP) -> Optional[str]:
+        """Текст замены, если snapshot[start:end] - ровно одно совпадение"""
+        if end <= start:
+            return None
+        base = max(0, start - self.CONTEXT)
+        text = snapshot.get(base, min(len(snapshot), end + overlap))
+        match = self.pattern.match(text, start - base)
+        if match is None or base + match.end() != end:
+            return None
+        return self.replacement_for(match)
+
+    def count_snapshot(self, snapshot) -> int:
+        """Число совпадений в snapshot (по кускам, как в файле)"""
+        return self.replace_stream(snapshot.chunks(), lambda text: None)
+
+    def preview(self, snapshot, limit: int = AppConfig.REPLACE_PREVIEW_LIMIT,
+                context: int = 30) -> List[Dict]:
+        """Первые limit совпадений в snapshot с окружением для показа пользователю
+
+        Строка и столбец берутся из индекса строк снимка, окружение
+        читается только вокруг совпадения.
+        """
+        items = []
+        for start, end, new in self.find_all(snapshot):
+            if len(items) >= limit:
+                break
+            line, column = snapshot.index(start)
+            after = snapshot.get(end, min(len(snapshot), end + context))
+            items.append({
+                "start": start,
+                "end": end,
+                "line": line,
+                "column": column,
+                "before": snapshot.get(max(start - column, start - context), start),
+                "old": snapshot.get(start, end),
+                "new": new,
+                "after": after.split('\n', 1)[0]
+            })
+        return items
+
+    # --- Потоковая обработка ---
+
+    def replace_stream(self, chunks: Iterable[str], write: Callable[[str], None],
+                       cancel: Optional[threading.Event] = None,
+                       overlap: int = AppConfig.REPLACE_STREAM_OVERLAP) -> Optional[int]:
+        """Замена в потоке кусков текста; None - если прервано
+
+        Совпадения, заканчивающиеся ближе overlap символов к концу
+        прочитанного, откладываются до следующего куска: так находятся
+        и совпадения на границе кусков (длиной до overlap символов).
+        Перед обрабатываемой частью сохраняется немного предыдущего
+        текста, чтобы правильно работали границы слов и ^.
+        """
+        context = 256
+        buffer = ""
+        base = 0  # с какого места buffer еще не обработан
+        total = 0
+
+        def process(final: bool) -> int:
+            nonlocal buffer, base
+            limit = len(buffer) if final else len(buffer) - overlap
+            if limit <= base:
+                return 0
+
+            replaced = 0
+            position = done = base
+            for match in self.matches(buffer, base):
+                if not final and match.end() > limit:
+                    # Совпадение может продолжиться в следующем куске
+                    done = min(match.start(), limit)
+                    break
+                write(buffer[position:match.start()])
+                write(self.replacement_for(match))
+                position = match.end()
+                replaced += 1
+            else:
+                done = limit
+
+            # Непроверенный хвост остается в буфере вместе с небольшим контекстом
+            done = max(position, done)
+            write(buffer[position:done])
+            keep_from = max(0, done - context)
+            buffer = buffer[keep_from:]
+            base = done - keep_from
+            return replaced
+
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                return None
+            buffer += chunk
+            if len(buffer) - base >= 2 * overlap:
+                total += process(final=False)
+
+        if cancel is not None and cancel.is_set():
+            return None
+        return total + process(final=True)
+
+    @staticmethod
+    def _read_chunks(filepath: str, chunk_size: int) -> Iterator[str]:
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def count_file(self, filepath: str, cancel: Optional[threading.Event] = None,
+                   chunk_size: int = AppConfig.ANALYZE_CHUNK_SIZE) -> Optional[int]:
+        """Число совпадений в файле без записи"""
+        return self.replace_stream(self._read_chunks(filepath, chunk_size),
+                                   lambda text: None, cancel)
+
+    def replace_file(self, filepath: str, cancel: Optional[threading.Event] = None,
+                     chunk_size: int = AppConfig.ANALYZE_CHUNK_SIZE) -> Optional[int]:
+        """Замена в файле через временный файл; None - если прервано
+
+        Файл заменяется атомарно и только если были замены.
+        """
+        path = Path(filepath)
+        tmp_file = path.with_name(path.name + ".replace.tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8', newline='') as out:
+                replaced = self.replace_stream(self._read_chunks(filepath, chunk_size),
+                                               out.write, cancel)
+                out.flush()
+                os.fsync(out.fileno())
+
+            if replaced:
+                os.replace(tmp_file, path)
+            else:
+                tmp_file.unlink()
+            return replaced
+        except BaseException:
+            try:
+                tmp_file.unlink()
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,46 @@
+"""
+Индекс отчетов
+"""
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.storage import open_reports_index
+
+
+class ReportsIndex:
+    """Индекс созданных отчетов"""
+
+    def __init__(self):
+        self.backend = open_reports_index()
+
+    def add_report(self, report_path: str, author: str,
+                   description: str = "", source_doc: str = "unsaved") -> str:
+        """Регистрация отчета в индексе"""
+        report_id = uuid.uuid4().hex[:8]
+        path = Path(report_path)
+
+        self.backend.put(report_id, {
+            "name": path.name,
+            "path": str(path),
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "author": author,
+            "description": description,
+            "source_doc": source_doc,
+            "size": path.stat().st_size if path.exists() else 0
+        })
+        return report_id
+
+    def get_report(self, report_id: str) -> Optional[Dict]:
+        """Информация об отчете"""
+        return self.backend.get(report_id)
+
+    def remove_report(self, report_id: str):
+        """Удаление отчета из индекса"""
+        self.backend.remove(report_id)
+
+    def list_reports(self, author: Optional[str] = None,
+                     limit: Optional[int] = None) -> List[Dict]:
+        """Список отчетов (новые первыми)"""
+        return self.backend.query(author=author, limit=limit)
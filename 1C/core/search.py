@@ -0,0 +1,442 @@
+"""
+Поиск в тексте: несколько терминов сразу, регулярные выражения,
+слово целиком, сравнение без учета регистра (casefold)
+"""
+import queue
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import chain, repeat, takewhile
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from config import AppConfig
+from core.replace import compile_pattern
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class Matches:
+    """Найденные совпадения в array('q'): начала, концы и номера терминов
+
+    Порядок - по возрастанию начала, при равных началах - по концу.
+    Три плоских массива занимают по 8 байт на значение вместо
+    кортежа на каждое совпадение.
+    """
+
+    __slots__ = ("starts", "ends", "terms")
+
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+        self.terms = array('q')
+
+    def append(self, start: int, end: int, term: int = 0):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.terms.append(term)
+
+    def extend(self, other: "Matches"):
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        self.terms.extend(other.terms)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts, self.ends)
+
+    def pairs(self) -> List[Tuple[int, int]]:
+        """Список (начало, конец)"""
+        return list(zip(self.starts, self.ends))
+
+
+class AhoCorasick:
+    """Автомат Ахо-Корасик: все вхождения любого из терминов за один
+    проход по тексту, независимо от числа терминов
+    """
+
+    def __init__(self, terms: List[str]):
+        self.lengths = [len(term) for term in terms]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out: List[tuple] = [()]
+
+        for index, term in enumerate(terms):
+            node = 0
+            for ch in term:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = next_node
+                node = next_node
+            self._out[node] += (index,)
+
+        # Ссылки неудач в ширину; выходы узла дополняются выходами его ссылки
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def scan(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """(конец вхождения, номер термина) в порядке концов"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for position, ch in enumerate(text[start:end], start + 1):
+            transitions = goto[node]
+            while node and ch not in transitions:
+                node = fail[node]
+                transitions = goto[node]
+            node = transitions.get(ch, 0)
+            if out[node]:
+                for term in out[node]:
+                    yield position, term
+
+
+class SearchEngine:
+    """Поиск одного или нескольких терминов
+
+    Подстроки ищутся все, включая перекрывающиеся, без учета регистра -
+    по casefold (ß = ss). Небольшой набор терминов ищется встроенными
+    регулярными выражениями, больше SEARCH_AUTOMATON_TERMS - автоматом
+    Ахо-Корасик, время которого от числа терминов не зависит. В режиме
+    регулярных выражений (regex) совпадения не перекрываются, регистр
+    сравнивается по правилам re.IGNORECASE.
+    """
+
+    def __init__(self, terms: Union[str, Iterable[str]], regex: bool = False,
+                 whole_word: bool = False, case_sensitive: bool = False):
+        if isinstance(terms, str):
+            terms = [terms]
+        self.terms = [term for term in terms if term]
+        self.regex = regex
+        self.whole_word = whole_word
+        self.case_sensitive = case_sensitive
+
+        self._patterns = []
+        self._automaton = None
+        if regex:
+            self._patterns = [compile_pattern(term, True, whole_word, case_sensitive)
+                              for term in self.terms]
+        else:
+            folded = [term if case_sensitive else term.casefold() for term in self.terms]
+            self._lengths = [len(term) for term in folded]
+            if len(folded) > AppConfig.SEARCH_AUTOMATON_TERMS:
+                self._automaton = AhoCorasick(folded)
+            else:
+                self._patterns = [re.compile(self._literal_pattern(term)) for term in folded]
+
+    @staticmethod
+    def _literal_pattern(term: str) -> str:
+        """Шаблон всех вхождений подстроки
+
+        finditer не находит перекрывающиеся совпадения, поэтому для
+        терминов, начало которых совпадает с концом ("аа", "abab"),
+        совпадением считается только первый символ, а остальное
+        проверяется просмотром вперед. Первый символ оставлен обычным,
+        чтобы re искал кандидатов быстрым поиском подстроки.
+        """
+        if any(term[:size] == term[-size:] for size in range(1, len(term))):
+            return f"{re.escape(term[0])}(?={re.escape(term[1:])})"
+        return re.escape(term)
+
+    @property
+    def max_length(self) -> int:
+        """Длина самого длинного совпадения (для подстрок)"""
+        return max(self._lengths, default=0) if not self.regex else 0
+
+    # --- Поиск в строке ---
+
+    def fold(self, text: str) -> str:
+        """Текст в том виде, в котором по нему ищутся подстроки"""
+        return text if self.case_sensitive or self.regex else text.casefold()
+
+    def search(self, text: str, start: int = 0, end: Optional[int] = None,
+               folded: Optional[str] = None) -> Matches:
+        """Совпадения в text[start:end]; позиции - в исходном тексте
+
+        folded - заранее вычисленный fold(text), чтобы при поиске по
+        частям одного текста не приводить его к нижнему регистру заново.
+        """
+        end = len(text) if end is None else end
+        if self.regex:
+            return self._search_regex(text, start, end)
+
+        if folded is None:
+            folded = self.fold(text)
+        if len(folded) == len(text):
+            return self._search_folded(folded, start, end)
+
+        # casefold удлинил часть символов - позиции пересчитываются в исходные
+        offsets = array('q')
+        for position, ch in enumerate(text):
+            offsets.extend([position] * len(ch.casefold()))
+        offsets.append(len(text))
+        folded_start = offsets.index(start) if start < len(text) else len(folded)
+        folded_end = offsets.index(end) if end < len(text) else len(folded)
+
+        found = self._search_folded(folded, folded_start, folded_end)
+        result = Matches()
+        for s, e, term in zip(found.starts, found.ends, found.terms):
+            result.append(offsets[s], offsets[e - 1] + 1, term)
+        return result
+
+    def _search_regex(self, text: str, start: int, end: int) -> Matches:
+        found = []
+        for index, pattern in enumerate(self._patterns):
+            starts, ends = array('q'), array('q')
+            for match in pattern.finditer(text, start, end):
+                if match.end() > match.start():
+                    starts.append(match.start())
+                    ends.append(match.end())
+            found.append((starts, ends))
+        return self._merge(found)
+
+    def _search_folded(self, text: str, start: int, end: int) -> Matches:
+        if self._automaton is not None:
+            return self._search_automaton(text, start, end)
+
+        found = []
+        for pattern, length in zip(self._patterns, self._lengths):
+            # Начала вхождений, целиком лежащих в [start, end); правее end
+            # текст не обрезается, чтобы верно проверялась граница слова
+            starts = array('q', takewhile((end - length).__ge__,
+                                          map(re.Match.start, pattern.finditer(text, start))))
+            if self.whole_word:
+                starts = array('q', (position for position in starts
+                                     if self._whole_word(text, position, position + length)))
+            found.append(starts)
+        return self._merge_literal(found)
+
+    def _search_automaton(self, text: str, start: int, end: int) -> Matches:
+        lengths = self._lengths
+        found = [array('q') for _ in lengths]
+        for match_end, index in self._automaton.scan(text, start, end):
+            match_start = match_end - lengths[index]
+            if match_start < start:
+                continue
+            if self.whole_word and not self._whole_word(text, match_start, match_end):
+                continue
+            found[index].append(match_start)
+        return self._merge_literal(found)
+
+    @staticmethod
+    def _whole_word(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not _is_word_char(text[start - 1])) and \
+            (end == len(text) or not _is_word_char(text[end]))
+
+    @staticmethod
+    def _merge(found: List[Tuple[array, array]]) -> Matches:
+        """Объединение совпадений отдельных терминов в порядке (начало, конец)"""
+        result = Matches()
+        if len(found) == 1:
+            result.starts, result.ends = found[0]
+            result.terms = array('q', bytes(8 * len(result.starts)))
+            return result
+
+        ordered = sorted(chain.from_iterable(zip(starts, ends, repeat(index))
+                                             for index, (starts, ends) in enumerate(found)))
+        for start, end, index in ordered:
+            result.append(start, end, index)
+        return result
+
+    def _merge_literal(self, found: List[array]) -> Matches:
+        """Объединение начал вхождений подстрок (у каждой своя длина)
+
+        Начало и номер термина упаковываются в одно целое (термины
+        пронумерованы по возрастанию длины), так что сортировка и
+        распаковка идут во встроенных функциях, без цикла на Python.
+        """
+        result = Matches()
+        if len(found) == 1:
+            result.starts = found[0]
+            result.ends = array('q', map(self._lengths[0].__add__, found[0]))
+            result.terms = array('q', bytes(8 * len(found[0])))
+            return result
+
+        terms = len(found)
+        by_length = sorted(range(terms), key=self._lengths.__getitem__)
+        keys = []
+        for rank, index in enumerate(by_length):
+            keys.extend(map(int.__add__, map(terms.__mul__, found[index]), repeat(rank)))
+        keys.sort()
+
+        ranks = array('q', map(terms.__rmod__, keys))
+        result.starts = array('q', map(terms.__rfloordiv__, keys))
+        result.ends = array('q', map(int.__add__, result.starts,
+                                     map([self._lengths[i] for i in by_length].__getitem__,
+                                         ranks)))
+        result.terms = array('q', map(by_length.__getitem__, ranks))
+        return result
+
+    def count(self, text: str) -> int:
+        return len(self.search(text))
+
+    # --- Потоковый поиск ---
+
+    def search_chunks(self, chunks: Iterable[str], cancel: Optional[threading.Event] = None,
+                      overlap: int = AppConfig.REPLACE_STREAM_OVERLAP) -> Optional[Matches]:
+        """Поиск в тексте, поданном кусками; None - если прервано
+
+        Позиции - от начала всего текста. Конец прочитанного, где еще
+        может начинаться незаконченное совпадение, переносится в
+        следующий кусок вместе с символом перед ним (для границ слов).
+        Для регулярных выражений переносится overlap символов.
+        """
+        # Сколько символов в конце буфера еще нельзя проверить
+        reserve = overlap if self.regex else self.max_length
+        result = Matches()
+        # Куски копятся списком и склеиваются перед поиском: мелкие куски
+        # (например, PieceTable) не копируют буфер на каждом шаге
+        parts = []
+        size = 0  # длина буфера вместе с parts
+        base = 0  # позиция начала буфера в тексте
+        checked = 0  # с какого места в буфере еще не искали
+
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                return None
+            parts.append(chunk)
+            size += len(chunk)
+            limit = size - reserve
+            if limit - checked < max(reserve, AppConfig.LOAD_CHUNK_SIZE):
+                continue
+
+            buffer = "".join(parts)
+            found = self.search(buffer, checked, len(buffer))
+            for start, end, term in zip(found.starts, found.ends, found.terms):
+                if (end > limit) if self.regex else (start >= limit):
+                    # Дальше - то, что еще может измениться с новым куском
+                    limit = min(limit, start)
+                    break
+                result.append(base + start, base + end, term)
+
+            keep_from = max(0, limit - 1)
+            parts = [buffer[keep_from:]]
+            size = len(parts[0])
+            base += keep_from
+            checked = limit - keep_from
+
+        if cancel is not None and cancel.is_set():
+            return None
+        buffer = "".join(parts)
+        found = self.search(buffer, checked, len(buffer))
+        for start, end, term in zip(found.starts, found.ends, found.terms):
+            result.append(base + start, base + end, term)
+        return result
+
+    def search_file(self, filepath: str, cancel: Optional[threading.Event] = None,
+                    chunk_size: int = AppConfig.ANALYZE_CHUNK_SIZE) -> Optional[Matches]:
+        """Поиск в файле без загрузки его целиком (позиции - в символах)"""
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            return self.search_chunks(iter(lambda: f.read(chunk_size), ''), cancel)
+
+
+class SearchWorker:
+    """Поиск в фоновом потоке по снимку текста
+
+    Новый поиск прерывает предыдущий. Снимок документа (TextSnapshot)
+    склеивается в строку уже в потоке, и она первой попадает в очередь
+    results: ("text", поколение, текст). Затем текст просматривается
+    частями по SEARCH_SLICE символов (регулярные выражения - целиком),
+    и найденное в каждой части сразу
+    попадает в очередь: ("matches", поколение, начала, концы, просмотрено
+    до) и в конце ("done", поколение, просмотрено до). Если запрос
+    дополняет предыдущий (ввод очередного символа), проверяются только
+    прежние совпадения, а дальше просмотренного места - обычный поиск.
+    """
+
+    def __init__(self, slice_size: int = AppConfig.SEARCH_SLICE):
+        self.slice_size = slice_size
+        self.results = queue.Queue()
+        self.generation = 0
+        self._cancel = threading.Event()
+        self._cache = (None, None, None)  # (снимок, его текст, fold текста) последнего поиска
+
+    def start(self, snapshot, engine: SearchEngine,
+              narrow: Optional[Tuple[array, int]] = None) -> int:
+        """Поиск engine в snapshot (строка или TextSnapshot); narrow - (начала прежних совпадений,
+        докуда прежний поиск дошел). Возвращает поколение поиска."""
+        self.cancel()
+        self.generation += 1
+        self._cancel = threading.Event()
+        threading.Thread(target=self._run, name="find",
+                         args=(self.generation, self._cancel, snapshot, engine, narrow),
+                         daemon=True).start()
+        return self.generation
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _prepare(self, snapshot, engine: SearchEngine) -> Tuple[str, str]:
+        """Текст снимка и его fold (для того же снимка - из прошлого поиска)"""
+        cached, text, folded = self._cache
+        if cached is not snapshot:
+            text = snapshot if isinstance(snapshot, str) else snapshot.text()
+            folded = None
+        if folded is None and not engine.case_sensitive:
+            folded = text.casefold()
+        self._cache = (snapshot, text, folded)
+        return text, text if engine.case_sensitive else folded
+
+    def _run(self, generation: int, cancel: threading.Event, snapshot,
+             engine: SearchEngine, narrow: Optional[Tuple[array, int]]):
+        try:
+            text, folded = self._prepare(snapshot, engine)
+            self.results.put(("text", generation, text))
+            position = 0
+
+            # Прежние совпадения проверяются целиком и выдаются одной порцией:
+            # полученное окном всегда равно всем совпадениям до "просмотрено до"
+            if narrow is not None and len(folded) == len(text) and \
+                    len(engine.terms) == 1 and not engine.whole_word:
+                previous, until = narrow
+                term = engine.fold(engine.terms[0])
+                starts = array('q')
+                step = max(1, self.slice_size // 16)
+                for first in range(0, len(previous), step):
+                    if cancel.is_set():
+                        return
+                    starts.extend(start for start in previous[first:first + step]
+                                  if folded.startswith(term, start))
+                self.results.put(("matches", generation, starts,
+                                  array('q', map(len(term).__add__, starts)), until))
+                position = until
+
+            # Если casefold меняет длину текста, позиции пересчитываются по
+            # всему тексту - тогда он просматривается одной частью. Так же
+            # ищутся регулярные выражения: длина их совпадения не ограничена,
+            # а якоря ($, \b) на границе части сработали бы ложно
+            if engine.regex or len(folded) != len(text):
+                slice_size = max(len(text), 1)
+            else:
+                slice_size = self.slice_size
+            # Совпадения, начинающиеся в части, могут заканчиваться за ее концом
+            reach = max(engine.max_length - 1, 0)
+            while position < len(text):
+                if cancel.is_set():
+                    return
+                end = min(len(text), position + slice_size)
+                found = engine.search(text, position, min(len(text), end + reach), folded)
+                keep = bisect_left(found.starts, end)
+                self.results.put(("matches", generation, found.starts[:keep],
+                                  found.ends[:keep], end))
+                position = end
+            self.results.put(("done", generation, len(text)))
+        except Exception as e:
+            print(f"Ошибка поиска: {e}")
+            self.results.put(("done", generation, 0))
@@ -0,0 +1,296 @@
+"""
+Полнотекстовый индекс документов
+"""
+import math
+import queue
+import re
+import threading
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from config import AppPaths, AppConfig
+from core.storage import SqliteDatabase
+
+
+# Слова из букв и цифр любого алфавита (кириллица, латиница)
+TOKEN_RE = re.compile(r"\w+")
+PHRASE_RE = re.compile(r'"([^"]+)"|(\S+)')
+# Незаконченное слово в конце куска текста
+TAIL_RE = re.compile(r"\w*\Z")
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбиение текста на нормализованные слова"""
+    return [token.casefold().replace('ё', 'е') for token in TOKEN_RE.findall(text)]
+
+
+def iter_tokens(f: TextIO, chunk_size: int = AppConfig.LOAD_CHUNK_SIZE) -> Iterator[str]:
+    """Нормализованные слова файла, прочитанного кусками
+
+    Слово, разрезанное границей куска, переносится в следующий кусок,
+    поэтому результат совпадает с tokenize() по всему тексту.
+    """
+    tail = ""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            yield from tokenize(tail)
+            return
+
+        text = tail + chunk
+        cut = TAIL_RE.search(text).start()
+        for token in TOKEN_RE.findall(text, 0, cut):
+            yield token.casefold().replace('ё', 'е')
+        tail = text[cut:]
+
+
+class SearchIndex:
+    """Инвертированный индекс по папке документов
+
+    Хранится в SQLite: для каждого слова - список документов с
+    позициями слов (для поиска фраз). Результаты ранжируются по BM25.
+    Обновления выполняются фоновым потоком, поэтому сохранение
+    документа не ждет переиндексации.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, docs_dir: Path, db: Optional[SqliteDatabase] = None):
+        self.docs_dir = Path(docs_dir)
+        self.db = db or SqliteDatabase.open(AppPaths.DATA_DIR / AppConfig.SEARCH_INDEX_DB)
+
+        with self.db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS index_docs (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT UNIQUE NOT NULL,
+                    mtime REAL,
+                    size INTEGER,
+                    length INTEGER
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    positions BLOB NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)")
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self._worker.start()
+
+    # --- Фоновые обновления ---
+
+    def schedule_update(self, filepath: str):
+        """Переиндексация документа в фоне"""
+        self._queue.put(("update", filepath))
+
+    def schedule_remove(self, filepath: str):
+        self._queue.put(("remove", filepath))
+
+    def schedule_rename(self, old_path: str, new_path: str):
+        self._queue.put(("rename", old_path, new_path))
+
+    def schedule_sync(self, catalog):
+        """Сверка индекса с каталогом документов в фоне"""
+        self._queue.put(("sync", catalog))
+
+    def wait_idle(self):
+        """Ожидание обработки всех поставленных обновлений"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                op, args = task[0], task[1:]
+                if op == "update":
+                    self.update_document(*args)
+                elif op == "remove":
+                    self.remove_document(*args)
+                elif op == "rename":
+                    self.rename_document(*args)
+                elif op == "sync":
+                    self.sync(*args)
+            except Exception as e:
+                print(f"Ошибка обновления поискового индекса: {e}")
+            finally:
+                self._queue.task_done()
+
+    # --- Обновление ---
+
+    def _key(self, filepath: str) -> Optional[str]:
+        """Имя документа в индексе (только файлы из папки документов)"""
+        path = Path(filepath)
+        if path.parent.resolve() != self.docs_dir.resolve() or path.suffix != '.txt':
+            return None
+        return path.name
+
+    def update_document(self, filepath: str):
+        """Индексация документа (заменяет прежние данные)"""
+        name = self._key(filepath)
+        if name is None:
+            return
+
+        # Файл читается кусками, а позиции копятся сразу в массивах по
+        # словам: большие документы не держатся в памяти целиком
+        path = Path(filepath)
+        positions: Dict[str, array] = defaultdict(lambda: array('I'))
+        length = 0
+        try:
+            stat = path.stat()
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for length, token in enumerate(iter_tokens(f), 1):
+                    positions[token].append(length - 1)
+        except FileNotFoundError:
+            self.remove_document(filepath)
+            return
+
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT id FROM index_docs WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                doc_id = row["id"]
+                conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                conn.execute("UPDATE index_docs SET mtime = ?, size = ?, length = ? WHERE id = ?",
+                             (stat.st_mtime, stat.st_size, length, doc_id))
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO index_docs (name, mtime, size, length) VALUES (?, ?, ?, ?)",
+                    (name, stat.st_mtime, stat.st_size, length)
+                ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO postings (term, doc_id, tf, positions) VALUES (?, ?, ?, ?)",
+                ((term, doc_id, len(pos), pos.tobytes()) for term, pos in positions.items())
+            )
+
+    def remove_document(self, filepath: str):
+        """Удаление документа из индекса"""
+        name = self._key(filepath)
+        if name is None:
+            return
+
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT id FROM index_docs WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM postings WHERE doc_id = ?", (row["id"],))
+                conn.execute("DELETE FROM index_docs WHERE id = ?", (row["id"],))
+
+    def rename_document(self, old_path: str, new_path: str):
+        """Переименование без переиндексации"""
+        old_name, new_name = self._key(old_path), self._key(new_path)
+        if old_name is None or new_name is None:
+            self.remove_document(old_path)
+            self.update_document(new_path)
+            return
+
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE index_docs SET name = ? WHERE name = ?", (new_name, old_name))
+
+    def sync(self, catalog):
+        """Индексация новых и измененных документов, удаление пропавших"""
+        indexed = {row["name"]: (row["mtime"], row["size"])
+                   for row in self.db.query("SELECT name, mtime, size FROM index_docs")}
+
+        current = catalog.entries()
+        for name, entry in current.items():
+            if indexed.get(name) != (entry["mtime"], entry["size"]):
+                self.update_document(str(self.docs_dir / name))
+
+        for name in indexed.keys() - current.keys():
+            self.remove_document(str(self.docs_dir / name))
+
+    # --- Поиск ---
+
+    @staticmethod
+    def parse_query(query: str) -> List[List[str]]:
+        """Разбор запроса: слова и фразы в кавычках"""
+        parts = []
+        for phrase, word in PHRASE_RE.findall(query):
+            tokens = tokenize(phrase or word)
+            if tokens:
+                parts.append(tokens)
+        return parts
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """Поиск документов, содержащих все слова и фразы запроса
+
+        Результаты отсортированы по убыванию релевантности (BM25).
+        """
+        parts = self.parse_query(query)
+        if not parts:
+            return []
+
+        stats = self.db.query("SELECT COUNT(*) AS n, AVG(length) AS avg FROM index_docs")[0]
+        total_docs, avg_length = stats["n"], stats["avg"] or 1.0
+        if not total_docs:
+            return []
+
+        # term -> {doc_id: (tf, позиции)}
+        postings: Dict[str, Dict[int, Tuple[int, bytes]]] = {}
+        for term in {term for part in parts for term in part}:
+            postings[term] = {row["doc_id"]: (row["tf"], row["positions"])
+                              for row in self.db.query(
+                                  "SELECT doc_id, tf, positions FROM postings WHERE term = ?",
+                                  (term,))}
+
+        candidates = None
+        for term_postings in postings.values():
+            docs = set(term_postings)
+            candidates = docs if candidates is None else candidates & docs
+        if not candidates:
+            return []
+
+        # Фразы: слова должны идти подряд
+        for part in parts:
+            if len(part) > 1:
+                candidates = {doc_id for doc_id in candidates
+                              if self._has_phrase(part, postings, doc_id)}
+
+        if not candidates:
+            return []
+
+        placeholders = ",".join("?" * len(candidates))
+        docs = {row["id"]: row for row in self.db.query(
+            f"SELECT id, name, length FROM index_docs WHERE id IN ({placeholders})",
+            list(candidates))}
+
+        results = []
+        for doc_id, doc in docs.items():
+            score = 0.0
+            matches = 0
+            for term, term_postings in postings.items():
+                df = len(term_postings)
+                tf = term_postings[doc_id][0]
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                norm = tf + self.K1 * (1 - self.B + self.B * doc["length"] / avg_length)
+                score += idf * tf * (self.K1 + 1) / norm
+                matches += tf
+            results.append({
+                "path": str(self.docs_dir / doc["name"]),
+                "name": doc["name"],
+                "score": score,
+                "matches": matches
+            })
+
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _has_phrase(phrase: List[str], postings, doc_id: int) -> bool:
+        """Есть ли в документе слова фразы на соседних позициях"""
+        starts = None
+        for offset, term in enumerate(phrase):
+            positions = array('I')
+            positions.frombytes(postings[term][doc_id][1])
+            shifted = {position - offset for position in positions}
+            starts = shifted if starts is None else starts & shifted
+            if not starts:
+                return False
+        return True
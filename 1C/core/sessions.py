@@ -0,0 +1,266 @@
+"""
+Хранилище сессий
+"""
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from config import AppPaths, AppConfig
+from core.storage import SqliteDatabase
+
+
+class MemorySessionBackend:
+    """Сессии только в памяти процесса"""
+
+    def load(self) -> Dict[str, Dict]:
+        return {}
+
+    def save(self, session_id: str, record: Dict):
+        pass
+
+    def delete(self, session_id: str):
+        pass
+
+
+class FileSessionBackend:
+    """Сессии в JSON-файле (атомарная перезапись)"""
+
+    def __init__(self, sessions_file: Path):
+        self.sessions_file = Path(sessions_file)
+        self._records: Dict[str, Dict] = {}
+
+    def load(self) -> Dict[str, Dict]:
+        if self.sessions_file.exists():
+            try:
+                with open(self.sessions_file, 'r', encoding='utf-8') as f:
+                    self._records = json.load(f)
+            except Exception as e:
+                print(f"Ошибка загрузки сессий: {e}")
+        return dict(self._records)
+
+    def save(self, session_id: str, record: Dict):
+        self._records[session_id] = record
+        self._flush()
+
+    def delete(self, session_id: str):
+        if self._records.pop(session_id, None) is not None:
+            self._flush()
+
+    def _flush(self):
+        tmp_file = self.sessions_file.with_name(self.sessions_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._records, f, ensure_ascii=False)
+        os.replace(tmp_file, self.sessions_file)
+
+
+class SqliteSessionBackend:
+    """Сессии в общей базе SQLite"""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        with db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                )""")
+
+    def load(self) -> Dict[str, Dict]:
+        return {row["id"]: json.loads(row["data"])
+                for row in self.db.query("SELECT id, data FROM sessions")}
+
+    def save(self, session_id: str, record: Dict):
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, data) VALUES (?, ?)",
+                         (session_id, json.dumps(record, ensure_ascii=False)))
+
+    def delete(self, session_id: str):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+def open_session_backend():
+    """Хранилище сессий согласно AppConfig.SESSION_BACKEND"""
+    if AppConfig.SESSION_BACKEND == "sqlite":
+        return SqliteSessionBackend(
+            SqliteDatabase.open(AppPaths.DATA_DIR / AppConfig.SQLITE_DB_NAME))
+    if AppConfig.SESSION_BACKEND == "file":
+        return FileSessionBackend(AppPaths.DATA_DIR / "sessions.json")
+    return MemorySessionBackend()
+
+
+class SessionStore:
+    """Сессии с абсолютным и простойным тайм-аутом
+
+    Время внутри хранится в time.monotonic(), поэтому проверка сессии -
+    одно сравнение чисел без разбора дат. Сроки истечения лежат в куче:
+    на каждую сессию приходится одна запись, и при извлечении она
+    переносится на фактический срок, если сессия была активна.
+    В хранилище (backend) пишется настенное время, чтобы сессии
+    переживали перезапуск.
+
+    В хранилище попадают только имя пользователя и сроки сессии
+    (PERSISTED_FIELDS); данные пользователя при загрузке запрашиваются
+    заново через lookup_user, поэтому хеш пароля на диск не пишется.
+    """
+
+    PERSISTED_FIELDS = ("username", "created", "created_ts", "last_activity", "last_activity_ts")
+    SECRET_FIELDS = ("password",)
+
+    def __init__(self, backend=None,
+                 idle_timeout: float = AppConfig.SESSION_IDLE_TIMEOUT,
+                 absolute_timeout: float = AppConfig.SESSION_MAX_AGE,
+                 touch_interval: float = AppConfig.SESSION_TOUCH_INTERVAL,
+                 lookup_user: Optional[Callable[[str], Optional[Dict]]] = None):
+        self.backend = backend or MemorySessionBackend()
+        self.lookup_user = lookup_user
+        self.idle_timeout = idle_timeout
+        self.absolute_timeout = absolute_timeout
+        self.touch_interval = touch_interval
+
+        # id -> запись сессии; "_created"/"_active"/"_saved" - monotonic
+        self.sessions: Dict[str, Dict] = {}
+        self._deadlines = []
+
+        self._load()
+
+    def _load(self):
+        """Восстановление сессий из хранилища"""
+        now_wall, now_mono = time.time(), time.monotonic()
+
+        for session_id, record in self.backend.load().items():
+            try:
+                active_ts = record.get("last_activity_ts")
+                if active_ts is None:
+                    # Старый формат: last_activity - число, а не строка
+                    last = record.get("last_activity")
+                    active_ts = last if isinstance(last, (int, float)) else record["created_ts"]
+                created = now_mono - (now_wall - record["created_ts"])
+                active = now_mono - (now_wall - active_ts)
+                user_info = self._user_info(record["username"])
+            except (KeyError, TypeError) as e:
+                print(f"Ошибка загрузки сессии {session_id}: {e}")
+                user_info = None
+
+            if user_info is None:
+                # Пользователь удален или запись повреждена
+                self.backend.delete(session_id)
+                continue
+
+            session = {key: record[key] for key in self.PERSISTED_FIELDS if key in record}
+            session.update(last_activity=self._isoformat(active_ts),
+                           last_activity_ts=active_ts, user_info=user_info,
+                           _created=created, _active=active, _saved=active)
+            if self._deadline(session) <= now_mono:
+                self.backend.delete(session_id)
+                continue
+
+            self._insert(session_id, session)
+            if set(record) - set(self.PERSISTED_FIELDS):
+                # Записи старого формата хранили данные пользователя целиком
+                self.backend.save(session_id, self._record(session))
+
+    def _user_info(self, username: str) -> Optional[Dict]:
+        """Данные пользователя без секретных полей"""
+        if self.lookup_user is None:
+            return {"username": username}
+        user = self.lookup_user(username)
+        if user is None:
+            return None
+        return self._strip(user)
+
+    @classmethod
+    def _strip(cls, user_info: Dict) -> Dict:
+        return {key: value for key, value in user_info.items() if key not in cls.SECRET_FIELDS}
+
+    def _deadline(self, session: Dict) -> float:
+        deadline = session["_created"] + self.absolute_timeout
+        if self.idle_timeout:
+            deadline = min(deadline, session["_active"] + self.idle_timeout)
+        return deadline
+
+    def _insert(self, session_id: str, session: Dict):
+        self.sessions[session_id] = session
+        heapq.heappush(self._deadlines, (self._deadline(session), session_id))
+
+    @staticmethod
+    def _public(session: Dict) -> Dict:
+        return {key: value for key, value in session.items() if not key.startswith("_")}
+
+    @classmethod
+    def _record(cls, session: Dict) -> Dict:
+        """Запись для хранилища: без данных пользователя"""
+        return {key: session[key] for key in cls.PERSISTED_FIELDS}
+
+    @staticmethod
+    def _isoformat(timestamp: float) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+
+    def create(self, session_id: str, username: str, user_info: Dict) -> Dict:
+        """Регистрация новой сессии"""
+        now_wall, now_mono = time.time(), time.monotonic()
+        session = {
+            "username": username,
+            "user_info": self._strip(user_info),
+            "created": self._isoformat(now_wall),
+            "created_ts": now_wall,
+            "last_activity": self._isoformat(now_wall),
+            "last_activity_ts": now_wall,
+            "_created": now_mono,
+            "_active": now_mono,
+            "_saved": now_mono
+        }
+        self._insert(session_id, session)
+        self.backend.save(session_id, self._record(session))
+        return self._public(session)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Проверка сессии и отметка активности"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+
+        now = time.monotonic()
+        if self._deadline(session) <= now:
+            self.remove(session_id)
+            return None
+
+        now_wall = time.time()
+        session["_active"] = now
+        session["last_activity"] = self._isoformat(now_wall)
+        session["last_activity_ts"] = now_wall
+
+        # Активность сохраняем не чаще раза в touch_interval
+        if now - session["_saved"] >= self.touch_interval:
+            session["_saved"] = now
+            self.backend.save(session_id, self._record(session))
+
+        return self._public(session)
+
+    def remove(self, session_id: str):
+        """Удаление сессии (запись в куче удалится при извлечении)"""
+        if self.sessions.pop(session_id, None) is not None:
+            self.backend.delete(session_id)
+
+    def expire(self) -> int:
+        """Удаление истекших сессий; стоимость - O(log n) на истекшую"""
+        now = time.monotonic()
+        removed = 0
+
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, session_id = heapq.heappop(self._deadlines)
+            session = self.sessions.get(session_id)
+            if session is None:
+                continue
+
+            deadline = self._deadline(session)
+            if deadline <= now:
+                self.remove(session_id)
+                removed += 1
+            else:
+                heapq.heappush(self._deadlines, (deadline, session_id))
+
+        return removed
@@ -0,0 +1,920 @@
+"""
+Слой хранения данных
+"""
+import atexit
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import AppPaths, AppConfig
+
+
+LOG_FIELDNAMES = ["timestamp", "username", "status", "ip_address"]
+REPORT_FIELDNAMES = ["name", "path", "created", "author",
+                     "description", "source_doc", "size"]
+
+
+class JournaledUserStore(Mapping):
+    """Хранилище пользователей: снимок (users.json) + журнал изменений
+
+    Каждое изменение дописывается одной строкой JSON в журнал, поэтому
+    вход пользователя стоит несколько десятков байт вместо полной
+    перезаписи файла. Когда журнал разрастается, он сворачивается
+    в новый снимок.
+    """
+
+    def __init__(self, snapshot_file: Path, journal_file: Optional[Path] = None,
+                 compact_threshold: int = AppConfig.USERS_JOURNAL_COMPACT_THRESHOLD,
+                 fsync: bool = AppConfig.USERS_JOURNAL_FSYNC,
+                 on_compact: Optional[Callable[[], None]] = None):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = Path(journal_file) if journal_file else \
+            self.snapshot_file.with_suffix('.journal')
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.on_compact = on_compact
+
+        self._users: Dict[str, Dict] = {}
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+        self._journal_fd = None
+
+        self.load()
+
+    # --- Mapping ---
+
+    def __getitem__(self, username: str) -> Dict:
+        return self._users[username]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._users)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, username) -> bool:
+        return username in self._users
+
+    def count_by_role(self) -> Dict[str, int]:
+        """Количество пользователей по ролям"""
+        roles_count = {}
+        for user in self._users.values():
+            role = user.get("role", "unknown")
+            roles_count[role] = roles_count.get(role, 0) + 1
+        return roles_count
+
+    # --- Загрузка ---
+
+    def load(self):
+        """Загрузка снимка и воспроизведение журнала"""
+        with self._lock:
+            self._users = {}
+            if self.snapshot_file.exists():
+                try:
+                    with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                        self._users = json.load(f)
+                except Exception as e:
+                    print(f"Ошибка загрузки снимка пользователей: {e}")
+            self._journal_entries = self._replay_journal()
+
+    def _replay_journal(self) -> int:
+        """Воспроизведение журнала поверх снимка"""
+        if not self.journal_file.exists():
+            return 0
+
+        applied = 0
+        valid_size = 0
+        with open(self.journal_file, 'rb') as f:
+            for raw_line in f:
+                # Недописанная строка (сбой во время записи) - отбрасываем хвост
+                if not raw_line.endswith(b'\n'):
+                    break
+                try:
+                    entry = json.loads(raw_line.decode('utf-8'))
+                except (UnicodeDecodeError, ValueError):
+                    break
+                self._apply(entry)
+                applied += 1
+                valid_size += len(raw_line)
+
+        if valid_size != self.journal_file.stat().st_size:
+            print("Журнал пользователей поврежден, хвост отброшен")
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_size)
+
+        return applied
+
+    def _apply(self, entry: Dict):
+        """Применение записи журнала к данным в памяти"""
+        op = entry.get("op")
+        username = entry.get("user")
+
+        if op == "put":
+            self._users[username] = entry["data"]
+        elif op == "patch":
+            if username in self._users:
+                self._users[username].update(entry["data"])
+        elif op == "del":
+            self._users.pop(username, None)
+
+    # --- Изменения ---
+
+    def put(self, username: str, record: Dict):
+        """Добавление или полная замена записи пользователя"""
+        self._commit({"op": "put", "user": username, "data": record})
+
+    def put_many(self, records: Dict[str, Dict]):
+        """Добавление нескольких записей одной записью в журнал"""
+        self._commit(*[{"op": "put", "user": username, "data": record}
+                       for username, record in records.items()])
+
+    def patch(self, username: str, fields: Dict):
+        """Частичное обновление записи пользователя"""
+        self._commit({"op": "patch", "user": username, "data": fields})
+
+    def remove(self, username: str):
+        """Удаление пользователя"""
+        self._commit({"op": "del", "user": username})
+
+    def replace_all(self, users: Dict[str, Dict]):
+        """Полная замена содержимого с немедленным сохранением снимка"""
+        with self._lock:
+            self._users = dict(users)
+            self.compact()
+
+    def _commit(self, *entries: Dict):
+        """Запись в журнал и применение изменений"""
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n"
+                       for entry in entries).encode('utf-8')
+
+        with self._lock:
+            fd = self._open_journal()
+            os.write(fd, data)
+            if self.fsync:
+                os.fsync(fd)
+
+            for entry in entries:
+                self._apply(entry)
+            self._journal_entries += len(entries)
+
+            if self._journal_entries >= self.compact_threshold:
+                self.compact()
+
+    def _open_journal(self) -> int:
+        if self._journal_fd is None:
+            self._journal_fd = os.open(
+                self.journal_file,
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                0o644
+            )
+        return self._journal_fd
+
+    # --- Сжатие ---
+
+    def compact(self):
+        """Свертка журнала в новый снимок
+
+        Снимок пишется во временный файл и атомарно подменяет старый,
+        только после этого журнал обнуляется. Если сбой произойдет между
+        этими шагами, повторное воспроизведение журнала поверх нового
+        снимка даст тот же результат: операции put/patch/del идемпотентны.
+        """
+        with self._lock:
+            if self.on_compact:
+                self.on_compact()
+
+            tmp_file = self.snapshot_file.with_name(self.snapshot_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._users, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+
+            self._close_journal()
+            with open(self.journal_file, 'wb'):
+                pass
+            self._journal_entries = 0
+
+    def _close_journal(self):
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+
+    def close(self):
+        """Закрытие журнала"""
+        with self._lock:
+            self._close_journal()
+
+
+class CsvLoginLog:
+    """Журнал входов в CSV-файле с ротацией
+
+    Текущий сегмент переименовывается в login_log.<время>.csv(.gz), когда
+    превышает rotate_bytes или становится старше rotate_seconds.
+    Хранится не более rotate_keep старых сегментов.
+    """
+
+    def __init__(self, log_file: Path,
+                 rotate_bytes: int = AppConfig.LOG_ROTATE_BYTES,
+                 rotate_seconds: int = AppConfig.LOG_ROTATE_SECONDS,
+                 rotate_keep: int = AppConfig.LOG_ROTATE_KEEP,
+                 compress: bool = AppConfig.LOG_ROTATE_GZIP):
+        self.log_file = Path(log_file)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.rotate_keep = rotate_keep
+        self.compress = compress
+
+        self._file = None
+        self._writer = None
+        self._segment_started = None
+
+    def append(self, row: Dict):
+        """Добавление записи"""
+        self.append_many([row])
+
+    def append_many(self, rows: List[Dict]):
+        """Пакетная запись; файл остается открытым между вызовами"""
+        if self._file is not None and self._should_rotate():
+            self.rotate()
+
+        if self._file is None:
+            self._open()
+
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def sync(self):
+        """Сброс записанных данных на диск"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _open(self):
+        file_exists = self.log_file.exists() and self.log_file.stat().st_size > 0
+        self._file = open(self.log_file, 'a', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=LOG_FIELDNAMES)
+
+        if not file_exists:
+            self._writer.writeheader()
+            self._segment_started = time.time()
+        else:
+            self._segment_started = self._first_timestamp()
+
+    def _first_timestamp(self) -> float:
+        """Время первой записи сегмента (для ротации по времени)"""
+        with open(self.log_file, 'r', encoding='utf-8', newline='') as f:
+            for values in csv.reader(f):
+                if values and values[0] != "timestamp":
+                    try:
+                        return datetime.strptime(values[0], "%Y-%m-%d %H:%M:%S").timestamp()
+                    except ValueError:
+                        break
+        return time.time()
+
+    def _should_rotate(self) -> bool:
+        if self.rotate_bytes and self._file.tell() >= self.rotate_bytes:
+            return True
+        if self.rotate_seconds and time.time() - self._segment_started >= self.rotate_seconds:
+            return True
+        return False
+
+    def rotate(self):
+        """Закрытие текущего сегмента и начало нового"""
+        self.close()
+        if not self.log_file.exists():
+            return
+
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        rotated = self.log_file.with_name(f"{self.log_file.stem}.{stamp}{self.log_file.suffix}")
+        os.replace(self.log_file, rotated)
+
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(f"{rotated}.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            rotated.unlink()
+
+        self._cleanup_segments()
+
+    def _cleanup_segments(self):
+        """Удаление самых старых сегментов сверх rotate_keep"""
+        segments = sorted(self.log_file.parent.glob(f"{self.log_file.stem}.*{self.log_file.suffix}*"))
+        if self.rotate_keep and len(segments) > self.rotate_keep:
+            for segment in segments[:-self.rotate_keep]:
+                segment.unlink()
+
+    def read_all(self) -> List[Dict]:
+        """Все записи журнала"""
+        if not self.log_file.exists():
+            return []
+
+        with open(self.log_file, 'r', encoding='utf-8', newline='') as f:
+            # Заголовок может отсутствовать в старых файлах
+            return [row for row in csv.DictReader(f, fieldnames=LOG_FIELDNAMES)
+                    if row["timestamp"] != "timestamp"]
+
+    def recent(self, limit: int) -> List[Dict]:
+        """Последние limit записей (от старых к новым)"""
+        if limit <= 0 or not self.log_file.exists():
+            return []
+
+        lines = self._tail_lines(limit)
+        reader = csv.reader(io.StringIO("\n".join(lines)))
+        rows = [dict(zip(LOG_FIELDNAMES, values)) for values in reader
+                if values and values[0] != "timestamp"]
+        return rows[-limit:]
+
+    def _tail_lines(self, limit: int, block_size: int = 8192) -> List[str]:
+        """Чтение последних строк файла блоками с конца
+
+        Стоимость зависит только от limit, а не от размера журнала.
+        Поля журнала не содержат переводов строк, поэтому строка файла
+        всегда соответствует одной записи CSV.
+        """
+        with open(self.log_file, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            lines: List[bytes] = []
+            partial = b''
+
+            # +1 строка про запас: верхняя может оказаться заголовком
+            while pos > 0 and len(lines) <= limit:
+                read_size = min(block_size, pos)
+                pos -= read_size
+                f.seek(pos)
+                parts = (f.read(read_size) + partial).split(b'\n')
+                partial = parts[0]
+                lines = [line for line in parts[1:] if line.strip()] + lines
+
+            if pos == 0 and partial.strip():
+                lines.insert(0, partial)
+
+        return [line.decode('utf-8', errors='replace').rstrip('\r')
+                for line in lines[-(limit + 1):]]
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class BackgroundLogWriter:
+    """Фоновая запись журнала входов
+
+    Записи кладутся в ограниченную очередь и пишутся отдельным потоком
+    пачками; fsync выполняется не чаще раза в fsync_interval секунд.
+    Вызывающий поток (UI) не ждет диска. Если очередь переполнена,
+    append блокируется - записи аудита не теряются.
+    """
+
+    _STOP = object()
+
+    def __init__(self, backend,
+                 queue_size: int = AppConfig.LOG_QUEUE_SIZE,
+                 batch_size: int = AppConfig.LOG_BATCH_SIZE,
+                 fsync_interval: float = AppConfig.LOG_FSYNC_INTERVAL):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="login-log-writer",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, row: Dict):
+        """Постановка записи в очередь"""
+        if self._closed:
+            self.backend.append(row)
+            return
+        self._queue.put(row)
+
+    def recent(self, limit: int) -> List[Dict]:
+        """Последние записи (с учетом еще не записанных)"""
+        self.flush()
+        return self.backend.recent(limit)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Ожидание записи всего, что уже поставлено в очередь"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+
+            batch, markers, stop = [], [], False
+            while item is not None:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch:
+                try:
+                    self.backend.append_many(batch)
+                    dirty = True
+                except Exception as e:
+                    print(f"Ошибка записи лога: {e}")
+
+            now = time.monotonic()
+            if dirty and (stop or markers or now - last_sync >= self.fsync_interval):
+                try:
+                    self.backend.sync()
+                except Exception as e:
+                    print(f"Ошибка записи лога: {e}")
+                last_sync = now
+                dirty = False
+
+            for marker in markers:
+                marker.set()
+
+            if stop:
+                return
+
+    def close(self):
+        """Запись остатка очереди и остановка потока"""
+        if self._closed:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._closed = True
+        self.backend.close()
+
+
+class JsonReportsIndex:
+    """Индекс отчетов в JSON-файле"""
+
+    def __init__(self, index_file: Path):
+        self.index_file = Path(index_file)
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.index_file.exists():
+            return {}
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, index: Dict[str, Dict]):
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4, ensure_ascii=False)
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        return self._load().get(report_id)
+
+    def put(self, report_id: str, record: Dict):
+        index = self._load()
+        index[report_id] = record
+        self._save(index)
+
+    def remove(self, report_id: str):
+        index = self._load()
+        if index.pop(report_id, None) is not None:
+            self._save(index)
+
+    def query(self, author: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Отчеты (новые первыми), опционально по автору"""
+        reports = [dict(record, id=report_id)
+                   for report_id, record in self._load().items()
+                   if author is None or record.get("author") == author]
+        reports.sort(key=lambda r: r.get("created", ""), reverse=True)
+        return reports[:limit] if limit else reports
+
+    def close(self):
+        pass
+
+
+class SqliteDatabase:
+    """Общее подключение к базе SQLite (режим WAL)"""
+
+    _instances: Dict[str, "SqliteDatabase"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.commit()
+
+    @classmethod
+    def open(cls, db_file: Path) -> "SqliteDatabase":
+        """Одно подключение на файл базы в пределах процесса"""
+        key = str(Path(db_file).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(db_file)
+            return cls._instances[key]
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция под общей блокировкой"""
+        with self._lock:
+            with self.conn:
+                yield self.conn
+
+    def query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    def set_meta(self, conn: sqlite3.Connection, key: str, value: str):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     (key, value))
+
+    def checkpoint(self):
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class SqliteUserStore(Mapping):
+    """Хранилище пользователей в SQLite
+
+    Записи читаются по запросу через первичный ключ, поэтому загружать
+    всех пользователей в память не нужно. Возвращаемые словари - копии:
+    изменения сохраняются только через put/patch/remove.
+    """
+
+    def __init__(self, db: SqliteDatabase, legacy_file: Optional[Path] = None):
+        self.db = db
+        with db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    role TEXT,
+                    department TEXT,
+                    data TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_department "
+                         "ON users(department)")
+
+        if legacy_file is not None and db.get_meta("users_migrated") is None:
+            self._migrate(Path(legacy_file))
+
+    def _migrate(self, legacy_file: Path):
+        """Перенос пользователей из users.json (с журналом изменений)"""
+        users = {}
+        if legacy_file.exists():
+            legacy = JournaledUserStore(legacy_file)
+            users = {name: legacy[name] for name in legacy}
+            legacy.close()
+
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO users (username, role, department, data) "
+                "VALUES (?, ?, ?, ?)",
+                [self._row(name, record) for name, record in users.items()]
+            )
+            self.db.set_meta(conn, "users_migrated", str(len(users)))
+
+    @staticmethod
+    def _row(username: str, record: Dict) -> tuple:
+        return (username, record.get("role"), record.get("department"),
+                json.dumps(record, ensure_ascii=False))
+
+    # --- Mapping ---
+
+    def __getitem__(self, username: str) -> Dict:
+        rows = self.db.query("SELECT data FROM users WHERE username = ?", (username,))
+        if not rows:
+            raise KeyError(username)
+        return json.loads(rows[0]["data"])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([row["username"] for row in
+                     self.db.query("SELECT username FROM users ORDER BY rowid")])
+
+    def __len__(self) -> int:
+        return self.db.query("SELECT COUNT(*) AS n FROM users")[0]["n"]
+
+    def __contains__(self, username) -> bool:
+        return bool(self.db.query("SELECT 1 FROM users WHERE username = ?", (username,)))
+
+    def count_by_role(self) -> Dict[str, int]:
+        """Количество пользователей по ролям (по индексу role)"""
+        rows = self.db.query(
+            "SELECT COALESCE(role, 'unknown') AS role, COUNT(*) AS n "
+            "FROM users GROUP BY role"
+        )
+        return {row["role"]: row["n"] for row in rows}
+
+    def by_department(self, department: str) -> List[str]:
+        """Пользователи отдела (по индексу department)"""
+        rows = self.db.query("SELECT username FROM users WHERE department = ?",
+                             (department,))
+        return [row["username"] for row in rows]
+
+    # --- Изменения ---
+
+    def put(self, username: str, record: Dict):
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO users (username, role, department, data) "
+                "VALUES (?, ?, ?, ?)", self._row(username, record)
+            )
+
+    def put_many(self, records: Dict[str, Dict]):
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO users (username, role, department, data) "
+                "VALUES (?, ?, ?, ?)",
+                [self._row(name, record) for name, record in records.items()]
+            )
+
+    def patch(self, username: str, fields: Dict):
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT data FROM users WHERE username = ?",
+                               (username,)).fetchone()
+            if row is None:
+                return
+            record = json.loads(row["data"])
+            record.update(fields)
+            conn.execute(
+                "UPDATE users SET role = ?, department = ?, data = ? WHERE username = ?",
+                self._row(username, record)[1:] + (username,)
+            )
+
+    def remove(self, username: str):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+
+    def replace_all(self, users: Dict[str, Dict]):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (username, role, department, data) VALUES (?, ?, ?, ?)",
+                [self._row(name, record) for name, record in users.items()]
+            )
+
+    def compact(self):
+        self.db.checkpoint()
+
+    def close(self):
+        pass
+
+
+class SqliteLoginLog:
+    """Журнал входов в SQLite
+
+    Хранение ограничено тем же сроком, что и у CSV-журнала: текущий
+    сегмент и rotate_keep старых, по rotate_seconds каждый. Записи
+    старше срока удаляются из таблицы (при открытии и затем не чаще
+    раза в PRUNE_INTERVAL при записи); если задан archive_file, они
+    перед удалением дописываются в сжатый сегмент рядом с ним
+    (login_log.<время>.csv.gz), которых тоже хранится не более rotate_keep.
+    """
+
+    PRUNE_INTERVAL = 3600  # сек между проверками срока хранения
+
+    def __init__(self, db: SqliteDatabase, legacy_file: Optional[Path] = None,
+                 archive_file: Optional[Path] = None,
+                 rotate_seconds: int = AppConfig.LOG_ROTATE_SECONDS,
+                 rotate_keep: int = AppConfig.LOG_ROTATE_KEEP):
+        self.db = db
+        self.archive_file = Path(archive_file) if archive_file else None
+        self.rotate_seconds = rotate_seconds
+        self.rotate_keep = rotate_keep
+        self._next_prune = 0.0
+        with db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS login_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    username TEXT,
+                    status TEXT,
+                    ip_address TEXT
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_login_log_timestamp "
+                         "ON login_log(timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_login_log_username "
+                         "ON login_log(username)")
+
+        if legacy_file is not None and db.get_meta("login_log_migrated") is None:
+            self._migrate(Path(legacy_file))
+        self.prune()
+
+    def _migrate(self, legacy_file: Path):
+        """Перенос истории входов из login_log.csv"""
+        rows = CsvLoginLog(legacy_file).read_all()
+        with self.db.transaction() as conn:
+            self.append_many(rows, conn)
+            self.db.set_meta(conn, "login_log_migrated", str(len(rows)))
+
+    def append(self, row: Dict):
+        self.append_many([row])
+
+    def append_many(self, rows: List[Dict], conn: Optional[sqlite3.Connection] = None):
+        """Пакетная вставка записей"""
+        values = [tuple(row.get(name) for name in LOG_FIELDNAMES) for row in rows]
+        sql = ("INSERT INTO login_log (timestamp, username, status, ip_address) "
+               "VALUES (?, ?, ?, ?)")
+        if conn is not None:
+            conn.executemany(sql, values)
+        else:
+            with self.db.transaction() as conn:
+                conn.executemany(sql, values)
+            if time.monotonic() >= self._next_prune:
+                self.prune()
+
+    def prune(self) -> int:
+        """Удаление (с архивированием) записей старше срока хранения"""
+        self._next_prune = time.monotonic() + min(self.PRUNE_INTERVAL, self.rotate_seconds or 1)
+        if not self.rotate_seconds:
+            return 0
+        cutoff = datetime.fromtimestamp(
+            time.time() - self.rotate_seconds * (self.rotate_keep + 1)
+        ).strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.db.transaction() as conn:
+            if self.archive_file is not None:
+                rows = conn.execute(
+                    "SELECT timestamp, username, status, ip_address FROM login_log "
+                    "WHERE timestamp < ? ORDER BY id", (cutoff,)
+                ).fetchall()
+                if rows:
+                    self._archive([dict(row) for row in rows])
+            removed = conn.execute("DELETE FROM login_log WHERE timestamp < ?",
+                                   (cutoff,)).rowcount
+        return removed
+
+    def _archive(self, rows: List[Dict]):
+        """Сжатый сегмент с удаляемыми записями (как у CsvLoginLog)"""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        segment = self.archive_file.with_name(
+            f"{self.archive_file.stem}.{stamp}{self.archive_file.suffix}.gz")
+        with gzip.open(segment, 'wt', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=LOG_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+        CsvLoginLog(self.archive_file, rotate_keep=self.rotate_keep)._cleanup_segments()
+
+    def sync(self):
+        pass
+
+    def recent(self, limit: int) -> List[Dict]:
+        """Последние limit записей (от старых к новым)"""
+        rows = self.db.query(
+            "SELECT timestamp, username, status, ip_address FROM login_log "
+            "ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [dict(row) for row in reversed(rows)]
+
+    def close(self):
+        pass
+
+
+class SqliteReportsIndex:
+    """Индекс отчетов в SQLite"""
+
+    def __init__(self, db: SqliteDatabase, legacy_file: Optional[Path] = None):
+        self.db = db
+        with db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id TEXT PRIMARY KEY,
+                    name TEXT,
+                    path TEXT,
+                    created TEXT,
+                    author TEXT,
+                    description TEXT,
+                    source_doc TEXT,
+                    size INTEGER
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_author ON reports(author)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created)")
+
+        if legacy_file is not None and db.get_meta("reports_migrated") is None:
+            self._migrate(Path(legacy_file))
+
+    def _migrate(self, legacy_file: Path):
+        """Перенос индекса отчетов из _reports_index.json"""
+        index = JsonReportsIndex(legacy_file)._load() if legacy_file.exists() else {}
+        with self.db.transaction() as conn:
+            conn.executemany(self._insert_sql(),
+                             [self._row(rid, rec) for rid, rec in index.items()])
+            self.db.set_meta(conn, "reports_migrated", str(len(index)))
+
+    @staticmethod
+    def _insert_sql() -> str:
+        return ("INSERT OR REPLACE INTO reports (id, name, path, created, author, "
+                "description, source_doc, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+    @staticmethod
+    def _row(report_id: str, record: Dict) -> tuple:
+        return (report_id,) + tuple(record.get(name) for name in REPORT_FIELDNAMES)
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        rows = self.db.query("SELECT * FROM reports WHERE id = ?", (report_id,))
+        if not rows:
+            return None
+        record = dict(rows[0])
+        del record["id"]
+        return record
+
+    def put(self, report_id: str, record: Dict):
+        with self.db.transaction() as conn:
+            conn.execute(self._insert_sql(), self._row(report_id, record))
+
+    def remove(self, report_id: str):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+
+    def query(self, author: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Отчеты (новые первыми), опционально по автору"""
+        sql = "SELECT * FROM reports"
+        params = []
+        if author is not None:
+            sql += " WHERE author = ?"
+            params.append(author)
+        sql += " ORDER BY created DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.db.query(sql, params)]
+
+    def close(self):
+        pass
+
+
+def _sqlite_db() -> SqliteDatabase:
+    return SqliteDatabase.open(AppPaths.DATA_DIR / AppConfig.SQLITE_DB_NAME)
+
+
+def open_user_store(on_compact: Optional[Callable[[], None]] = None):
+    """Хранилище пользователей согласно AppConfig.STORAGE_BACKEND"""
+    if AppConfig.STORAGE_BACKEND == "sqlite":
+        return SqliteUserStore(_sqlite_db(), legacy_file=AppPaths.USERS_FILE)
+    return JournaledUserStore(AppPaths.USERS_FILE, on_compact=on_compact)
+
+
+_login_log = None
+_login_log_lock = threading.Lock()
+
+
+def open_login_log():
+    """Журнал входов согласно AppConfig.STORAGE_BACKEND
+
+    Один экземпляр на процесс: все LoginLogger пишут через общий
+    фоновый поток (если включен AppConfig.LOG_ASYNC).
+    """
+    global _login_log
+    with _login_log_lock:
+        if _login_log is None:
+            if AppConfig.STORAGE_BACKEND == "sqlite":
+                backend = SqliteLoginLog(
+                    _sqlite_db(), legacy_file=AppPaths.LOG_FILE,
+                    archive_file=AppPaths.LOG_FILE if AppConfig.LOG_ROTATE_GZIP else None)
+            else:
+                backend = CsvLoginLog(AppPaths.LOG_FILE)
+            _login_log = BackgroundLogWriter(backend) if AppConfig.LOG_ASYNC else backend
+        return _login_log
+
+
+def open_reports_index():
+    """Индекс отчетов согласно AppConfig.STORAGE_BACKEND"""
+    if AppConfig.STORAGE_BACKEND == "sqlite":
+        return SqliteReportsIndex(_sqlite_db(), legacy_file=AppPaths.REPORTS_INDEX)
+    return JsonReportsIndex(AppPaths.REPORTS_INDEX)
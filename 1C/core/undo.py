@@ -0,0 +1,318 @@
+"""
+История правок редактора (отмена и повтор)
+"""
+import pickle
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import AppPaths, AppConfig
+
+
+class UndoHistory:
+    """Отмена и повтор правок документа с ограничением памяти
+
+    История подписывается на правки PieceTable (record) и хранит их
+    разницами (вид, смещение, текст), а не копиями документа. Подряд
+    набранные символы (и удаленные Backspace/Delete) склеиваются в одну
+    правку; пауза в наборе, пробел после слова или переход в другое
+    место начинают новый шаг отмены. Длинный текст правки хранится
+    сжатым.
+
+    Когда история занимает больше memory_limit байт, самые старые шаги
+    выгружаются во временный файл (до spill_limit байт), а сверх него
+    забываются. Выгруженные шаги лежат в файле по порядку, поэтому
+    отмена читает последний из них с конца файла и обрезает файл.
+    """
+
+    OVERHEAD = 64  # байт на правку сверх ее текста (кортеж, числа, место в списке)
+
+    def __init__(self, memory_limit: int = AppConfig.UNDO_MEMORY_LIMIT,
+                 spill_limit: int = AppConfig.UNDO_SPILL_LIMIT,
+                 group_delay: float = AppConfig.UNDO_GROUP_DELAY,
+                 spill_dir: Optional[Path] = None):
+        self.memory_limit = memory_limit
+        self.spill_limit = spill_limit
+        self.group_delay = group_delay
+        self.spill_dir = Path(spill_dir) if spill_dir else AppPaths.DATA_DIR
+
+        # Шаги от старых к новым: [правки, размер] или, для выгруженных,
+        # (позиция в файле, длина); выгружены первые _spilled шагов
+        self._undo = deque()
+        self._redo: List[list] = []
+        self._spilled = 0
+        self._spill_file = None
+        self._spill_start = 0  # до этой позиции в файле - забытые шаги
+        self.memory = 0  # байт в памяти (отмена и повтор)
+
+        self.enabled = True
+        self._open = None  # шаг, к которому дописываются правки
+        self._typing = False  # последняя правка - набор или удаление по символу
+        self._last_time = 0.0
+        self._grouping = 0
+
+    # --- Запись ---
+
+    def record(self, event: tuple):
+        """Подписчик правок PieceTable"""
+        kind, offset, text, origin = event
+        if origin is self or not self.enabled:
+            return
+        now = time.monotonic()
+        self._clear_redo()
+
+        if not self._grouping and self._continues(kind, offset, text, now):
+            self._merge(kind, offset, text)
+        else:
+            if self._open is None or not self._grouping:
+                self._open = [[], 0]
+                self._undo.append(self._open)
+            self._add(self._open, (kind, offset, self._pack(text)))
+            self._typing = len(text) == 1
+        self._last_time = now
+        self._enforce()
+
+    def _continues(self, kind: str, offset: int, text: str, now: float) -> bool:
+        """Продолжает ли правка текущий шаг (набор с клавиатуры)"""
+        if self._open is None or len(text) != 1 or now - self._last_time > self.group_delay:
+            return False
+        deltas = self._open[0]
+        last_kind, last_offset, last_text = deltas[-1]
+        if not isinstance(last_text, str):
+            return False
+
+        if kind == "insert" and last_kind == "delete":
+            # Набор поверх выделения: удаление и первый символ - один шаг
+            return len(deltas) == 1 and offset == last_offset
+        if not self._typing or kind != last_kind:
+            return False
+        if kind == "insert":
+            # Пробел или перевод строки после слова начинает новый шаг
+            return offset == last_offset + len(last_text) and \
+                not (text.isspace() and not last_text[-1].isspace())
+        # Backspace сдвигает начало удаления влево, Delete - нет
+        return offset + 1 == last_offset or offset == last_offset
+
+    def _merge(self, kind: str, offset: int, text: str):
+        deltas = self._open[0]
+        last_kind, last_offset, last_text = deltas[-1]
+        if kind != last_kind:
+            self._add(self._open, (kind, offset, text))
+        else:
+            if kind == "insert":
+                merged = (kind, last_offset, last_text + text)
+            elif offset < last_offset:
+                merged = (kind, offset, text + last_text)
+            else:
+                merged = (kind, last_offset, last_text + text)
+            self._resize(self._open, -self._size(deltas[-1]))
+            deltas[-1] = merged
+            self._resize(self._open, self._size(merged))
+        self._typing = True
+
+    def separator(self):
+        """Граница шага отмены (например, после перемещения курсора)"""
+        if not self._grouping:
+            self._open = None
+
+    @contextmanager
+    def group(self):
+        """Все правки внутри блока отменяются одним шагом"""
+        if not self._grouping:
+            self._open = None
+        self._grouping += 1
+        try:
+            yield
+        finally:
+            self._grouping -= 1
+            if not self._grouping:
+                self._open = None
+
+    # --- Отмена и повтор ---
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self, document) -> Optional[int]:
+        """Отмена последнего шага; возвращает смещение для курсора"""
+        self._open = None
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        if isinstance(entry, tuple):
+            entry = self._unspill(entry)
+        else:
+            self.memory -= entry[1]
+
+        cursor = None
+        for kind, offset, payload in reversed(entry[0]):
+            text = self._unpack(payload)
+            if kind == "insert":
+                document.delete(offset, offset + len(text), origin=self)
+                cursor = offset
+            else:
+                document.insert(offset, text, origin=self)
+                cursor = offset + len(text)
+
+        self._redo.append(entry)
+        self.memory += entry[1]
+        self._enforce()
+        return cursor
+
+    def redo(self, document) -> Optional[int]:
+        """Повтор отмененного шага; возвращает смещение для курсора"""
+        self._open = None
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+
+        cursor = None
+        for kind, offset, payload in entry[0]:
+            text = self._unpack(payload)
+            if kind == "insert":
+                document.insert(offset, text, origin=self)
+                cursor = offset + len(text)
+            else:
+                document.delete(offset, offset + len(text), origin=self)
+                cursor = offset
+
+        self._undo.append(entry)
+        return cursor
+
+    def suspend(self):
+        """Правки не записываются до reset() (загрузка документа)"""
+        self.enabled = False
+
+    def reset(self):
+        """Очистка истории (новый или заново загруженный документ)"""
+        self._undo.clear()
+        self._redo.clear()
+        self._spilled = 0
+        self._spill_start = 0
+        if self._spill_file is not None:
+            self._spill_file.truncate(0)
+        self.memory = 0
+        self._open = None
+        self.enabled = True
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    # --- Хранение правок ---
+
+    @staticmethod
+    def _pack(text: str):
+        if len(text) >= AppConfig.UNDO_COMPRESS_THRESHOLD:
+            return zlib.compress(text.encode('utf-8'), AppConfig.BACKUP_COMPRESS_LEVEL)
+        return text
+
+    @staticmethod
+    def _unpack(payload) -> str:
+        return payload if isinstance(payload, str) else zlib.decompress(payload).decode('utf-8')
+
+    def _size(self, delta: tuple) -> int:
+        return self.OVERHEAD + sys.getsizeof(delta[2])
+
+    def _add(self, entry: list, delta: tuple):
+        entry[0].append(delta)
+        self._resize(entry, self._size(delta))
+
+    def _resize(self, entry: list, delta: int):
+        entry[1] += delta
+        self.memory += delta
+
+    def _clear_redo(self):
+        for entry in self._redo:
+            self.memory -= entry[1]
+        self._redo.clear()
+
+    # --- Ограничение памяти ---
+
+    def _enforce(self):
+        """Выгрузка или удаление самых старых шагов сверх memory_limit
+
+        Последний шаг остается в памяти, даже если он один больше лимита.
+        """
+        while self.memory > self.memory_limit and len(self._undo) - self._spilled > 1:
+            entry = self._undo[self._spilled]
+            self.memory -= entry[1]
+            if self.spill_limit > 0 and self._spill(entry):
+                continue
+            # Без старых шагов более старые выгруженные уже не применить
+            self._forget_spilled(self._spilled)
+            self._undo.popleft()
+
+        # Дальше всего отложенные повторы - самые ненужные
+        while self.memory > self.memory_limit and len(self._redo) > 1:
+            self.memory -= self._redo.pop(0)[1]
+
+    def _spill(self, entry: list) -> bool:
+        """Выгрузка шага self._undo[self._spilled] в файл"""
+        try:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(prefix="undo_", dir=self.spill_dir)
+            data = pickle.dumps(entry[0], pickle.HIGHEST_PROTOCOL)
+            position = self._spill_file.seek(0, 2)
+            self._spill_file.write(data)
+        except OSError as e:
+            print(f"Ошибка выгрузки истории правок: {e}")
+            return False
+
+        self._undo[self._spilled] = (position, len(data))
+        self._spilled += 1
+
+        # Сверх spill_limit забываются самые старые выгруженные шаги
+        while self._spilled and position + len(data) - self._spill_start > self.spill_limit:
+            self._forget_spilled(1)
+        return True
+
+    def _forget_spilled(self, count: int):
+        """Удаление count самых старых выгруженных шагов"""
+        for _ in range(count):
+            self._undo.popleft()
+        self._spilled -= count
+        if not self._spilled:
+            self._spill_start = 0
+            if self._spill_file is not None:
+                self._spill_file.truncate(0)
+            return
+
+        self._spill_start = self._undo[0][0]
+        end = self._spill_file.seek(0, 2)
+        if self._spill_start > end - self._spill_start:
+            self._compact(end)
+
+    def _compact(self, end: int):
+        """Перенос живой части файла в начало, когда забытого больше"""
+        f = self._spill_file
+        f.seek(self._spill_start)
+        live = f.read(end - self._spill_start)
+        f.seek(0)
+        f.write(live)
+        f.truncate(len(live))
+        shift = self._spill_start
+        for i in range(self._spilled):
+            position, length = self._undo[i]
+            self._undo[i] = (position - shift, length)
+        self._spill_start = 0
+
+    def _unspill(self, entry: Tuple[int, int]) -> list:
+        """Чтение последнего выгруженного шага (файл обрезается)"""
+        position, length = entry
+        self._spill_file.seek(position)
+        deltas = pickle.loads(self._spill_file.read(length))
+        self._spilled -= 1
+        self._spill_file.truncate(position if self._spilled else 0)
+        if not self._spilled:
+            self._spill_start = 0
+        return [deltas, sum(map(self._size, deltas))]
@@ -0,0 +1,192 @@
+"""
+Просмотр больших документов без загрузки в память
+"""
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+from config import AppConfig
+
+
+class MappedDocument:
+    """Документ, отображенный в память (только чтение)
+
+    Файл не читается целиком: ОС подгружает страницы по мере обращения,
+    поэтому открытие не зависит от размера. Индекс строк строится в фоне
+    блоками: для каждой границы блока хранится число переводов строки
+    до нее, а начало строки внутри блока находится через mmap.find.
+    """
+
+    SEARCH_SLICE = 16 * 1024 * 1024
+
+    def __init__(self, filepath: str, block_size: int = AppConfig.VIEWER_BLOCK_SIZE):
+        self.filepath = str(filepath)
+        self.block_size = block_size
+
+        self._file = open(filepath, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Пустой файл отобразить нельзя
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if self.size else b""
+
+        # newlines[i] - число переводов строки в байтах [0, i * block_size)
+        self._newlines = array('q', [0])
+        self.complete = self.size == 0
+        self._stop = threading.Event()
+        self._indexer = None
+
+        if not self.complete:
+            self._indexer = threading.Thread(target=self._build_index,
+                                             name="line-index", daemon=True)
+            self._indexer.start()
+
+    def _build_index(self):
+        """Подсчет переводов строки по блокам"""
+        total = 0
+        try:
+            for start in range(0, self.size, self.block_size):
+                if self._stop.is_set():
+                    return
+                total += self.buffer[start:start + self.block_size].count(b'\n')
+                self._newlines.append(total)
+            self.complete = True
+        except ValueError:
+            # Документ закрыт во время индексации
+            pass
+
+    def close(self):
+        """Остановка индексации и освобождение отображения"""
+        self._stop.set()
+        if self._indexer is not None:
+            self._indexer.join()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    # --- Строки ---
+
+    @property
+    def indexed_bytes(self) -> int:
+        return min(self.size, (len(self._newlines) - 1) * self.block_size)
+
+    @property
+    def progress(self) -> float:
+        """Доля проиндексированного файла"""
+        return 1.0 if self.complete else self.indexed_bytes / self.size
+
+    @property
+    def indexed_lines(self) -> int:
+        """Число строк, начало которых уже известно по индексу"""
+        return self._newlines[-1] + 1
+
+    def line_count(self) -> int:
+        """Число строк (до окончания индексации - оценка)"""
+        known = self._newlines[-1]
+        if self.complete:
+            return known + 1
+        indexed = self.indexed_bytes
+        if not indexed:
+            return 1
+        return int(known * self.size / indexed) + 1
+
+    def line_offset(self, line: int) -> Optional[int]:
+        """Смещение начала строки (с 0); None - строка еще не проиндексирована"""
+        if line <= 0:
+            return 0
+
+        newlines = self._newlines
+        blocks = len(newlines)
+        if line > newlines[blocks - 1]:
+            return None
+
+        # Блок, в котором находится line-й перевод строки
+        block = bisect_left(newlines, line, 0, blocks) - 1
+        position = block * self.block_size - 1
+        for _ in range(line - newlines[block]):
+            position = self.buffer.find(b'\n', position + 1)
+        return position + 1
+
+    def line_of(self, offset: int, stop: Optional[threading.Event] = None) -> Optional[int]:
+        """Номер строки (с 0), содержащей смещение
+
+        Переводы строки после проиндексированных блоков считаются срезами
+        не больше блока, чтобы не копировать в память весь непроиндексированный
+        участок. None - подсчет прерван через stop.
+        """
+        newlines = self._newlines
+        block = min(offset // self.block_size, len(newlines) - 1)
+        line = newlines[block]
+        for start in range(block * self.block_size, offset, self.block_size):
+            if stop is not None and stop.is_set():
+                return None
+            line += self.buffer[start:min(offset, start + self.block_size)].count(b'\n')
+        return line
+
+    def lines(self, first: int, count: int) -> List[str]:
+        """Строки [first, first + count) - только то, что нужно для показа"""
+        position = self.line_offset(first)
+        if position is None:
+            return []
+
+        result = []
+        while len(result) < count and position <= self.size:
+            end = self.buffer.find(b'\n', position)
+            if end < 0:
+                end = self.size
+            result.append(self.buffer[position:end].decode('utf-8', errors='replace')
+                          .rstrip('\r'))
+            position = end + 1
+        return result
+
+    def decode(self, start: int, end: int) -> str:
+        return self.buffer[start:end].decode('utf-8', errors='replace')
+
+    # --- Поиск ---
+
+    @staticmethod
+    def _pattern(query: str, case_sensitive: bool) -> Tuple[re.Pattern, int]:
+        """Шаблон поиска по байтам UTF-8 и наибольшая длина совпадения
+
+        Регистр учитывается посимвольно, поэтому поиск без учета регистра
+        работает и для кириллицы, а не только для ASCII.
+        """
+        parts = []
+        max_length = 0
+        for char in query:
+            variants = {char} if case_sensitive else {char, char.lower(), char.upper()}
+            encoded = sorted({variant.encode('utf-8') for variant in variants if len(variant) == 1})
+            parts.append(re.escape(encoded[0]) if len(encoded) == 1 else
+                         b"(?:" + b"|".join(map(re.escape, encoded)) + b")")
+            max_length += max(map(len, encoded))
+        return re.compile(b"".join(parts)), max_length
+
+    def search(self, query: str, start: int = 0, case_sensitive: bool = False,
+               stop: Optional[threading.Event] = None) -> Optional[Tuple[int, int]]:
+        """Следующее вхождение начиная со смещения start: (начало, конец) в байтах
+
+        Буфер просматривается срезами, между которыми проверяется stop,
+        чтобы поиск по большому файлу можно было прервать.
+        """
+        if not query:
+            return None
+
+        pattern, max_length = self._pattern(query, case_sensitive)
+        position = start
+        try:
+            while position < self.size:
+                if stop is not None and stop.is_set():
+                    return None
+                end = min(self.size, position + self.SEARCH_SLICE)
+                match = pattern.search(self.buffer, position,
+                                       min(self.size, end + max_length - 1))
+                if match:
+                    return match.start(), match.end()
+                position = end
+        except ValueError:
+            # Документ закрыт во время поиска
+            pass
+        return None
@@ -0,0 +1,46 @@
+"""
+Общие настройки тестов
+
+Данные приложения (папки data, docs, reports, backups) на время тестов
+переносятся во временную папку, чтобы тесты не трогали рабочие файлы.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+
+
+class IsolatedPaths:
+    """Пути приложения внутри временной папки"""
+
+    BASE_DIR = Path(tempfile.mkdtemp(prefix="editor_tests_"))
+    DATA_DIR = BASE_DIR / "data"
+    DOCS_DIR = BASE_DIR / "docs"
+    REPORTS_DIR = BASE_DIR / "reports"
+    BACKUPS_DIR = BASE_DIR / "backups"
+
+    USERS_FILE = DATA_DIR / "users.json"
+    LOG_FILE = DATA_DIR / "login_log.csv"
+    REPORTS_INDEX = REPORTS_DIR / "_reports_index.json"
+
+
+for _directory in (IsolatedPaths.DATA_DIR, IsolatedPaths.DOCS_DIR,
+                   IsolatedPaths.REPORTS_DIR, IsolatedPaths.BACKUPS_DIR):
+    _directory.mkdir(parents=True, exist_ok=True)
+
+# Модули core импортируют AppPaths при загрузке - подменяем до них
+config.AppPaths = IsolatedPaths
+
+
+@pytest.fixture
+def rng():
+    """Генератор случайных чисел с фиксированным зерном (воспроизводимость)"""
+    import random
+    return random.Random(12345)
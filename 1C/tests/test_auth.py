@@ -0,0 +1,61 @@
+"""
+Тесты создания пользователей
+"""
+import pytest
+
+from config import AppConfig
+from core.auth import PasswordHasher, SessionManager, UserManager, get_login_logger
+
+
+@pytest.fixture(autouse=True)
+def password_rules(monkeypatch):
+    # config.py этой настройки не задает (как и AppPaths, см. conftest)
+    monkeypatch.setattr(AppConfig, "PASSWORD_MIN_LENGTH", 8, raising=False)
+
+
+@pytest.fixture(scope="module")
+def users():
+    return UserManager()
+
+
+def test_add_user_hashes_in_pool(users):
+    ok, _ = users.add_user("Проверка_Один", "Secret123!", role="editor")
+    assert ok
+    record = users.get_user("Проверка_Один")
+    assert record["role"] == "editor"
+    assert PasswordHasher.verify_password(record["password"], "Secret123!")
+
+    ok, message = users.add_user("Проверка_Один", "Secret123!")
+    assert not ok and "существует" in message
+
+
+def test_add_users_reports_each_entry(users):
+    batch = [
+        ("Пакет_1", "Secret123!", {}),
+        ("Пакет_2", "short", {}),
+        ("Пакет_1", "Secret123!", {}),
+        ("Пакет_3", "Other456#", {"department": "IT"}),
+    ]
+    results = users.add_users(batch)
+
+    assert [ok for ok, _ in results] == [True, False, False, True]
+    assert users.get_user("Пакет_2") is None
+    assert users.get_user("Пакет_3")["department"] == "IT"
+    assert PasswordHasher.verify_password(users.get_user("Пакет_3")["password"], "Other456#")
+
+
+def test_login_logger_is_shared():
+    logger = get_login_logger()
+    assert get_login_logger() is logger
+    assert SessionManager().logger is logger
+
+
+def test_recent_failures_from_buffer_and_log():
+    logger = get_login_logger()
+    for i in range(30):
+        logger.log_attempt(f"user{i}", "FAILURE" if i % 3 else "SUCCESS", "10.0.0.7")
+    logger.log_attempt("other", "FAILURE", "10.0.0.8")
+
+    buffered = logger.get_recent_failures("10.0.0.7", limit=10)
+    assert [row["username"] for row in buffered] == ["user22", "user23", "user25",
+                                                     "user26", "user28", "user29"]
@@ -0,0 +1,66 @@
+"""
+Тесты фонового автосохранения: каждое сохранение дает один результат
+"""
+import threading
+
+import pytest
+
+from core.autosave import AutosaveWorker, RecoveryJournal
+
+
+class SlowDocuments:
+    """Менеджер документов, сохранение в котором ждет разрешения"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.allow = threading.Event()
+        self.saved = []
+
+    def save_document(self, filepath, content, record=True):
+        self.started.set()
+        self.allow.wait(10)
+        self.saved.append((filepath, "".join(content), record))
+        return True
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = RecoveryJournal("user", tmp_path / "recovery")
+    yield journal
+    journal.close()
+
+
+def drain(worker):
+    results = []
+    while not worker.results.empty():
+        results.append(worker.results.get())
+    return results
+
+
+def test_every_autosave_reports_result(journal):
+    documents = SlowDocuments()
+    worker = AutosaveWorker(documents, journal, save_documents=True)
+
+    # Первое автосохранение занимает поток, следующие копятся в очереди
+    worker.autosave("a.txt", "1", 1)
+    assert documents.started.wait(10)
+    for generation in range(2, 6):
+        worker.autosave("a.txt", str(generation), generation)
+    documents.allow.set()
+    worker.close()
+
+    results = drain(worker)
+    assert sorted(generation for _, generation, _, _ in results) == [1, 2, 3, 4, 5]
+    assert not any(explicit for _, _, _, explicit in results)
+    # Из ожидавших записан только последний текст, без версии в истории
+    assert documents.saved == [("a.txt", "1", False), ("a.txt", "5", False)]
+    assert [generation for _, generation, ok, _ in results if ok] == [1, 5]
+
+
+def test_autosave_without_document_goes_to_journal(journal):
+    worker = AutosaveWorker(SlowDocuments(), journal, save_documents=False)
+    worker.autosave("a.txt", "текст", 7)
+    worker.close()
+
+    assert drain(worker) == [("a.txt", 7, False, False)]
+    assert journal.read(journal.entry_id) == "текст"
@@ -0,0 +1,97 @@
+"""
+Тесты хранилища резервных копий с дедупликацией
+"""
+import pytest
+
+from core.backups import BackupStore
+from core.storage import SqliteDatabase
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(SqliteDatabase.open(tmp_path / "backups.db"))
+
+
+def random_text(rng, lines):
+    return "".join(f"строка {rng.randrange(10 ** 6)} {'x' * rng.randrange(40)}\n"
+                   for _ in range(lines)).encode('utf-8')
+
+
+def test_versions_read_back_exactly(store, rng):
+    store.set_policy("documents/a.txt", keep=100)
+    data = random_text(rng, 300)
+    saved = {}
+    for _ in range(20):
+        lines = data.split(b'\n')
+        position = rng.randrange(len(lines))
+        lines[position:position + rng.randrange(3)] = [f"правка {rng.randrange(10 ** 6)}".encode("utf-8")]
+        data = b'\n'.join(lines)
+        saved[store.backup_bytes("documents/a.txt", data)] = data
+
+    for version_id, data in saved.items():
+        assert store.read_version(version_id) == data
+
+
+def test_split_is_lossless_and_bounded(tmp_path, rng):
+    store = BackupStore(SqliteDatabase.open(tmp_path / "small.db"), min_chunk=64, max_chunk=1024)
+    data = random_text(rng, 500) + b"no newline" * 300
+    chunks = list(store.split(data))
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= store.max_chunk for chunk in chunks)
+
+
+def test_unchanged_content_is_not_stored_again(store, rng):
+    data = random_text(rng, 100)
+    first = store.backup_bytes("documents/a.txt", data)
+    assert store.backup_bytes("documents/a.txt", data) == first
+    assert len(store.versions("documents/a.txt")) == 1
+
+
+def test_small_edit_reuses_chunks(store, rng):
+    data = random_text(rng, 20000)
+    store.backup_bytes("documents/a.txt", data)
+    before = store.stats()
+
+    middle = len(data) // 2
+    store.backup_bytes("documents/a.txt", data[:middle] + b"!" + data[middle:])
+    after = store.stats()
+
+    assert after["logical_size"] == 2 * before["logical_size"] + 1
+    # Новыми оказываются только фрагменты вокруг правки
+    assert after["unique_size"] - before["unique_size"] < before["unique_size"] // 5
+
+
+def test_prune_keeps_latest_and_drops_unreferenced_chunks(store, rng):
+    store.set_policy("documents/a.txt", keep=3)
+    ids = [store.backup_bytes("documents/a.txt", random_text(rng, 50)) for _ in range(6)]
+
+    remaining = [version["id"] for version in store.versions("documents/a.txt")]
+    assert remaining == ids[:-4:-1]
+    for version_id in ids[:3]:
+        assert store.read_version(version_id) is None
+
+    for version_id in remaining:
+        store.delete_version(version_id)
+    assert store.stats()["chunks"] == 0
+
+
+def test_document_save_is_stored_once():
+    from config import AppPaths
+    from core.editor import DocumentManager
+
+    manager = DocumentManager()
+    path = str(AppPaths.DOCS_DIR / "stored_once.txt")
+    assert manager.save_document(path, "первая версия")
+    assert manager.save_document(path, "вторая версия")
+
+    # Прежнее содержимое - в резервной копии, сохраненный текст - в истории
+    backups = manager.list_backups(path)
+    assert [manager.read_backup(item["id"]) for item in backups] == ["первая версия"]
+    versions = manager.list_versions(path)
+    assert [manager.read_version(item["id"]) for item in versions] == \
+        ["вторая версия", "первая версия"]
+
+    # Автосохранение не добавляет ни копий, ни версий
+    assert manager.save_document(path, "черновик", record=False)
+    assert len(manager.list_backups(path)) == 1
+    assert len(manager.list_versions(path)) == 2
@@ -0,0 +1,120 @@
+"""
+Тесты каталога документов: сравнение с прямым просмотром папки
+"""
+import os
+
+import pytest
+
+from core.catalog import DocumentCatalog
+
+# Фиксированный mtime папки до изменений: любое изменение его сдвигает
+OLD_MTIME_NS = 10 ** 18
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def catalog(tmp_path, docs_dir):
+    return DocumentCatalog(docs_dir, tmp_path / "catalog.json")
+
+
+def age_dir(docs_dir):
+    os.utime(docs_dir, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+
+
+def listed(catalog):
+    return sorted(doc["name"] for doc in catalog.list_documents())
+
+
+def on_disk(docs_dir):
+    return sorted(path.name for path in docs_dir.glob("*.txt"))
+
+
+def app_save(catalog, path, text):
+    """Сохранение, как в DocumentManager: временный файл и os.replace"""
+    dir_mtime_ns = catalog.dir_mtime()
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+    catalog.invalidate(str(path), dir_mtime_ns=dir_mtime_ns)
+
+
+def test_app_save_keeps_external_files(catalog, docs_dir):
+    app_save(catalog, docs_dir / "app.txt", "первый")
+    age_dir(docs_dir)
+    catalog.refresh(force=True)
+
+    (docs_dir / "external.txt").write_text("извне", encoding='utf-8')
+    app_save(catalog, docs_dir / "app.txt", "второй")
+
+    assert listed(catalog) == on_disk(docs_dir) == ["app.txt", "external.txt"]
+
+
+def test_app_delete_keeps_external_files(catalog, docs_dir):
+    app_save(catalog, docs_dir / "app.txt", "текст")
+    age_dir(docs_dir)
+    catalog.refresh(force=True)
+
+    (docs_dir / "external.txt").write_text("извне", encoding='utf-8')
+    dir_mtime_ns = catalog.dir_mtime()
+    (docs_dir / "app.txt").unlink()
+    catalog.invalidate(str(docs_dir / "app.txt"), dir_mtime_ns=dir_mtime_ns)
+
+    assert listed(catalog) == on_disk(docs_dir) == ["external.txt"]
+
+
+def test_invalidate_without_dir_mtime_rescans_later(catalog, docs_dir):
+    app_save(catalog, docs_dir / "app.txt", "текст")
+    age_dir(docs_dir)
+    catalog.refresh(force=True)
+
+    (docs_dir / "external.txt").write_text("извне", encoding='utf-8')
+    (docs_dir / "app.txt").write_text("правка", encoding='utf-8')
+    catalog.invalidate(str(docs_dir / "app.txt"))
+
+    assert listed(catalog) == on_disk(docs_dir)
+    assert catalog.entries()["app.txt"]["size"] == len("правка".encode('utf-8'))
+
+
+def test_random_operations_match_directory(catalog, docs_dir, rng):
+    for step in range(200):
+        names = on_disk(docs_dir)
+        action = rng.randrange(4)
+        if action == 0 or not names:
+            app_save(catalog, docs_dir / f"doc{rng.randrange(20)}.txt", "x" * rng.randrange(100))
+        elif action == 1:
+            path = docs_dir / rng.choice(names)
+            dir_mtime_ns = catalog.dir_mtime()
+            path.unlink()
+            catalog.invalidate(str(path), dir_mtime_ns=dir_mtime_ns)
+        elif action == 2:
+            (docs_dir / f"ext{rng.randrange(20)}.txt").write_text("y" * rng.randrange(100),
+                                                                  encoding='utf-8')
+        else:
+            (docs_dir / rng.choice(names)).unlink()
+
+        if rng.randrange(3) == 0:
+            # Внешние изменения в один такт часов с предыдущими не видны
+            # по mtime - сдвигаем его явно, как это сделали бы часы
+            os.utime(docs_dir, ns=(OLD_MTIME_NS + step, OLD_MTIME_NS + step))
+        else:
+            age_dir(docs_dir)
+            catalog.refresh(force=True)
+
+        assert listed(catalog) == on_disk(docs_dir)
+        sizes = {name: entry["size"] for name, entry in catalog.entries().items()}
+        assert sizes == {name: (docs_dir / name).stat().st_size for name in on_disk(docs_dir)}
+
+
+def test_catalog_survives_restart(tmp_path, catalog, docs_dir):
+    app_save(catalog, docs_dir / "a.txt", "a")
+    app_save(catalog, docs_dir / "b.txt", "bb")
+
+    reopened = DocumentCatalog(docs_dir, tmp_path / "catalog.json")
+    assert listed(reopened) == ["a.txt", "b.txt"]
+    assert reopened.stats()["total_size"] == 3
@@ -0,0 +1,38 @@
+"""
+Тесты хеширования паролей и калибровки
+"""
+import pytest
+
+from core.hashing import (ALGORITHMS, HashAlgorithm, HashPolicy, hash_password,
+                          needs_rehash, verify_password)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        HashAlgorithm()
+
+
+@pytest.mark.parametrize("name", sorted(ALGORITHMS))
+def test_hash_verifies_only_own_password(name):
+    algorithm = ALGORITHMS[name]
+    policy = HashPolicy(name, {name: dict(algorithm.min_params)})
+    hashed = hash_password("пароль", policy)
+
+    assert verify_password(hashed, "пароль")
+    assert not verify_password(hashed, "Пароль")
+    assert not needs_rehash(hashed, policy)
+
+
+def test_calibration_can_go_below_default():
+    algorithm = ALGORITHMS["pbkdf2-sha256"]
+    fast = algorithm.calibrate(0.5)
+    assert fast["i"] < algorithm.default_params["i"]
+    assert algorithm.below_minimum(fast)
+    assert not algorithm.below_minimum(algorithm.min_params)
+
+
+def test_scrypt_calibration_can_go_below_default():
+    algorithm = ALGORITHMS["scrypt"]
+    fast = algorithm.calibrate(0.001)
+    assert fast["n"] < algorithm.default_params["n"]
+    assert algorithm.below_minimum(fast)
@@ -0,0 +1,123 @@
+"""
+Тесты модели документа (PieceTable): случайные правки против str
+"""
+from core.editor import LineStats, PieceTable
+
+
+def random_piece(rng):
+    return "".join(rng.choice("ab\nc ") for _ in range(rng.randrange(1, 12)))
+
+
+def check_queries(rng, doc, ref):
+    assert doc.text() == ref
+    assert len(doc) == len(ref)
+    assert doc.line_count == ref.count('\n') + 1
+
+    for _ in range(20):
+        offset = rng.randrange(len(ref) + 1)
+        assert doc.line_of(offset) == ref.count('\n', 0, offset)
+        line, column = doc.index(offset)
+        assert doc.offset(line, column) == offset
+        start = rng.randrange(len(ref) + 1)
+        end = rng.randrange(start, len(ref) + 1)
+        assert doc.get(start, end) == ref[start:end]
+        assert "".join(doc.chunks(start, end)) == ref[start:end]
+
+    lines = ref.split('\n')
+    for _ in range(10):
+        first = rng.randrange(len(lines))
+        count = rng.randrange(1, len(lines) - first + 1)
+        assert doc.lines(first, count) == lines[first:first + count]
+        assert doc.line_start(first) == sum(len(line) + 1 for line in lines[:first])
+
+
+def test_random_edits_match_str(rng):
+    doc = PieceTable("", piece_size=7)
+    ref = ""
+    for step in range(5000):
+        if rng.random() < 0.55 or not ref:
+            offset = rng.randrange(len(ref) + 1)
+            text = random_piece(rng)
+            doc.insert(offset, text)
+            ref = ref[:offset] + text + ref[offset:]
+        else:
+            start = rng.randrange(len(ref) + 1)
+            end = min(len(ref), start + rng.randrange(16))
+            assert doc.delete(start, end) == ref[start:end]
+            ref = ref[:start] + ref[end:]
+        if step % 250 == 0:
+            check_queries(rng, doc, ref)
+    check_queries(rng, doc, ref)
+
+
+def test_snapshots_are_immutable(rng):
+    doc = PieceTable("начальный текст\n" * 50, piece_size=16)
+    snapshots = []
+    for _ in range(200):
+        snapshots.append((doc.snapshot(), doc.text()))
+        offset = rng.randrange(len(doc) + 1)
+        doc.replace(offset, min(len(doc), offset + rng.randrange(10)), random_piece(rng))
+
+    for snapshot, text in snapshots:
+        assert snapshot.text() == text
+        assert snapshot.line_count == text.count('\n') + 1
+
+
+def test_events_replay_to_same_text(rng):
+    doc = PieceTable("abc\ndef", piece_size=5)
+    replica = list(doc.text())
+    origin = object()
+    events = []
+    doc.add_listener(events.append)
+
+    for _ in range(500):
+        offset = rng.randrange(len(doc) + 1)
+        if rng.random() < 0.5:
+            doc.insert(offset, random_piece(rng), origin=origin)
+        else:
+            doc.delete(offset, offset + rng.randrange(5), origin=origin)
+
+    for kind, offset, text, event_origin in events:
+        assert event_origin is origin
+        if kind == "insert":
+            replica[offset:offset] = text
+        else:
+            assert "".join(replica[offset:offset + len(text)]) == text
+            del replica[offset:offset + len(text)]
+    assert "".join(replica) == doc.text()
+
+
+def test_line_stats_follow_document_events(rng):
+    """Пересчет статистики по событиям, как в окне редактора"""
+    doc = PieceTable("one two\nthree", piece_size=8)
+    stats = LineStats(doc.text())
+
+    def on_change(event):
+        kind, offset, text, _ = event
+        line = doc.line_of(offset)
+        changed = text.count('\n')
+        if kind == "insert":
+            stats.splice(line, 1, doc.lines(line, changed + 1))
+        else:
+            stats.splice(line, changed + 1, doc.lines(line, 1))
+
+    doc.add_listener(on_change)
+    for _ in range(500):
+        offset = rng.randrange(len(doc) + 1)
+        if rng.random() < 0.6:
+            doc.insert(offset, random_piece(rng))
+        else:
+            doc.delete(offset, offset + rng.randrange(8))
+
+    text = doc.text()
+    assert stats.lines == text.count('\n') + 1
+    assert stats.words == len(text.split())
+
+
+def test_set_text_and_bounds():
+    doc = PieceTable("abc")
+    doc.set_text("новый\nтекст")
+    assert doc.text() == "новый\nтекст"
+    assert doc.index(len(doc)) == (2, 5)
+    assert doc.delete(5, 100) == "\nтекст"
+    assert doc.delete(3, 3) == ""
@@ -0,0 +1,104 @@
+"""
+Тесты замены: потоковая замена и поиск в снимке против замены в строке
+"""
+import pytest
+
+from core.editor import PieceTable
+from core.replace import ReplaceEngine, offsets_to_indices
+
+QUERIES = [
+    ("ab", "X", False, False, False),
+    ("AB", "[\\0]", False, False, False),
+    ("a b", "-", False, True, True),
+    (r"a+", "<\\g<0>>", True, False, False),
+    (r"^c", "C", True, False, False),
+    (r"b$", "B\n", True, False, False),
+    (r"(a)(b)", r"\2\1", True, False, True),
+    (r"\bab\b", "", True, False, False),
+]
+
+
+def random_text(rng, size):
+    return "".join(rng.choice("abcAB \n") for _ in range(size))
+
+
+def chunked(rng, text):
+    position = 0
+    while position < len(text):
+        size = rng.randrange(1, 300)
+        yield text[position:position + size]
+        position += size
+
+
+@pytest.mark.parametrize("query, replacement, regex, whole_word, case_sensitive", QUERIES)
+def test_replace_stream_matches_replace(rng, query, replacement, regex, whole_word,
+                                        case_sensitive):
+    engine = ReplaceEngine(query, replacement, regex=regex, whole_word=whole_word,
+                           case_sensitive=case_sensitive)
+    for _ in range(30):
+        text = random_text(rng, rng.randrange(0, 3000))
+        expected, count = engine.replace(text)
+
+        parts = []
+        assert engine.replace_stream(chunked(rng, text), parts.append, overlap=64) == count
+        assert "".join(parts) == expected
+
+
+@pytest.mark.parametrize("query, replacement, regex, whole_word, case_sensitive", QUERIES)
+def test_snapshot_search_matches_edits(rng, query, replacement, regex, whole_word,
+                                       case_sensitive):
+    engine = ReplaceEngine(query, replacement, regex=regex, whole_word=whole_word,
+                           case_sensitive=case_sensitive)
+    for _ in range(30):
+        text = random_text(rng, rng.randrange(0, 3000))
+        snapshot = PieceTable(text, piece_size=rng.randrange(1, 100)).snapshot()
+        edits = engine.edits(text)
+
+        assert list(engine.find_all(snapshot, window=rng.randrange(1, 200), overlap=64)) == edits
+        assert engine.count_snapshot(snapshot) == len(edits)
+        preview = engine.preview(snapshot, limit=20)
+        assert [(item["start"], item["end"], item["new"]) for item in preview] == edits[:20]
+
+        for start, end, new in edits[:5]:
+            assert engine.match_at(snapshot, start, end) == new
+            assert engine.match_at(snapshot, start, end + 1) is None
+
+
+def test_find_starts_at_position(rng):
+    engine = ReplaceEngine("ab")
+    text = random_text(rng, 2000)
+    snapshot = PieceTable(text).snapshot()
+    for position in rng.sample(range(len(text) + 1), 50):
+        match = next(engine.matches(text, position), None)
+        expected = (match.start(), match.end(), "") if match else None
+        assert engine.find(snapshot, position) == expected
+
+
+def test_preview_lines_and_context():
+    snapshot = PieceTable("first\nsecond line ab here\nab").snapshot()
+    items = ReplaceEngine("ab", "X").preview(snapshot, context=5)
+    assert [(item["line"], item["column"]) for item in items] == [(2, 12), (3, 0)]
+    assert (items[0]["before"], items[0]["after"]) == ("line ", " here")
+    assert (items[1]["before"], items[1]["after"]) == ("", "")
+
+
+def test_offsets_to_indices(rng):
+    text = random_text(rng, 1000)
+    offsets = sorted(rng.sample(range(len(text) + 1), 100))
+    expected = [(text.count('\n', 0, offset) + 1, offset - (text.rfind('\n', 0, offset) + 1))
+                for offset in offsets]
+    assert offsets_to_indices(text, offsets) == expected
+
+
+def test_replace_file(tmp_path, rng):
+    engine = ReplaceEngine(r"a+b", "#", regex=True)
+    text = random_text(rng, 50000)
+    path = tmp_path / "doc.txt"
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+    expected, count = engine.replace(text)
+    assert engine.count_file(str(path), chunk_size=777) == count
+    assert engine.replace_file(str(path), chunk_size=777) == count
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        assert f.read() == expected
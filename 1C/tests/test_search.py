@@ -0,0 +1,129 @@
+"""
+Тесты поиска: автомат Ахо-Корасик и регулярные выражения против перебора
+"""
+import re
+
+import pytest
+
+from config import AppConfig
+from core.search import AhoCorasick, SearchEngine, SearchWorker
+
+ALPHABET = "abаб ß\nSS"
+
+
+def random_text(rng, size):
+    return "".join(rng.choice(ALPHABET) for _ in range(size))
+
+
+def random_terms(rng, count):
+    terms = set()
+    while len(terms) < count:
+        terms.add("".join(rng.choice("abаб") for _ in range(rng.randrange(1, 6))))
+    return sorted(terms)
+
+
+def brute_force(text, terms, whole_word=False):
+    """Все вхождения (в том числе перекрывающиеся) в порядке (начало, конец)"""
+    result = []
+    for index, term in enumerate(terms):
+        for start in range(len(text) - len(term) + 1):
+            end = start + len(term)
+            if text[start:end] != term:
+                continue
+            if whole_word and ((start and re.match(r"\w", text[start - 1])) or
+                               (end < len(text) and re.match(r"\w", text[end]))):
+                continue
+            result.append((start, end, index))
+    return sorted(result)
+
+
+def as_list(matches):
+    return list(zip(matches.starts, matches.ends, matches.terms))
+
+
+def test_automaton_finds_every_occurrence(rng):
+    for _ in range(50):
+        terms = random_terms(rng, rng.randrange(1, 20))
+        text = "".join(rng.choice("abаб") for _ in range(500))
+        automaton = AhoCorasick(terms)
+        found = sorted((end - automaton.lengths[index], end, index)
+                       for end, index in automaton.scan(text))
+        assert found == brute_force(text, terms)
+
+
+@pytest.mark.parametrize("count", [1, 5, AppConfig.SEARCH_AUTOMATON_TERMS + 1])
+@pytest.mark.parametrize("whole_word", [False, True])
+def test_literal_search_matches_brute_force(rng, count, whole_word):
+    for _ in range(20):
+        terms = random_terms(rng, count)
+        text = "".join(rng.choice("abаб \n") for _ in range(1000))
+        engine = SearchEngine(terms, whole_word=whole_word, case_sensitive=True)
+        expected = brute_force(text, terms, whole_word)
+        assert as_list(engine.search(text)) == expected
+
+        start, end = sorted(rng.sample(range(len(text) + 1), 2))
+        assert as_list(engine.search(text, start, end)) == \
+            [item for item in expected if item[0] >= start and item[1] <= end]
+
+
+def test_automaton_agrees_with_regex_engine(rng):
+    """Больше SEARCH_AUTOMATON_TERMS терминов - автомат; те же термины по одному - re"""
+    terms = random_terms(rng, AppConfig.SEARCH_AUTOMATON_TERMS + 10)
+    text = random_text(rng, 5000)
+    combined = as_list(SearchEngine(terms).search(text))
+    separate = sorted((start, end, index) for index, term in enumerate(terms)
+                      for start, end, _ in as_list(SearchEngine(term).search(text)))
+    assert combined == separate
+
+
+def test_case_folding_maps_positions_back(rng):
+    text = random_text(rng, 2000)
+    engine = SearchEngine("ss")
+    # ß при casefold превращается в ss: совпадение указывает на исходный символ
+    for start, end, _ in as_list(engine.search(text)):
+        assert text[start:end].casefold().count("ss") >= 1
+
+
+def test_regex_search_matches_finditer(rng):
+    text = random_text(rng, 3000)
+    for pattern in [r"a+b", r"^б", r"a$", r"(?:аб)+"]:
+        engine = SearchEngine(pattern, regex=True, case_sensitive=True)
+        expected = [(m.start(), m.end()) for m in re.finditer(pattern, text, re.M)
+                    if m.end() > m.start()]
+        assert list(zip(engine.search(text).starts, engine.search(text).ends)) == expected
+
+
+@pytest.mark.parametrize("terms, regex", [(["ab", "bа", "abab"], False), (["a[^\n]*b"], True)])
+def test_search_chunks_matches_search(rng, terms, regex):
+    engine = SearchEngine(terms, regex=regex)
+    for _ in range(10):
+        text = random_text(rng, rng.randrange(0, 20000))
+        chunks = []
+        position = 0
+        while position < len(text):
+            size = rng.randrange(1, 5000)
+            chunks.append(text[position:position + size])
+            position += size
+        assert as_list(engine.search_chunks(chunks)) == as_list(engine.search(text))
+
+
+def run_worker(worker, text, engine):
+    worker.start(text, engine)
+    starts, ends = [], []
+    while True:
+        message = worker.results.get(timeout=10)
+        if message[0] == "matches":
+            starts.extend(message[2])
+            ends.extend(message[3])
+        elif message[0] == "done":
+            return list(zip(starts, ends))
+
+
+@pytest.mark.parametrize("pattern, regex", [("ab", False), (r"a[^\n]*b", True), (r"b$", True)])
+def test_worker_slices_match_whole_search(rng, pattern, regex):
+    """Совпадения на границах частей SEARCH_SLICE не теряются и не обрезаются"""
+    engine = SearchEngine(pattern, regex=regex)
+    # Без ß: casefold не меняет длину, и текст действительно режется на части
+    text = "".join(rng.choice("abаб \n") for _ in range(5000))
+    expected = list(zip(engine.search(text).starts, engine.search(text).ends))
+    assert run_worker(SearchWorker(slice_size=97), text, engine) == expected
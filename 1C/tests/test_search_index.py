@@ -0,0 +1,117 @@
+"""
+Тесты полнотекстового индекса: сравнение с прямым просмотром документов
+"""
+import io
+import os
+
+import pytest
+
+from core.catalog import DocumentCatalog
+from core.search_index import SearchIndex, iter_tokens, tokenize
+from core.storage import SqliteDatabase
+
+WORDS = ["отчет", "Отчёт", "план", "бюджет", "report", "plan", "итог", "год"]
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def index(tmp_path, docs_dir):
+    return SearchIndex(docs_dir, SqliteDatabase.open(tmp_path / "index.db"))
+
+
+def write_docs(docs_dir, rng, count=30):
+    texts = {}
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randrange(0, 40))]
+        text = " ".join(words) + rng.choice(["", ".", "\n"])
+        (docs_dir / f"doc{i}.txt").write_text(text, encoding='utf-8')
+        texts[f"doc{i}.txt"] = tokenize(text)
+    return texts
+
+
+def expected(texts, query):
+    """Документы со всеми словами и фразами запроса (прямой просмотр)"""
+    result = set()
+    for name, tokens in texts.items():
+        found = True
+        for part in SearchIndex.parse_query(query):
+            if not any(tokens[i:i + len(part)] == part for i in range(len(tokens))):
+                found = False
+                break
+        if found:
+            result.add(name)
+    return result
+
+
+def test_search_matches_direct_scan(index, docs_dir, rng):
+    texts = write_docs(docs_dir, rng)
+    for name in texts:
+        index.update_document(str(docs_dir / name))
+
+    queries = ["отчет", "ОТЧЁТ план", '"план бюджет"', '"итог год" report', "нет"]
+    queries += [" ".join(rng.sample(WORDS, 2)) for _ in range(10)]
+    for query in queries:
+        found = {item["name"] for item in index.search(query, limit=len(texts))}
+        assert found == expected(texts, query), query
+
+
+def test_results_are_ranked(index, docs_dir):
+    (docs_dir / "many.txt").write_text("план " * 10 + "итог", encoding='utf-8')
+    (docs_dir / "once.txt").write_text("план " + "итог " * 10, encoding='utf-8')
+    for name in ("many.txt", "once.txt"):
+        index.update_document(str(docs_dir / name))
+
+    results = index.search("план")
+    assert [item["name"] for item in results] == ["many.txt", "once.txt"]
+    assert results[0]["matches"] == 10
+
+
+def test_sync_follows_catalog(tmp_path, index, docs_dir, rng):
+    texts = write_docs(docs_dir, rng, count=10)
+    catalog = DocumentCatalog(docs_dir, tmp_path / "catalog.json")
+    index.sync(catalog)
+
+    os.remove(docs_dir / "doc0.txt")
+    del texts["doc0.txt"]
+    (docs_dir / "doc1.txt").write_text("уникальное слово", encoding='utf-8')
+    texts["doc1.txt"] = tokenize("уникальное слово")
+    catalog.refresh(force=True)
+    index.sync(catalog)
+
+    assert {item["name"] for item in index.search("уникальное")} == {"doc1.txt"}
+    assert {item["name"] for item in index.search("отчет", limit=100)} == \
+        expected(texts, "отчет")
+
+
+def test_rename_keeps_postings(index, docs_dir):
+    (docs_dir / "old.txt").write_text("годовой бюджет", encoding='utf-8')
+    index.update_document(str(docs_dir / "old.txt"))
+    os.rename(docs_dir / "old.txt", docs_dir / "new.txt")
+    index.rename_document(str(docs_dir / "old.txt"), str(docs_dir / "new.txt"))
+
+    assert [item["name"] for item in index.search('"годовой бюджет"')] == ["new.txt"]
+
+
+def test_chunked_tokens_match_whole_text(rng):
+    alphabet = "абвЁё xyzXYZ019_.,\n"
+    for _ in range(50):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(300)))
+        for chunk_size in (1, 2, 7, 64):
+            assert list(iter_tokens(io.StringIO(text), chunk_size)) == tokenize(text)
+
+
+def test_large_document_indexed_in_chunks(index, docs_dir, rng):
+    words = [rng.choice(WORDS) for _ in range(60000)]
+    (docs_dir / "big.txt").write_text(" ".join(words), encoding='utf-8')
+    index.update_document(str(docs_dir / "big.txt"))
+
+    row = index.db.query("SELECT length FROM index_docs WHERE name = 'big.txt'")[0]
+    assert row["length"] == len(words)
+    assert [r["name"] for r in index.search('"отчет план"')] == \
+        (["big.txt"] if "отчет план" in " ".join(tokenize(" ".join(words))) else [])
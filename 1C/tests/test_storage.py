@@ -0,0 +1,78 @@
+"""
+Тесты журналируемого хранилища пользователей
+"""
+import json
+
+from core.storage import JournaledUserStore
+
+
+def make_store(tmp_path, **kwargs):
+    kwargs.setdefault("fsync", False)
+    return JournaledUserStore(tmp_path / "users.json", **kwargs)
+
+
+def test_changes_survive_reload(tmp_path):
+    store = make_store(tmp_path)
+    store.put("alice", {"role": "admin"})
+    store.put_many({"bob": {"role": "user"}, "eve": {"role": "guest"}})
+    store.patch("alice", {"last_login": "2024-01-01T00:00:00"})
+    store.remove("eve")
+    store.close()
+
+    reloaded = make_store(tmp_path)
+    assert dict(reloaded) == {
+        "alice": {"role": "admin", "last_login": "2024-01-01T00:00:00"},
+        "bob": {"role": "user"},
+    }
+    assert reloaded.count_by_role() == {"admin": 1, "user": 1}
+
+
+def test_change_appends_to_journal_only(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_all({"alice": {"role": "admin"}})
+    snapshot = store.snapshot_file.read_bytes()
+
+    store.patch("alice", {"last_login": "now"})
+    store.close()
+
+    assert store.snapshot_file.read_bytes() == snapshot
+    lines = store.journal_file.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["patch"]
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    compactions = []
+    store = make_store(tmp_path, compact_threshold=3,
+                       on_compact=lambda: compactions.append(1))
+    for i in range(3):
+        store.put(f"user{i}", {"role": "user"})
+    store.close()
+
+    assert compactions == [1]
+    assert store.journal_file.stat().st_size == 0
+    assert set(json.loads(store.snapshot_file.read_text(encoding='utf-8'))) == \
+        {"user0", "user1", "user2"}
+
+
+def test_torn_journal_tail_is_dropped(tmp_path, rng):
+    store = make_store(tmp_path)
+    expected = {}
+    for i in range(20):
+        name = f"user{rng.randrange(5)}"
+        if rng.random() < 0.3 and name in expected:
+            store.remove(name)
+            del expected[name]
+        else:
+            record = {"role": rng.choice(["user", "editor"]), "n": i}
+            store.put(name, record)
+            expected[name] = record
+    store.close()
+
+    # Сбой посреди записи: последняя строка без перевода строки
+    with open(store.journal_file, 'ab') as f:
+        f.write(b'{"op": "put", "user": "broken", "da')
+    size_before = store.journal_file.stat().st_size
+
+    reloaded = make_store(tmp_path)
+    assert dict(reloaded) == expected
+    assert store.journal_file.stat().st_size < size_before
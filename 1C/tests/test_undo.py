@@ -0,0 +1,117 @@
+"""
+Тесты истории отмены: случайные правки, отмена и повтор против копий текста
+"""
+import pytest
+
+from config import AppConfig
+from core.editor import PieceTable
+from core.undo import UndoHistory
+
+
+def make(tmp_path, text="", **kwargs):
+    doc = PieceTable(text)
+    history = UndoHistory(spill_dir=tmp_path, **kwargs)
+    doc.add_listener(history.record)
+    return doc, history
+
+
+@pytest.mark.parametrize("memory_limit, spill_limit", [
+    (10 ** 9, 0),       # все в памяти
+    (3000, 0),          # старые шаги забываются
+    (3000, 20000),      # выгрузка в файл с ограничением
+    (3000, 10 ** 9),    # выгрузка без ограничения
+    (500, 3000),
+])
+def test_random_undo_redo_matches_states(tmp_path, rng, monkeypatch, memory_limit, spill_limit):
+    monkeypatch.setattr(AppConfig, "UNDO_COMPRESS_THRESHOLD", 500)
+    doc, history = make(tmp_path, memory_limit=memory_limit, spill_limit=spill_limit)
+    states, position = [""], 0  # states[position] - текущий текст
+
+    for _ in range(800):
+        action = rng.random()
+        if action < 0.5 or not len(doc):
+            history.separator()
+            text = "".join(rng.choice("ab \n") for _ in range(rng.choice([1, 5, 50, 1000])))
+            doc.insert(rng.randrange(len(doc) + 1), text)
+            states[position + 1:] = [doc.text()]
+            position += 1
+        elif action < 0.7:
+            history.separator()
+            start = rng.randrange(len(doc) + 1)
+            doc.delete(start, start + rng.randrange(1, 300))
+            if doc.text() != states[position]:
+                states[position + 1:] = [doc.text()]
+                position += 1
+        elif action < 0.85:
+            if history.undo(doc) is not None:
+                position -= 1
+        else:
+            if history.redo(doc) is not None:
+                position += 1
+
+        assert doc.text() == states[position]
+        assert history.memory >= 0
+        if memory_limit < 10 ** 9:
+            # Сверх лимита - не больше последнего шага (он остается в памяти)
+            assert history.memory <= memory_limit + 3000
+
+    while history.undo(doc) is not None:
+        position -= 1
+        assert doc.text() == states[position]
+    history.close()
+
+
+def test_typing_is_grouped_into_words(tmp_path):
+    doc, history = make(tmp_path)
+    for ch in "hello world":
+        doc.insert(len(doc), ch)
+
+    history.undo(doc)
+    assert doc.text() == "hello"
+    history.undo(doc)
+    assert doc.text() == ""
+    assert history.undo(doc) is None
+
+
+def test_backspace_is_grouped(tmp_path):
+    doc, history = make(tmp_path, "abcdef")
+    history.separator()
+    for offset in (5, 4, 3):
+        doc.delete(offset, offset + 1)
+    assert doc.text() == "abc"
+
+    assert history.undo(doc) == 6
+    assert doc.text() == "abcdef"
+
+
+def test_group_is_one_step(tmp_path):
+    doc, history = make(tmp_path, "aaaa")
+    with history.group():
+        doc.replace(0, 1, "bb")
+        doc.replace(3, 4, "cc")
+    assert doc.text() == "bbacca"
+
+    history.undo(doc)
+    assert doc.text() == "aaaa"
+    history.redo(doc)
+    assert doc.text() == "bbacca"
+
+
+def test_new_edit_clears_redo(tmp_path):
+    doc, history = make(tmp_path)
+    doc.insert(0, "first")
+    history.undo(doc)
+    assert history.can_redo()
+    doc.insert(0, "second")
+    assert not history.can_redo()
+
+
+def test_suspend_and_reset(tmp_path):
+    doc, history = make(tmp_path)
+    history.suspend()
+    doc.insert(0, "загруженный документ")
+    assert not history.can_undo()
+    history.reset()
+    doc.insert(0, "x")
+    history.undo(doc)
+    assert doc.text() == "загруженный документ"
@@ -0,0 +1,78 @@
+"""
+Тесты просмотра больших документов: сравнение со строками текста
+"""
+from array import array
+
+import pytest
+
+from core.viewer import MappedDocument
+
+
+@pytest.fixture
+def document(tmp_path, rng):
+    lines = ["".join(rng.choice("аб cd\r") for _ in range(rng.randrange(30)))
+             for _ in range(2000)]
+    text = "\n".join(lines)
+    path = tmp_path / "big.txt"
+    path.write_bytes(text.encode('utf-8'))
+
+    doc = MappedDocument(str(path), block_size=512)
+    doc._indexer.join()
+    yield doc, text.encode('utf-8')
+    doc.close()
+
+
+def partial_index(doc, blocks):
+    """Индекс, построенный только для первых blocks блоков"""
+    doc._newlines = array('q', doc._newlines[:blocks + 1])
+    doc.complete = False
+
+
+def test_line_of_matches_text(document, rng):
+    doc, data = document
+    for blocks in (None, 3, 0):
+        if blocks is not None:
+            partial_index(doc, blocks)
+        for _ in range(300):
+            offset = rng.randrange(len(data) + 1)
+            assert doc.line_of(offset) == data.count(b'\n', 0, offset)
+
+
+def test_unindexed_lines_are_unavailable(document):
+    doc, data = document
+    partial_index(doc, 3)
+
+    last = doc.indexed_lines - 1
+    assert doc.line_offset(last) is not None
+    assert doc.line_offset(last + 1) is None
+    assert doc.lines(last + 1, 5) == []
+
+    line = doc.line_of(len(data) - 1)
+    assert line >= doc.indexed_lines
+    assert doc.line_offset(line) is None
+
+
+def test_lines_match_text(document, rng):
+    doc, data = document
+    expected = [line.decode('utf-8').rstrip('\r') for line in data.split(b'\n')]
+    assert doc.line_count() == len(expected)
+    for _ in range(100):
+        first = rng.randrange(len(expected))
+        assert doc.lines(first, 7) == expected[first:first + 7]
+
+
+def test_search_finds_every_match(document):
+    doc, data = document
+    found = []
+    match = doc.search("АБ", 0)
+    while match is not None:
+        found.append(match[0])
+        match = doc.search("АБ", match[0] + 1)
+
+    text = data.decode('utf-8').lower()
+    positions = []
+    position = text.find("аб")
+    while position >= 0:
+        positions.append(len(text[:position].encode('utf-8')))
+        position = text.find("аб", position + 1)
+    assert found == positions
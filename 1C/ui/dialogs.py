@@ -4,8 +4,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import os
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+from config import AppConfig
+from core.replace import ReplaceEngine
+from core.search import SearchEngine
+
 
 def show_documents_dialog(parent, doc_manager, on_document_select):
     """Диалог списка документов"""
@@ -23,6 +30,15 @@ def show_documents_dialog(parent, doc_manager, on_document_select):
     toolbar = tk.Frame(dialog, bg='#f0f0f0')
     toolbar.pack(fill=tk.X, padx=10, pady=5)
 
+    # Фильтр по имени
+    filter_frame = tk.Frame(dialog)
+    filter_frame.pack(fill=tk.X, padx=10)
+    tk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT)
+    filter_var = tk.StringVar()
+    tk.Entry(filter_frame, textvariable=filter_var, width=30).pack(side=tk.LEFT, padx=5)
+    count_label = tk.Label(filter_frame, text="")
+    count_label.pack(side=tk.RIGHT)
+
     # Таблица
     table_frame = tk.Frame(dialog)
     table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -31,58 +47,192 @@ def show_documents_dialog(parent, doc_manager, on_document_select):
     columns = ("name", "size", "modified", "created")
     tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
 
+    # Виртуальный список: в таблице постоянный набор строк на видимое
+    # окно, они заполняются страницей catalog.query(offset, limit).
+    # Сортировка и фильтр выполняются в каталоге, положение в списке
+    # хранится смещением offset, выбранный документ - путем
+    view = {"sort_by": "modified", "reverse": True, "offset": 0, "total": 0,
+            "docs": [], "selected": None, "filter_job": None}
+    rows = []  # iid строк таблицы сверху вниз
+
     # Настраиваем колонки
-    tree.heading("name", text="Имя документа")
-    tree.heading("size", text="Размер")
-    tree.heading("modified", text="Изменен")
-    tree.heading("created", text="Создан")
+    headings = {"name": "Имя документа", "size": "Размер",
+                "modified": "Изменен", "created": "Создан"}
+    for column, title in headings.items():
+        tree.heading(column, text=title,
+                     command=lambda c=column: sort_by_column(c))
 
     tree.column("name", width=250)
     tree.column("size", width=100)
     tree.column("modified", width=120)
     tree.column("created", width=120)
 
-    # Полоса прокрутки
-    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
-    tree.configure(yscrollcommand=scrollbar.set)
+    def row_values(doc):
+        return (
+            doc["name"],
+            format_file_size(doc["size"]),
+            doc["modified"].strftime("%d.%m.%Y %H:%M"),
+            doc["created"].strftime("%d.%m.%Y %H:%M")
+        )
+
+    def visible_rows():
+        """Сколько строк помещается в таблицу"""
+        bbox = tree.bbox(rows[0]) if rows else ""
+        if bbox:
+            header, height = bbox[1], bbox[3]
+            return max(1, (tree.winfo_height() - header) // height)
+        return int(tree.cget("height"))
+
+    def query(offset, limit):
+        return doc_manager.catalog.query(
+            sort_by=view["sort_by"], reverse=view["reverse"],
+            name_filter=filter_var.get().strip(), offset=offset, limit=limit
+        )
+
+    def fill():
+        """Заполнение строк окна с позиции view["offset"]"""
+        count = visible_rows()
+        total, docs = query(view["offset"], count)
+
+        # Каталог мог уменьшиться - окно не уходит за конец списка
+        last = max(total - count, 0)
+        if view["offset"] > last:
+            view["offset"] = last
+            total, docs = query(last, count)
+
+        view["total"] = total
+        view["docs"] = docs
+        count_label.config(text=f"Документов: {total}")
+
+        while len(rows) < count:
+            rows.append(tree.insert("", tk.END, values=()))
+        while len(rows) > count:
+            tree.delete(rows.pop())
+
+        selected = ()
+        for index, iid in enumerate(rows):
+            if index < len(docs):
+                tree.item(iid, values=row_values(docs[index]))
+                if docs[index]["path"] == view["selected"]:
+                    selected = (iid,)
+            else:
+                tree.item(iid, values=())
+        tree.selection_set(selected)
+        tree.yview_moveto(0)
+
+        if total:
+            scrollbar.set(view["offset"] / total, (view["offset"] + len(docs)) / total)
+        else:
+            scrollbar.set(0, 1)
+
+    def scroll_to(offset):
+        offset = max(min(int(offset), view["total"] - visible_rows()), 0)
+        if offset != view["offset"]:
+            view["offset"] = offset
+            fill()
+
+    def on_scrollbar(action, amount, unit=None):
+        if action == "moveto":
+            scroll_to(float(amount) * view["total"])
+        elif action == "scroll":
+            step = visible_rows() if unit == "pages" else 1
+            scroll_to(view["offset"] + int(amount) * step)
+
+    def on_wheel(event):
+        up = event.num == 4 or event.delta > 0
+        scroll_to(view["offset"] + (-AppConfig.DOCS_WHEEL_ROWS if up else AppConfig.DOCS_WHEEL_ROWS))
+        return "break"
+
+    def doc_at(iid):
+        index = rows.index(iid)
+        return view["docs"][index] if index < len(view["docs"]) else None
+
+    def on_select(_event):
+        selection = tree.selection()
+        doc = doc_at(selection[0]) if selection else None
+        if doc is not None:
+            view["selected"] = doc["path"]
+
+    def on_arrow(step):
+        """Стрелки на краю окна сдвигают окно на строку"""
+        selection = tree.selection()
+        if not selection:
+            return None
+        index = rows.index(selection[0]) + step
+        if 0 <= index < len(view["docs"]):
+            return None
+
+        scroll_to(view["offset"] + step)
+        index = min(max(index, 0), len(view["docs"]) - 1)
+        if index >= 0:
+            tree.selection_set(rows[index])
+            tree.focus(rows[index])
+            view["selected"] = view["docs"][index]["path"]
+        return "break"
+
+    # Полоса прокрутки управляет смещением окна, а не самой таблицей
+    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=on_scrollbar)
 
     tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    # Заполняем таблицу
-    def refresh_table():
-        """Обновление таблицы"""
-        for item in tree.get_children():
-            tree.delete(item)
+    tree.bind("<<TreeviewSelect>>", on_select)
+    tree.bind("<Configure>", lambda e: fill())
+    tree.bind("<MouseWheel>", on_wheel)
+    tree.bind("<Button-4>", on_wheel)
+    tree.bind("<Button-5>", on_wheel)
+    tree.bind("<Up>", lambda e: on_arrow(-1))
+    tree.bind("<Down>", lambda e: on_arrow(1))
+
+    def reset_table():
+        """Заполнение с начала (смена сортировки или фильтра)"""
+        view["offset"] = 0
+        fill()
+
+    def sort_by_column(column):
+        """Сортировка по колонке (повторный щелчок меняет направление)"""
+        if view["sort_by"] == column:
+            view["reverse"] = not view["reverse"]
+        else:
+            view["sort_by"] = column
+            view["reverse"] = column != "name"
+        reset_table()
+
+    def on_filter_changed(*_):
+        if view["filter_job"] is not None:
+            dialog.after_cancel(view["filter_job"])
+        view["filter_job"] = dialog.after(200, reset_table)
+
+    filter_var.trace_add("write", on_filter_changed)
+
+    reset_table()
 
-        docs = doc_manager.list_documents()
-        for doc in docs:
-            tree.insert("", tk.END, values=(
-                doc["name"],
-                format_file_size(doc["size"]),
-                doc["modified"].strftime("%d.%m.%Y %H:%M"),
-                doc["created"].strftime("%d.%m.%Y %H:%M")
-            ), tags=(doc["path"],))
+    def rescan():
+        """Полное пересканирование папки (например, после правок извне)"""
+        doc_manager.catalog.refresh(force=True)
+        fill()
 
-    refresh_table()
+    def selected_path():
+        """Путь выбранного документа (он может быть вне видимого окна)"""
+        selection = tree.selection()
+        if selection:
+            doc = doc_at(selection[0])
+            return doc["path"] if doc else None
+        return view["selected"]
 
     # Функции кнопок
     def open_selected():
         """Открыть выбранный документ"""
-        selection = tree.selection()
-        if selection:
-            item = selection[0]
-            doc_path = tree.item(item, "tags")[0]
+        doc_path = selected_path()
+        if doc_path:
             on_document_select(doc_path)
             dialog.destroy()
 
     def delete_selected():
         """Удалить выбранный документ"""
-        selection = tree.selection()
-        if selection:
-            item = selection[0]
-            doc_path = tree.item(item, "tags")[0]
-            doc_name = tree.item(item, "values")[0]
+        doc_path = selected_path()
+        if doc_path:
+            doc_name = os.path.basename(doc_path)
 
             response = messagebox.askyesno(
                 "Удаление",
@@ -91,7 +241,8 @@ def show_documents_dialog(parent, doc_manager, on_document_select):
 
             if response:
                 if doc_manager.delete_document(doc_path):
-                    refresh_table()
+                    view["selected"] = None
+                    fill()
                     messagebox.showinfo("Успех", "Документ удален")
                 else:
                     messagebox.showerror("Ошибка", "Не удалось удалить документ")
@@ -106,7 +257,7 @@ def show_documents_dialog(parent, doc_manager, on_document_select):
               bg="#f44336", fg="white").pack(side=tk.LEFT, padx=2)
 
     tk.Button(toolbar, text="🔄 Обновить",
-              command=refresh_table,
+              command=rescan,
               bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=2)
 
     # Привязка двойного клика
@@ -118,11 +269,251 @@ def show_documents_dialog(parent, doc_manager, on_document_select):
               bg="#9E9E9E", fg="white").pack(pady=10)
 
 
-def show_find_dialog(parent, text_widget):
-    """Диалог поиска текста"""
+def show_search_documents_dialog(parent, doc_manager, on_document_select):
+    """Диалог полнотекстового поиска по всем документам"""
+    dialog = tk.Toplevel(parent)
+    dialog.title("Поиск по документам")
+    dialog.geometry("600x450")
+    dialog.transient(parent)
+
+    tk.Label(dialog, text='Слова или "фраза в кавычках":').pack(pady=(10, 5))
+
+    query_var = tk.StringVar()
+    query_entry = tk.Entry(dialog, textvariable=query_var, width=50)
+    query_entry.pack(pady=5)
+
+    status_label = tk.Label(dialog, text="")
+    status_label.pack()
+
+    table_frame = tk.Frame(dialog)
+    table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    tree = ttk.Treeview(table_frame, columns=("name", "matches", "score"),
+                        show="headings", height=12)
+    tree.heading("name", text="Документ")
+    tree.heading("matches", text="Вхождений")
+    tree.heading("score", text="Релевантность")
+    tree.column("name", width=330)
+    tree.column("matches", width=100)
+    tree.column("score", width=100)
+
+    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def search():
+        """Поиск по индексу"""
+        query = query_var.get().strip()
+        tree.delete(*tree.get_children())
+        if not query:
+            return
+
+        started = datetime.now()
+        results = doc_manager.search_documents(query)
+        elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+
+        for result in results:
+            tree.insert("", tk.END, iid=result["path"], values=(
+                result["name"], result["matches"], f"{result['score']:.2f}"
+            ))
+        status_label.config(text=f"Найдено документов: {len(results)} ({elapsed_ms:.0f} мс)")
+
+    def open_selected():
+        """Открыть выбранный документ"""
+        selection = tree.selection()
+        if selection:
+            on_document_select(selection[0])
+            dialog.destroy()
+
+    tk.Button(dialog, text="Найти", command=search,
+              bg="#4CAF50", fg="white").pack(pady=5)
+
+    tree.bind('<Double-Button-1>', lambda e: open_selected())
+    dialog.bind('<Return>', lambda e: search())
+    query_entry.focus_set()
+
+
+def show_reports_dialog(parent, reports_index, author, on_report_select):
+    """Диалог списка отчетов (author=None - отчеты всех пользователей)"""
+    dialog = tk.Toplevel(parent)
+    dialog.title("Отчеты")
+    dialog.geometry("700x400")
+    dialog.transient(parent)
+
+    table_frame = tk.Frame(dialog)
+    table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    tree = ttk.Treeview(table_frame, columns=("name", "created", "author", "size"),
+                        show="headings", height=12)
+    tree.heading("name", text="Отчет")
+    tree.heading("created", text="Создан")
+    tree.heading("author", text="Автор")
+    tree.heading("size", text="Размер")
+    tree.column("name", width=300)
+    tree.column("created", width=140)
+    tree.column("author", width=130)
+    tree.column("size", width=80)
+
+    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    reports = {}
+
+    def refresh():
+        """Перечитывание индекса (выборка по автору - индексный запрос)"""
+        tree.delete(*tree.get_children())
+        reports.clear()
+        for report in reports_index.list_reports(author=author):
+            reports[report["id"]] = report
+            tree.insert("", tk.END, iid=report["id"], values=(
+                report["name"], report["created"], report["author"],
+                format_file_size(report["size"] or 0)
+            ))
+
+    def open_selected():
+        """Открыть выбранный отчет"""
+        selection = tree.selection()
+        if selection:
+            on_report_select(reports[selection[0]]["path"])
+
+    tk.Button(dialog, text="Открыть", command=open_selected).pack(pady=(0, 10))
+    tree.bind('<Double-Button-1>', lambda e: open_selected())
+    refresh()
+
+
+def show_history_dialog(parent, doc_manager, filepath, on_restore):
+    """Браузер истории версий документа"""
+    versions = doc_manager.list_versions(filepath)
+    if not versions:
+        messagebox.showinfo("История версий", "У документа еще нет сохраненных версий")
+        return
+
+    dialog = tk.Toplevel(parent)
+    dialog.title(f"История версий - {os.path.basename(filepath)}")
+    dialog.geometry("900x550")
+    dialog.transient(parent)
+
+    paned = ttk.PanedWindow(dialog, orient=tk.HORIZONTAL)
+    paned.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    # Список версий
+    list_frame = tk.Frame(paned)
+    tree = ttk.Treeview(list_frame, columns=("created", "lines", "size"),
+                        show="headings", selectmode="extended")
+    tree.heading("created", text="Сохранено")
+    tree.heading("lines", text="Строк")
+    tree.heading("size", text="Размер")
+    tree.column("created", width=140)
+    tree.column("lines", width=70)
+    tree.column("size", width=80)
+
+    scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    paned.add(list_frame, weight=1)
+
+    for version in versions:
+        tree.insert("", tk.END, iid=str(version["id"]), values=(
+            version["created"].strftime("%d.%m.%Y %H:%M:%S"),
+            version["lines"],
+            format_file_size(version["size"])
+        ))
+
+    # Просмотр версии или разницы
+    preview_frame = tk.Frame(paned)
+    preview = tk.Text(preview_frame, wrap='none', font=("Courier New", 10))
+    preview_scroll = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=preview.yview)
+    preview.configure(yscrollcommand=preview_scroll.set)
+    preview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    preview_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+    paned.add(preview_frame, weight=3)
+
+    preview.tag_config('added', foreground='#2e7d32')
+    preview.tag_config('removed', foreground='#c62828')
+    preview.tag_config('hunk', foreground='#1565c0')
+
+    def show_text(text, diff=False):
+        preview.config(state=tk.NORMAL)
+        preview.delete('1.0', tk.END)
+        if not diff:
+            preview.insert('1.0', text)
+        else:
+            for line in text:
+                tag = ('added' if line.startswith('+') else
+                       'removed' if line.startswith('-') else
+                       'hunk' if line.startswith('@@') else '')
+                preview.insert(tk.END, line if line.endswith('\n') else line + '\n', tag)
+        preview.config(state=tk.DISABLED)
+
+    def selected_ids():
+        return sorted(int(iid) for iid in tree.selection())
+
+    def show_selected(event=None):
+        """Одна версия - ее текст, две - разница между ними"""
+        ids = selected_ids()
+        if len(ids) == 1:
+            show_text(doc_manager.read_version(ids[0]) or "")
+        elif len(ids) == 2:
+            show_text(doc_manager.diff_versions(ids[0], ids[1]) or ["Версии совпадают"], diff=True)
+
+    def compare_with_previous():
+        """Разница выбранной версии с предыдущей"""
+        ids = selected_ids()
+        if len(ids) != 1:
+            return
+        older = tree.next(str(ids[0]))
+        if not older:
+            messagebox.showinfo("История версий", "Это самая ранняя версия", parent=dialog)
+            return
+        show_text(doc_manager.diff_versions(int(older), ids[0]) or ["Версии совпадают"],
+                  diff=True)
+
+    def restore():
+        """Возврат документа к выбранной версии"""
+        ids = selected_ids()
+        if len(ids) != 1:
+            messagebox.showwarning("История версий", "Выберите одну версию", parent=dialog)
+            return
+        if not messagebox.askyesno("Восстановление",
+                                   "Вернуть документ к выбранной версии? "
+                                   "Текущий текст останется в истории.", parent=dialog):
+            return
+        if doc_manager.restore_version(filepath, ids[0]):
+            dialog.destroy()
+            on_restore(filepath)
+        else:
+            messagebox.showerror("Ошибка", "Не удалось восстановить версию", parent=dialog)
+
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=(0, 10))
+    tk.Button(button_frame, text="Сравнить с предыдущей", command=compare_with_previous,
+              width=20).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Восстановить", command=restore,
+              bg="#4CAF50", fg="white", width=15).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Закрыть", command=dialog.destroy,
+              width=10).pack(side=tk.LEFT, padx=5)
+
+    tk.Label(dialog, text="Выберите две версии (Ctrl+щелчок), чтобы увидеть разницу между ними",
+             fg="gray").pack(pady=(0, 5))
+
+    tree.bind('<<TreeviewSelect>>', show_selected)
+    tree.selection_set(str(versions[0]["id"]))
+
+
+def show_find_dialog(parent, document, highlighter):
+    """Диалог поиска текста
+
+    Поиск идет по кускам снимка document (PieceTable), без склейки
+    текста в одну строку. Совпадения подсвечивает highlighter (MatchHighlighter поля): сначала
+    видимые, остальные - постепенно; переход между ними не ищет заново.
+    """
     dialog = tk.Toplevel(parent)
     dialog.title("Поиск текста")
-    dialog.geometry("400x200")
+    dialog.geometry("420x220")
     dialog.transient(parent)
     dialog.grab_set()
 
@@ -132,10 +523,25 @@ def show_find_dialog(parent, text_widget):
     find_entry = tk.Entry(dialog, textvariable=find_var, width=40)
     find_entry.pack(pady=5)
 
+    options = tk.Frame(dialog)
+    options.pack(pady=5)
     case_var = tk.BooleanVar()
-    case_check = tk.Checkbutton(dialog, text="Учитывать регистр",
-                                variable=case_var)
-    case_check.pack(pady=5)
+    word_var = tk.BooleanVar()
+    regex_var = tk.BooleanVar()
+    tk.Checkbutton(options, text="Учитывать регистр", variable=case_var).pack(side=tk.LEFT)
+    tk.Checkbutton(options, text="Слово целиком", variable=word_var).pack(side=tk.LEFT)
+    tk.Checkbutton(options, text="Рег. выражение", variable=regex_var).pack(side=tk.LEFT)
+
+    status_var = tk.StringVar()
+    tk.Label(dialog, textvariable=status_var, fg="gray").pack()
+
+    # Параметры последнего поиска: пока они не менялись, Enter - к следующему
+    searched = {"key": None}
+
+    def show_position():
+        position = highlighter.position()
+        if position is not None:
+            status_var.set(f"Совпадение {position[0]} из {position[1]}")
 
     def find():
         """Поиск текста"""
@@ -143,107 +549,313 @@ def show_find_dialog(parent, text_widget):
         if not search_term:
             return
 
-        content = text_widget.get('1.0', tk.END)
+        try:
+            engine = SearchEngine(search_term, regex=regex_var.get(),
+                                  whole_word=word_var.get(), case_sensitive=case_var.get())
+        except re.error as e:
+            messagebox.showerror("Ошибка", f"Неверное регулярное выражение: {e}", parent=dialog)
+            return
 
-        # Удаляем предыдущее выделение
-        text_widget.tag_remove('found', '1.0', tk.END)
+        snapshot = document.snapshot()
+        matches = engine.search_chunks(snapshot.chunks())
+        highlighter.set_matches(snapshot, matches.starts, matches.ends)
+        searched["key"] = (search_term, case_var.get(), word_var.get(), regex_var.get())
 
-        if case_var.get():
-            # Поиск с учетом регистра
-            start_pos = '1.0'
-            while True:
-                start_pos = text_widget.search(search_term, start_pos,
-                                               stopindex=tk.END)
-                if not start_pos:
-                    break
-                end_pos = f"{start_pos}+{len(search_term)}c"
-                text_widget.tag_add('found', start_pos, end_pos)
-                start_pos = end_pos
-        else:
-            # Поиск без учета регистра
-            content_lower = content.lower()
-            search_term_lower = search_term.lower()
-            pos = 0
-
-            while True:
-                pos = content_lower.find(search_term_lower, pos)
-                if pos == -1:
-                    break
-
-                start_pos = f"1.0+{pos}c"
-                end_pos = f"1.0+{pos + len(search_term)}c"
-                text_widget.tag_add('found', start_pos, end_pos)
-                pos += 1
-
-        # Настройка выделения
-        text_widget.tag_config('found', background='yellow', foreground='black')
-
-        if text_widget.tag_ranges('found'):
-            # Прокручиваем к первому совпадению
-            text_widget.see('found.first')
-            messagebox.showinfo("Поиск", f"Найдено совпадений: {len(text_widget.tag_ranges('found')) // 2}")
+        if len(matches):
+            show_position()
         else:
-            messagebox.showinfo("Поиск", "Текст не найден")
+            status_var.set("Текст не найден")
 
-    tk.Button(dialog, text="Найти", command=find,
-              bg="#4CAF50", fg="white").pack(pady=10)
+    def step(forward):
+        key = (find_var.get(), case_var.get(), word_var.get(), regex_var.get())
+        if key != searched["key"] or not len(highlighter):
+            find()
+            return
+        highlighter.next() if forward else highlighter.previous()
+        show_position()
+
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=10)
+    tk.Button(button_frame, text="Найти", command=find,
+              bg="#4CAF50", fg="white", width=10).pack(side=tk.LEFT, padx=3)
+    tk.Button(button_frame, text="◀ Предыдущее", command=lambda: step(False),
+              width=12).pack(side=tk.LEFT, padx=3)
+    tk.Button(button_frame, text="Следующее ▶", command=lambda: step(True),
+              width=12).pack(side=tk.LEFT, padx=3)
 
     find_entry.focus_set()
-    dialog.bind('<Return>', lambda e: find())
-
-
-def show_replace_dialog(parent, text_widget):
-    """Диалог замены текста"""
+    dialog.bind('<Return>', lambda e: step(True))
+    dialog.bind('<Shift-Return>', lambda e: step(False))
+    dialog.bind('<Escape>', lambda e: dialog.destroy())
+
+
+def show_replace_dialog(parent, text_widget, document, doc_manager=None,
+                        on_documents_changed=None, undo_history=None):
+    """Диалог замены текста
+
+    Поиск идет по снимку document (PieceTable) окнами, без копии всего
+    текста. Замена в редакторе выполняется точечными правками документа
+    только в найденных фрагментах (одним шагом отмены, если передана
+    undo_history); поле получает их от документа. С doc_manager
+    доступна замена во всех документах: файлы обрабатываются потоково
+    в фоне, с подсчетом совпадений и возможностью прервать;
+    on_documents_changed получает {путь: число замен}.
+    """
     dialog = tk.Toplevel(parent)
     dialog.title("Замена текста")
-    dialog.geometry("400x300")
+    dialog.geometry("640x520")
     dialog.transient(parent)
     dialog.grab_set()
 
-    tk.Label(dialog, text="Найти:").pack(pady=5)
+    form = tk.Frame(dialog)
+    form.pack(fill=tk.X, padx=10, pady=10)
 
+    tk.Label(form, text="Найти:").grid(row=0, column=0, sticky=tk.W, pady=2)
     find_var = tk.StringVar()
-    find_entry = tk.Entry(dialog, textvariable=find_var, width=40)
-    find_entry.pack(pady=5)
-
-    tk.Label(dialog, text="Заменить на:").pack(pady=5)
+    find_entry = tk.Entry(form, textvariable=find_var, width=50)
+    find_entry.grid(row=0, column=1, sticky=tk.EW, pady=2)
 
+    tk.Label(form, text="Заменить на:").grid(row=1, column=0, sticky=tk.W, pady=2)
     replace_var = tk.StringVar()
-    replace_entry = tk.Entry(dialog, textvariable=replace_var, width=40)
-    replace_entry.pack(pady=5)
+    tk.Entry(form, textvariable=replace_var, width=50).grid(row=1, column=1, sticky=tk.EW, pady=2)
+    form.columnconfigure(1, weight=1)
 
+    options = tk.Frame(dialog)
+    options.pack(fill=tk.X, padx=10)
     case_var = tk.BooleanVar()
-    case_check = tk.Checkbutton(dialog, text="Учитывать регистр",
-                                variable=case_var)
-    case_check.pack(pady=5)
-
-    def replace():
-        """Замена текста"""
-        find_text = find_var.get()
-        replace_text = replace_var.get()
-
-        if not find_text:
+    regex_var = tk.BooleanVar()
+    word_var = tk.BooleanVar()
+    tk.Checkbutton(options, text="Учитывать регистр", variable=case_var).pack(side=tk.LEFT)
+    tk.Checkbutton(options, text="Слово целиком", variable=word_var).pack(side=tk.LEFT, padx=10)
+    tk.Checkbutton(options, text="Регулярное выражение", variable=regex_var).pack(side=tk.LEFT)
+
+    # Предпросмотр совпадений в текущем тексте
+    preview_frame = tk.Frame(dialog)
+    preview_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    tree = ttk.Treeview(preview_frame, columns=("line", "fragment"), show="headings")
+    tree.heading("line", text="Строка")
+    tree.heading("fragment", text="Фрагмент")
+    tree.column("line", width=70, anchor=tk.E, stretch=False)
+    tree.column("fragment", width=500)
+    tree_scroll = ttk.Scrollbar(preview_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=tree_scroll.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+    status_var = tk.StringVar()
+    tk.Label(dialog, textvariable=status_var, anchor=tk.W, fg="gray").pack(fill=tk.X, padx=10)
+
+    batch = {"thread": None, "cancel": threading.Event(), "progress": (0, 0, ""),
+             "result": None, "dry_run": False}
+    closed = {"value": False}
+
+    def make_engine():
+        """Движок замены по текущим настройкам; None - если запрос пуст или ошибочен"""
+        if not find_var.get():
+            return None
+        try:
+            return ReplaceEngine(find_var.get(), replace_var.get(), regex=regex_var.get(),
+                                 whole_word=word_var.get(), case_sensitive=case_var.get())
+        except re.error as e:
+            messagebox.showerror("Ошибка", f"Неверное регулярное выражение: {e}", parent=dialog)
+            return None
+
+    @contextmanager
+    def undo_step():
+        """Правки внутри блока отменяются одним шагом"""
+        if undo_history is None:
+            yield
             return
+        with undo_history.group():
+            yield
+
+    def index_of(offset):
+        return "%d.%d" % document.index(offset)
+
+    def offset_of(index):
+        return document.offset(*(int(part) for part in text_widget.index(index).split('.')))
+
+    def select(start, end):
+        text_widget.tag_remove('sel', '1.0', tk.END)
+        first, last = index_of(start), index_of(end)
+        text_widget.tag_add('sel', first, last)
+        text_widget.mark_set('insert', last)
+        text_widget.see(first)
+
+    def find_next():
+        """Выделение следующего совпадения (с переходом в начало)"""
+        engine = make_engine()
+        if engine is None:
+            return None
+        snapshot = document.snapshot()
+        match = engine.find(snapshot, offset_of('insert')) or engine.find(snapshot)
+        if match is None:
+            status_var.set("Совпадений нет")
+            return None
+        select(match[0], match[1])
+        status_var.set("")
+        return match
+
+    def replace_one():
+        """Замена выделенного совпадения и переход к следующему"""
+        engine = make_engine()
+        if engine is None:
+            return
+        ranges = text_widget.tag_ranges('sel')
+        if ranges:
+            start, end = offset_of(ranges[0]), offset_of(ranges[1])
+            new = engine.match_at(document.snapshot(), start, end)
+            if new is not None:
+                with undo_step():
+                    document.replace(start, end, new)
+        find_next()
+
+    def apply_edits(snapshot, edits):
+        """Правки документа с конца, чтобы не сдвигались еще не примененные
+
+        Каждая правка затрагивает только свой фрагмент (поле получает их
+        от документа); при очень большом числе совпадений заменяется
+        одним куском диапазон от первого до последнего. Вся замена
+        отменяется одним шагом.
+        """
+        if len(edits) > AppConfig.REPLACE_WIDGET_EDIT_LIMIT:
+            parts, position = [], edits[0][0]
+            for start, end, new in edits:
+                parts.append(snapshot.get(position, start))
+                parts.append(new)
+                position = end
+            edits = [(edits[0][0], edits[-1][1], "".join(parts))]
+
+        with undo_step():
+            for start, end, new in reversed(edits):
+                document.replace(start, end, new)
+
+    def replace_all():
+        """Замена всех совпадений в редакторе"""
+        engine = make_engine()
+        if engine is None:
+            return
+        snapshot = document.snapshot()
+        edits = list(engine.find_all(snapshot))
+        if edits:
+            apply_edits(snapshot, edits)
+        tree.delete(*tree.get_children())
+        status_var.set(f"Заменено: {len(edits)}")
+
+    def show_preview():
+        """Список совпадений с результатом замены"""
+        engine = make_engine()
+        if engine is None:
+            return
+        snapshot = document.snapshot()
+        tree.delete(*tree.get_children())
+        for i, item in enumerate(engine.preview(snapshot)):
+            fragment = f"{item['before']}[{item['old']} → {item['new']}]{item['after']}"
+            tree.insert("", tk.END, iid=f"{item['start']}:{item['end']}",
+                        values=(item["line"], fragment.replace('\n', ' ')))
+        total = engine.count_snapshot(snapshot)
+        shown = len(tree.get_children())
+        status_var.set(f"Найдено совпадений: {total}" +
+                       (f" (показаны первые {shown})" if shown < total else ""))
+
+    def goto_preview(event=None):
+        selection = tree.selection()
+        if selection:
+            start, end = (int(part) for part in selection[0].split(':'))
+            if end <= len(document):
+                select(start, end)
 
-        content = text_widget.get('1.0', tk.END)
-
-        if case_var.get():
-            new_content = content.replace(find_text, replace_text)
-        else:
-            # Без учета регистра
-            import re
-            pattern = re.compile(re.escape(find_text), re.IGNORECASE)
-            new_content = pattern.sub(replace_text, content)
+    # --- Замена во всех документах ---
 
-        text_widget.delete('1.0', tk.END)
-        text_widget.insert('1.0', new_content)
-        messagebox.showinfo("Замена", "Замена выполнена")
+    def start_batch(dry_run):
+        engine = make_engine()
+        if engine is None or batch["thread"] is not None:
+            return
+        if not dry_run and not messagebox.askyesno(
+                "Замена во всех документах",
+                "Заменить во всех документах? Прежние версии останутся "
+                "в резервных копиях и истории.", parent=dialog):
+            return
 
-    tk.Button(dialog, text="Заменить", command=replace,
-              bg="#4CAF50", fg="white").pack(pady=10)
+        batch["cancel"].clear()
+        batch["result"] = None
+        batch["dry_run"] = dry_run
+
+        def run():
+            def progress(done, total, filepath):
+                batch["progress"] = (done, total, filepath)
+            batch["result"] = doc_manager.replace_in_documents(
+                engine, dry_run=dry_run, progress=progress, cancel=batch["cancel"])
+
+        batch["thread"] = threading.Thread(target=run, name="batch-replace", daemon=True)
+        batch["thread"].start()
+        for button in batch_buttons:
+            button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL)
+        dialog.after(100, check_batch)
+
+    def check_batch():
+        """Ход фоновой замены без блокировки окна"""
+        if closed["value"]:
+            return
+        if batch["thread"].is_alive():
+            done, total, filepath = batch["progress"]
+            if total:
+                status_var.set(f"Документ {done + 1} из {total}: {os.path.basename(filepath)}")
+            dialog.after(100, check_batch)
+            return
 
+        batch["thread"] = None
+        for button in batch_buttons:
+            button.config(state=tk.NORMAL)
+        cancel_button.config(state=tk.DISABLED)
+
+        counts = batch["result"] or {}
+        matches = sum(counts.values())
+        action = "Найдено" if batch["dry_run"] else "Заменено"
+        status = f"{action}: {matches} в документах: {len(counts)}"
+        if batch["cancel"].is_set():
+            status += " (прервано)"
+        status_var.set(status)
+        if counts and not batch["dry_run"] and on_documents_changed is not None:
+            on_documents_changed(counts)
+
+    def close():
+        closed["value"] = True
+        batch["cancel"].set()
+        dialog.destroy()
+
+    button_frame = tk.Frame(dialog)
+    button_frame.pack(pady=(5, 0))
+    tk.Button(button_frame, text="Найти далее", command=find_next,
+              width=12).pack(side=tk.LEFT, padx=3)
+    tk.Button(button_frame, text="Заменить", command=replace_one,
+              width=12).pack(side=tk.LEFT, padx=3)
+    tk.Button(button_frame, text="Заменить все", command=replace_all,
+              bg="#4CAF50", fg="white", width=12).pack(side=tk.LEFT, padx=3)
+    tk.Button(button_frame, text="Предпросмотр", command=show_preview,
+              width=12).pack(side=tk.LEFT, padx=3)
+
+    batch_buttons = []
+    batch_frame = tk.Frame(dialog)
+    batch_frame.pack(pady=10)
+    cancel_button = tk.Button(batch_frame, text="Прервать", state=tk.DISABLED,
+                              command=batch["cancel"].set, width=10)
+    if doc_manager is not None:
+        tk.Label(batch_frame, text="Во всех документах:").pack(side=tk.LEFT, padx=3)
+        batch_buttons.append(tk.Button(batch_frame, text="Подсчитать", width=12,
+                                       command=lambda: start_batch(True)))
+        batch_buttons.append(tk.Button(batch_frame, text="Заменить во всех", width=15,
+                                       command=lambda: start_batch(False)))
+        for button in batch_buttons:
+            button.pack(side=tk.LEFT, padx=3)
+        cancel_button.pack(side=tk.LEFT, padx=3)
+
+    tree.bind('<Double-1>', goto_preview)
+    dialog.protocol("WM_DELETE_WINDOW", close)
+    dialog.bind('<Return>', lambda e: find_next())
+    dialog.bind('<Escape>', lambda e: close())
     find_entry.focus_set()
-    dialog.bind('<Return>', lambda e: replace())
 
 
 def format_file_size(size_bytes):
@@ -0,0 +1,257 @@
+"""
+Подсветка найденного в текстовом поле
+"""
+import re
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+from itertools import chain
+from typing import List, Optional, Tuple
+
+from config import AppConfig
+
+_NEWLINE = re.compile('\n')
+
+
+class MatchHighlighter:
+    """Подсветка совпадений и переход между ними
+
+    Совпадения передаются смещениями в тексте (как их возвращает
+    SearchEngine). Таблица начал строк строится одним проходом, индексы
+    Tk ("строка.столбец") вычисляются по ней, а не выражениями
+    "1.0+Nc", которые Tk разбирает от начала текста. Сначала
+    подсвечивается видимая часть, остальное - порциями в паузах
+    (after_idle), по многу диапазонов в одном вызове tag_add.
+    Переход к следующему/предыдущему совпадению идет по уже найденным
+    позициям, без повторного поиска.
+    """
+
+    TAG = 'found'
+    CURRENT_TAG = 'found_current'
+
+    def __init__(self, text_widget: tk.Text, batch_size: int = AppConfig.HIGHLIGHT_BATCH):
+        self.text_widget = text_widget
+        self.batch_size = batch_size
+
+        self.starts = array('q')
+        self.ends = array('q')
+        self.current = -1
+        # Совпадения поступили для текста, который с тех пор не менялся
+        self.valid = False
+
+        self._line_starts = array('q', [0])
+        self._done = bytearray()  # 1 - диапазон уже подсвечен
+        self._next = 0  # с какого совпадения продолжать фоновую подсветку
+        self._job = None
+
+        text_widget.tag_config(self.TAG, background='yellow', foreground='black')
+        text_widget.tag_config(self.CURRENT_TAG, background='#ff9632', foreground='black')
+        text_widget.tag_raise(self.CURRENT_TAG)
+
+    # --- Совпадения ---
+
+    def set_matches(self, text, starts: array, ends: array, current: int = 0):
+        """Новый набор совпадений для text - строки или TextSnapshot
+        (предыдущая подсветка снимается)"""
+        self.clear()
+        self.starts, self.ends = array('q', starts), array('q', ends)
+        self._line_starts = self._line_table(text)
+        self._done = bytearray(len(starts))
+        self.valid = True
+
+        if len(starts):
+            self.highlight_visible()
+            self.select(min(max(current, 0), len(starts) - 1))
+            self._schedule()
+
+    @staticmethod
+    def _line_table(text) -> array:
+        """Начала строк; снимок просматривается по кускам, без склейки"""
+        if isinstance(text, str):
+            return array('q', chain([0], map(re.Match.end, _NEWLINE.finditer(text))))
+        line_starts = array('q', [0])
+        base = 0
+        for chunk in text.chunks():
+            line_starts.extend(base + match.end() for match in _NEWLINE.finditer(chunk))
+            base += len(chunk)
+        return line_starts
+
+    def add_matches(self, starts: array, ends: array):
+        """Дополнение набора (поиск, выдающий результаты частями)
+
+        Новые совпадения должны идти после уже переданных.
+        """
+        if not self.valid or not len(starts):
+            return
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self._done.extend(bytes(len(starts)))
+        self.highlight_visible()
+        if self.current < 0:
+            self.select(0)
+        self._schedule()
+
+    def clear(self):
+        """Снятие подсветки"""
+        self._cancel()
+        self.text_widget.tag_remove(self.TAG, '1.0', tk.END)
+        self.text_widget.tag_remove(self.CURRENT_TAG, '1.0', tk.END)
+        self.starts, self.ends = array('q'), array('q')
+        self._done = bytearray()
+        self._next = 0
+        self.current = -1
+        self.valid = False
+
+    def invalidate(self):
+        """Текст изменился: позиции устарели
+
+        Уже поставленная подсветка остается (Tk сдвигает ее вместе с
+        текстом), фоновая подсветка прекращается, а переход между
+        совпадениями идет по подсвеченным диапазонам.
+        """
+        if self.valid:
+            self._cancel()
+            self.valid = False
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    # --- Индексы ---
+
+    def index(self, offset: int) -> str:
+        """Смещение -> индекс Tk"""
+        line = bisect_right(self._line_starts, offset)
+        return f"{line}.{offset - self._line_starts[line - 1]}"
+
+    def _indices(self, first: int, last: int) -> List[str]:
+        """Индексы начал и концов совпадений first..last-1 (по порядку)
+
+        Совпадения упорядочены по началу, поэтому строка ищется двоичным
+        поиском только для первого, а дальше сдвигается вперед.
+        """
+        line_starts = self._line_starts
+        lines = len(line_starts)
+        line = bisect_right(line_starts, self.starts[first]) - 1
+        result = []
+        for i in range(first, last):
+            start, end = self.starts[i], self.ends[i]
+            while line + 1 < lines and line_starts[line + 1] <= start:
+                line += 1
+            end_line = line
+            while end_line + 1 < lines and line_starts[end_line + 1] <= end:
+                end_line += 1
+            result.append(f"{line + 1}.{start - line_starts[line]}")
+            result.append(f"{end_line + 1}.{end - line_starts[end_line]}")
+        return result
+
+    def _apply(self, first: int, last: int):
+        """Подсветка еще не подсвеченных совпадений first..last-1 одним вызовом tag_add"""
+        done = self._done
+        if done.find(0, first, last) == -1:
+            return
+        indices = self._indices(first, last)
+        ranges = []
+        for i in range(first, last):
+            if not done[i]:
+                done[i] = 1
+                ranges.append(indices[2 * (i - first)])
+                ranges.append(indices[2 * (i - first) + 1])
+        self.text_widget.tag_add(self.TAG, *ranges)
+
+    # --- Постепенная подсветка ---
+
+    def highlight_visible(self):
+        """Подсветка совпадений в видимой части поля"""
+        if not self.valid or not len(self.starts):
+            return
+        top = int(self.text_widget.index('@0,0').split('.')[0])
+        bottom = int(self.text_widget.index(f"@0,{self.text_widget.winfo_height()}")
+                     .split('.')[0])
+        first_offset = self._line_starts[min(top, len(self._line_starts)) - 1]
+        last_offset = self._line_starts[bottom] if bottom < len(self._line_starts) \
+            else float('inf')
+
+        # Совпадения, начинающиеся выше экрана, но заходящие на него, редки;
+        # берем все, что начинается на видимых строках
+        first = bisect_right(self.starts, first_offset - 1)
+        last = bisect_right(self.starts, last_offset)
+        self._highlight_range(first, last)
+
+    def _highlight_range(self, first: int, last: int):
+        for batch_start in range(first, last, self.batch_size):
+            self._apply(batch_start, min(last, batch_start + self.batch_size))
+
+    def _schedule(self):
+        if self._job is None and self.valid:
+            self._job = self.text_widget.after_idle(self._fill)
+
+    def _fill(self):
+        """Очередная порция фоновой подсветки"""
+        self._job = None
+        if not self.valid:
+            return
+        self._next = self._done.find(0, self._next)
+        if self._next == -1:
+            self._next = len(self.starts)
+            return
+        last = min(len(self.starts), self._next + self.batch_size)
+        self._apply(self._next, last)
+        self._next = last
+        self._schedule()
+
+    def _cancel(self):
+        if self._job is not None:
+            self.text_widget.after_cancel(self._job)
+            self._job = None
+
+    # --- Переход между совпадениями ---
+
+    def select(self, number: int):
+        """Выделение совпадения с номером number и прокрутка к нему"""
+        if not len(self.starts):
+            return
+        self.current = number % len(self.starts)
+        start, end = self._indices(self.current, self.current + 1)
+        self._show_current(start, end)
+
+    def _show_current(self, start: str, end: str):
+        widget = self.text_widget
+        widget.tag_remove(self.CURRENT_TAG, '1.0', tk.END)
+        widget.tag_add(self.CURRENT_TAG, start, end)
+        widget.mark_set('insert', end)
+        widget.see(start)
+        if self.valid:
+            self.highlight_visible()
+
+    def next(self):
+        """Следующее совпадение (после последнего - первое)"""
+        if self.valid:
+            self.select(self.current + 1)
+        else:
+            self._step_by_tags(forward=True)
+
+    def previous(self):
+        """Предыдущее совпадение (перед первым - последнее)"""
+        if self.valid:
+            self.select(self.current - 1)
+        else:
+            self._step_by_tags(forward=False)
+
+    def _step_by_tags(self, forward: bool):
+        """Переход по подсвеченным диапазонам, когда позиции устарели"""
+        widget = self.text_widget
+        current = widget.tag_ranges(self.CURRENT_TAG)
+        if forward:
+            origin = current[1] if current else 'insert'
+            found = widget.tag_nextrange(self.TAG, origin) or widget.tag_nextrange(self.TAG, '1.0')
+        else:
+            origin = current[0] if current else 'insert'
+            found = widget.tag_prevrange(self.TAG, origin) or widget.tag_prevrange(self.TAG, tk.END)
+        if found:
+            self._show_current(str(found[0]), str(found[1]))
+
+    def position(self) -> Optional[Tuple[int, int]]:
+        """(номер текущего совпадения с 1, всего) или None"""
+        if not self.valid or self.current < 0:
+            return None
+        return self.current + 1, len(self.starts)
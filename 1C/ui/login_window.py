@@ -7,7 +7,8 @@ from datetime import datetime
 import getpass
 
 from config import AppPaths, AppConfig
-from core.auth import UserManager, LoginLogger, SessionManager
+from core.auth import get_user_manager, get_login_logger, SessionManager
+from core.ratelimit import LoginRateLimiter
 
 
 class LoginWindow(tk.Frame):
@@ -52,13 +53,15 @@ class LoginWindow(tk.Frame):
 
     def init_managers(self):
         """Инициализация менеджеров"""
-        self.user_manager = UserManager()
-        self.logger = LoginLogger()
+        self.user_manager = get_user_manager()
+        self.logger = get_login_logger()
         self.session_manager = SessionManager()
 
-        # Переменные состояния
-        self.login_attempts = {}
-        self.locked_out_until = {}
+        # Общий для всех окон и процессов учет попыток входа
+        self.rate_limiter = LoginRateLimiter(logger=self.logger)
+
+        # Тот же ключ, под которым попытки записаны в журнал
+        self.client_address = self.logger.client_address
 
     def load_settings(self):
         """Загрузка настроек"""
@@ -211,6 +214,10 @@ class LoginWindow(tk.Frame):
         )
         self.login_button.pack(fill=tk.X, pady=(0, 10))
 
+        # Индикатор проверки пароля (показывается на время проверки)
+        self.login_progress = ttk.Progressbar(inner_frame, mode='indeterminate')
+        self.pending_login = None
+
         # Статус
         self.status_label = tk.Label(
             inner_frame,
@@ -284,12 +291,42 @@ class LoginWindow(tk.Frame):
             self.show_status("Заполните все поля", "error")
             return
 
-        # Аутентификация
-        success, message, user_info = self.user_manager.authenticate(username, password)
+        # Повторное нажатие во время проверки игнорируем
+        if self.pending_login is not None:
+            return
+
+        # Аутентификация в фоновом пуле: окно не замирает на время PBKDF2
+        self.pending_login = self.user_manager.authenticate_async(username, password)
+        self.login_button.config(state='disabled')
+        self.login_progress.pack(fill=tk.X, pady=(0, 10), after=self.login_button)
+        self.login_progress.start(10)
+        self.show_status("Проверка пароля...", "info")
+
+        self.master.after(AppConfig.LOGIN_POLL_INTERVAL,
+                          lambda: self.check_login_result(username))
+
+    def check_login_result(self, username: str):
+        """Ожидание результата фоновой аутентификации"""
+        future = self.pending_login
+        if not future.done():
+            self.master.after(AppConfig.LOGIN_POLL_INTERVAL,
+                              lambda: self.check_login_result(username))
+            return
+
+        self.pending_login = None
+        self.login_progress.stop()
+        self.login_progress.pack_forget()
+        self.login_button.config(state='normal')
+
+        try:
+            success, message, user_info = future.result()
+        except Exception as e:
+            self.show_status(f"Ошибка аутентификации: {e}", "error")
+            return
 
         if success:
             # Логирование успеха
-            self.logger.log_attempt(username, "SUCCESS")
+            self.logger.log_attempt(username, "SUCCESS", self.client_address)
 
             # Создание сессии
             session_id = self.session_manager.create_session(username, user_info)
@@ -304,51 +341,32 @@ class LoginWindow(tk.Frame):
                                                                session_id))
         else:
             # Логирование неудачи
-            self.logger.log_attempt(username, "FAILURE")
+            self.logger.log_attempt(username, "FAILURE", self.client_address)
             self.show_status(message, "error")
             self.record_failed_attempt()
 
     def is_ip_locked(self) -> bool:
         """Проверка блокировки по IP"""
-        ip_address = getpass.getuser()  # В реальном приложении нужно получить реальный IP
+        remaining = int(self.rate_limiter.locked_for(self.client_address))
 
-        if ip_address in self.locked_out_until:
-            lock_time = self.locked_out_until[ip_address]
-            if datetime.now() < lock_time:
-                remaining = (lock_time - datetime.now()).seconds
-                minutes = remaining // 60
-                seconds = remaining % 60
+        if remaining > 0:
+            minutes = remaining // 60
+            seconds = remaining % 60
 
-                self.show_status(
-                    f"Слишком много попыток. Подождите {minutes} мин {seconds} сек.",
-                    "error"
-                )
-                return True
+            self.show_status(
+                f"Слишком много попыток. Подождите {minutes} мин {seconds} сек.",
+                "error"
+            )
+            return True
 
         return False
 
     def record_failed_attempt(self):
         """Запись неудачной попытки"""
-        ip_address = getpass.getuser()
-
-        # Увеличиваем счетчик попыток
-        if ip_address not in self.login_attempts:
-            self.login_attempts[ip_address] = []
-
-        self.login_attempts[ip_address].append(datetime.now())
-
-        # Удаляем старые попытки
-        cutoff_time = datetime.now().timestamp() - 3600  # Последний час
-        self.login_attempts[ip_address] = [
-            t for t in self.login_attempts[ip_address]
-            if t.timestamp() > cutoff_time
-        ]
-
-        # Проверяем количество попыток
-        if len(self.login_attempts[ip_address]) >= AppConfig.MAX_LOGIN_ATTEMPTS:
-            lock_time = datetime.now().timestamp() + AppConfig.LOCKOUT_TIME
-            self.locked_out_until[ip_address] = datetime.fromtimestamp(lock_time)
-            self.show_status("Доступ заблокирован на 10 минут", "error")
+        lockout = self.rate_limiter.record_failure(self.client_address)
+
+        if lockout:
+            self.show_status(f"Доступ заблокирован на {int(lockout) // 60} минут", "error")
 
     def show_status(self, message: str, status_type: str = "info"):
         """Отображение статуса"""
@@ -4,12 +4,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
+import queue
+from array import array
+from bisect import bisect_left
 from datetime import datetime
+from pathlib import Path
 
 from config import AppConfig, AppPaths
-from core.editor import DocumentManager, TextAnalyzer
+from core.editor import DocumentManager, TextAnalyzer, LineStats, PieceTable
 from core.auth import SessionManager
+from core.autosave import AutosaveWorker, RecoveryJournal
+from core.reports import ReportsIndex
+from core.search import SearchEngine, SearchWorker
+from core.undo import UndoHistory
 from .dialogs import *
+from .highlight import MatchHighlighter
+from .text_proxy import TextChangeProxy
+from .viewer import DocumentViewer
 
 
 class MainWindow:
@@ -33,6 +44,9 @@ class MainWindow:
         # Показ приветственного сообщения
         self.show_welcome()
 
+        # Предложение восстановить текст после аварийного завершения
+        self.master.after_idle(self.offer_recovery)
+
     def setup_window(self):
         """Настройка окна"""
         self.master.title(f"Текстовый редактор - {self.username} ({self.role})")
@@ -56,12 +70,30 @@ class MainWindow:
         self.doc_manager = DocumentManager()
         self.text_analyzer = TextAnalyzer()
         self.session_manager = SessionManager()
+        self.reports_index = ReportsIndex()
 
         # Текущий документ
         self.current_file = None
         self.is_modified = False
         self.is_new = True
 
+        # Состояние постепенной загрузки большого документа
+        self.loading = None
+
+        # Сохранение выполняется в фоне; поколение растет с каждой правкой,
+        # чтобы по завершении записи понять, не изменился ли текст снова
+        self.edit_generation = 0
+        self.autosaved_generation = 0
+        self.pending_saves = 0
+        # Автосохранения, результат которых окно еще не забрало
+        self.pending_autosaves = 0
+        # (файл, поколение правок): история откроется после этого сохранения
+        self.history_after_save = None
+        self.save_note = ""
+        self.recovery = RecoveryJournal(self.username)
+        self.autosaver = AutosaveWorker(self.doc_manager, self.recovery)
+        self.master.after(AppConfig.AUTOSAVE_INTERVAL * 1000, self.autosave_tick)
+
     def load_settings(self):
         """Загрузка настроек"""
         self.settings = AppConfig.load_settings()
@@ -82,14 +114,24 @@ class MainWindow:
         file_menu.add_command(label="Сохранить как...", command=self.save_as, accelerator="Ctrl+Shift+S")
         file_menu.add_separator()
         file_menu.add_command(label="Список документов", command=self.show_documents_list, accelerator="Ctrl+L")
+        file_menu.add_command(label="Просмотр большого файла...", command=self.open_viewer)
+        file_menu.add_command(label="История версий...", command=self.show_history)
+        file_menu.add_command(label="Отчеты...", command=self.show_reports)
         file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.on_closing, accelerator="Alt+F4")
         menubar.add_cascade(label="Файл", menu=file_menu)
 
         # Меню Правка
         edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="Отменить", command=self.undo, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Повторить", command=self.redo, accelerator="Ctrl+Y")
+        edit_menu.add_separator()
         edit_menu.add_command(label="Найти", command=self.find_text, accelerator="Ctrl+F")
+        edit_menu.add_command(label="Найти с параметрами...", command=self.find_dialog)
         edit_menu.add_command(label="Заменить", command=self.replace_text, accelerator="Ctrl+H")
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Поиск по документам", command=self.search_documents,
+                              accelerator="Ctrl+Shift+F")
         menubar.add_cascade(label="Правка", menu=edit_menu)
 
         # Меню Вид
@@ -137,9 +179,13 @@ class MainWindow:
         main_frame = tk.Frame(self.master)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        # Строка поиска (показывается по Ctrl+F)
+        self.create_find_bar(main_frame)
+
         # Текстовое поле с прокруткой
         text_frame = tk.Frame(main_frame)
         text_frame.pack(fill=tk.BOTH, expand=True)
+        self.text_frame = text_frame
 
         # Вертикальная прокрутка
         scroll_y = tk.Scrollbar(text_frame)
@@ -153,7 +199,7 @@ class MainWindow:
         self.text_widget = tk.Text(
             text_frame,
             wrap='word',
-            undo=True,
+            undo=False,  # отмену ведет UndoHistory по правкам модели
             yscrollcommand=scroll_y.set,
             xscrollcommand=scroll_x.set,
             font=(self.font_family, self.font_size),
@@ -171,6 +217,68 @@ class MainWindow:
         # Привязка события изменения текста
         self.text_widget.bind('<KeyRelease>', self.on_text_changed)
 
+        # Текст документа хранится в модели; поле и модель обмениваются
+        # правками, а статистика поддерживается по правкам
+        self.document = PieceTable()
+        self.document.add_listener(self.on_document_change)
+        self.undo_history = UndoHistory()
+        self.document.add_listener(self.undo_history.record)
+        self.line_stats = LineStats()
+        self.status_job = None
+        self.text_proxy = TextChangeProxy(self.text_widget)
+        self.text_proxy.add_listener(self.on_text_edit)
+
+        # Отмена и повтор; щелчок мышью завершает шаг набора
+        for sequence in ('<<Undo>>', '<Control-z>', '<Control-Z>'):
+            self.text_widget.bind(sequence, lambda e: self.undo())
+        for sequence in ('<<Redo>>', '<Control-y>', '<Control-Y>'):
+            self.text_widget.bind(sequence, lambda e: self.redo())
+        self.text_widget.bind('<Button-1>', lambda e: self.undo_history.separator(), add='+')
+
+        # Подсветка результатов поиска
+        self.highlighter = MatchHighlighter(self.text_widget)
+        self.text_version = 0
+
+    def create_find_bar(self, parent):
+        """Строка поиска по мере ввода"""
+        self.find_bar = tk.Frame(parent, bg='#e0e0e0')
+
+        tk.Label(self.find_bar, text="Найти:", bg='#e0e0e0').pack(side=tk.LEFT, padx=(5, 2))
+        self.find_var = tk.StringVar()
+        self.find_entry = tk.Entry(self.find_bar, textvariable=self.find_var, width=30)
+        self.find_entry.pack(side=tk.LEFT, pady=3)
+
+        self.find_case_var = tk.BooleanVar()
+        self.find_word_var = tk.BooleanVar()
+        for text, variable in (("Учитывать регистр", self.find_case_var),
+                               ("Слово целиком", self.find_word_var)):
+            tk.Checkbutton(self.find_bar, text=text, variable=variable, bg='#e0e0e0',
+                           command=self.schedule_find).pack(side=tk.LEFT, padx=3)
+
+        tk.Button(self.find_bar, text="◀", command=lambda: self.find_step(False),
+                  width=2).pack(side=tk.LEFT, padx=1)
+        tk.Button(self.find_bar, text="▶", command=lambda: self.find_step(True),
+                  width=2).pack(side=tk.LEFT, padx=1)
+        self.find_count_var = tk.StringVar()
+        tk.Label(self.find_bar, textvariable=self.find_count_var, bg='#e0e0e0',
+                 fg='#555555').pack(side=tk.LEFT, padx=8)
+        tk.Button(self.find_bar, text="✕", command=self.hide_find_bar, relief=tk.FLAT,
+                  bg='#e0e0e0').pack(side=tk.RIGHT, padx=3)
+
+        self.find_var.trace_add('write', lambda *args: self.schedule_find())
+        self.find_entry.bind('<Return>', lambda e: self.find_step(True))
+        self.find_entry.bind('<Shift-Return>', lambda e: self.find_step(False))
+        self.find_entry.bind('<Escape>', lambda e: self.hide_find_bar())
+
+        # Поиск идет в фоне по снимку документа; снимок берется заново только
+        # после правок (text_version растет с каждой правкой), чтобы поток
+        # поиска не склеивал текст повторно
+        self.find_worker = SearchWorker()
+        self.find_job = None
+        self.find_poll_job = None
+        self.find_state = None
+        self.find_snapshot = (None, None)
+
     def create_statusbar(self):
         """Создание строки состояния"""
         self.statusbar = tk.Label(self.master,
@@ -182,6 +290,11 @@ class MainWindow:
                                   fg='#333333')
         self.statusbar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        # Индикатор загрузки/сохранения больших документов (показывается по необходимости)
+        self.progress = ttk.Progressbar(self.master, mode='determinate',
+                                        maximum=1.0, length=200)
+        self.progress_text = None
+
     def setup_bindings(self):
         """Настройка привязок клавиш"""
         self.master.bind('<Control-n>', lambda e: self.new_document())
@@ -190,6 +303,7 @@ class MainWindow:
         self.master.bind('<Control-l>', lambda e: self.show_documents_list())
         self.master.bind('<Control-f>', lambda e: self.find_text())
         self.master.bind('<Control-h>', lambda e: self.replace_text())
+        self.master.bind('<Control-F>', lambda e: self.search_documents())
 
     def show_welcome(self):
         """Показ приветственного сообщения"""
@@ -212,16 +326,65 @@ class MainWindow:
 Текущий документ: Не сохранен
 """
         self.text_widget.insert('1.0', welcome_text)
+        self.is_modified = False
         self.update_status()
 
     def on_text_changed(self, event=None):
         """Обработчик изменения текста"""
-        if self.is_new and self.text_widget.get('1.0', 'end-1c').strip():
+        if self.is_new and self.has_text():
             self.is_modified = True
-            self.update_status()
+            self.schedule_status_update()
+
+    def has_text(self) -> bool:
+        """Есть ли в документе непробельные символы"""
+        return self.line_stats.words > 0
+
+    def on_text_edit(self, event):
+        """Правка в текстовом поле -> та же правка в модели документа"""
+        if event[0] == "insert":
+            _, (line, column), text = event
+            self.document.insert(self.document.offset(line, column), text,
+                                 origin=self.text_proxy)
+        else:
+            _, (line, column), _, deleted = event
+            start = self.document.offset(line, column)
+            self.document.delete(start, start + len(deleted), origin=self.text_proxy)
+
+    def on_document_change(self, event):
+        """Правка модели: перенос в поле (если пришла не из него) и
+        обновление статистики затронутых строк"""
+        kind, offset, text, origin = event
+        if origin is not self.text_proxy:
+            index = "%d.%d" % self.document.index(offset)
+            if kind == "insert":
+                self.text_proxy.call("insert", index, text)
+            else:
+                self.text_proxy.call("delete", index, f"{index}+{len(text)}c")
+
+        line = self.document.line_of(offset)
+        changed = text.count('\n')
+        if kind == "insert":
+            self.line_stats.splice(line, 1, self.document.lines(line, changed + 1))
+        else:
+            self.line_stats.splice(line, changed + 1, self.document.lines(line, 1))
+
+        if self.loading is None:
+            self.is_modified = True
+            self.edit_generation += 1
+        self.text_version += 1
+        self.highlighter.invalidate()
+        self.find_worker.cancel()
+        self.schedule_status_update()
+
+    def schedule_status_update(self):
+        """Отложенное обновление строки состояния (одно на серию правок)"""
+        if self.status_job is None:
+            self.status_job = self.master.after_idle(self.update_status)
 
     def update_status(self):
         """Обновление строки состояния"""
+        self.status_job = None
+
         if self.current_file:
             doc_name = os.path.basename(self.current_file)
             status = f"Документ: {doc_name}"
@@ -232,19 +395,26 @@ class MainWindow:
             status += " | Изменен"
 
         # Статистика текста
-        text = self.text_widget.get('1.0', 'end-1c')
-        lines = text.count('\n') + 1
-        words = len(text.split())
-        chars = len(text)
+        lines = self.line_stats.lines
+        words = self.line_stats.words
+        chars = self.line_stats.characters
 
         status += f" | Строк: {lines} | Слов: {words} | Символов: {chars}"
 
+        if self.pending_saves:
+            status += " | Сохранение..."
+        elif self.save_note:
+            status += f" | {self.save_note}"
+
+        if self.progress_text:
+            status += f" | {self.progress_text}"
+
         self.statusbar.config(text=status)
         self.master.title(f"Текстовый редактор - {status.split('|')[0]}")
 
     def new_document(self):
         """Создание нового документа"""
-        if self.is_modified and self.text_widget.get('1.0', 'end-1c').strip():
+        if self.is_modified and self.has_text():
             response = messagebox.askyesnocancel(
                 "Новый документ",
                 "Текущий документ изменен. Сохранить перед созданием нового?"
@@ -254,7 +424,10 @@ class MainWindow:
             elif response:  # Yes
                 self.save_file()
 
-        self.text_widget.delete('1.0', tk.END)
+        self.cancel_loading()
+        self.autosaver.clear_recovery()
+        self.document.set_text("")
+        self.undo_history.reset()
         self.current_file = None
         self.is_new = True
         self.is_modified = False
@@ -276,7 +449,22 @@ class MainWindow:
 
     def load_document_file(self, filename):
         """Загрузка документа из файла"""
-        if self.is_modified and self.text_widget.get('1.0', 'end-1c').strip():
+        try:
+            size = os.path.getsize(filename)
+        except OSError as e:
+            print(f"Ошибка загрузки документа: {e}")
+            messagebox.showerror("Ошибка", "Не удалось загрузить документ")
+            return
+
+        # Слишком большой файл лучше смотреть без загрузки в редактор
+        if size >= AppConfig.VIEWER_THRESHOLD and messagebox.askyesno(
+                "Большой документ",
+                f"Размер файла {format_file_size(size)}. Открыть его в режиме "
+                f"просмотра (только чтение)?"):
+            self.view_document(filename)
+            return
+
+        if self.is_modified and self.has_text():
             response = messagebox.askyesnocancel(
                 "Открыть файл",
                 "Текущий документ изменен. Сохранить перед открытием нового?"
@@ -286,22 +474,123 @@ class MainWindow:
             elif response:  # Yes
                 self.save_file()
 
-        content = self.doc_manager.load_document(filename)
-        if content is not None:
+        self.cancel_loading()
+        self.autosaver.clear_recovery()
+
+        # Текст вставляется кусками между событиями, чтобы окно не замирало.
+        # Загрузка не пишется в историю правок - иначе в ней была бы вторая
+        # копия файла; история очищается по окончании
+        self.undo_history.suspend()
+        self.text_widget.delete('1.0', tk.END)
+
+        self.current_file = filename
+        self.is_new = False
+        self.is_modified = False
+        self.loading = {
+            "chunks": self.doc_manager.iter_document(filename),
+            "size": size,
+            "job": None
+        }
+        self.load_next_chunk()
+
+    def load_next_chunk(self):
+        """Вставка очередного куска загружаемого документа"""
+        loading = self.loading
+        loading["job"] = None
+
+        try:
+            chunk, position = next(loading["chunks"])
+        except StopIteration:
+            self.finish_loading()
+            return
+        except Exception as e:
+            print(f"Ошибка загрузки документа: {e}")
+            self.cancel_loading()
             self.text_widget.delete('1.0', tk.END)
-            self.text_widget.insert('1.0', content)
+            self.current_file = None
+            self.is_new = True
+            self.update_status()
+            messagebox.showerror("Ошибка", "Не удалось загрузить документ")
+            return
 
-            self.current_file = filename
-            self.is_new = False
-            self.is_modified = False
+        # Пока документ загружается, пользователь не может его править
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.insert(tk.END, chunk)
 
-            # Добавляем в список недавних файлов
-            self.add_to_recent_files(filename)
+        if position < loading["size"]:
+            self.text_widget.config(state=tk.DISABLED)
+            self.show_progress("Загрузка", position / loading["size"])
+
+        loading["job"] = self.master.after(1, self.load_next_chunk)
+
+    def finish_loading(self):
+        """Завершение постепенной загрузки"""
+        self.end_loading()
+        self.text_widget.mark_set(tk.INSERT, '1.0')
+        self.text_widget.see('1.0')
+
+        # Добавляем в список недавних файлов
+        self.add_to_recent_files(self.current_file)
 
+        self.update_status()
+
+    def cancel_loading(self):
+        """Прерывание незавершенной загрузки (текст остается частичным)"""
+        if self.loading is not None:
+            if self.loading["job"] is not None:
+                self.master.after_cancel(self.loading["job"])
+            self.loading["chunks"].close()
+            self.end_loading()
+
+    def end_loading(self):
+        self.loading = None
+        self.text_widget.config(state=tk.NORMAL)
+        self.undo_history.reset()
+        self.hide_progress()
+
+    def show_progress(self, text, fraction):
+        """Показ индикатора выполнения в строке состояния"""
+        self.progress['value'] = fraction
+        self.progress_text = f"{text}: {fraction:.0%}"
+        if not self.progress.winfo_ismapped():
+            self.progress.place(in_=self.statusbar, relx=1.0, x=-4, rely=0.5, anchor=tk.E)
+        self.update_status()
+        self.master.update_idletasks()
+
+    def hide_progress(self):
+        if self.progress_text is not None:
+            self.progress_text = None
+            self.progress.place_forget()
             self.update_status()
 
+    def open_viewer(self):
+        """Выбор файла для режима просмотра"""
+        filename = filedialog.askopenfilename(
+            initialdir=str(AppPaths.DOCS_DIR),
+            title="Просмотр документа",
+            filetypes=[
+                ("Текстовые файлы", "*.txt"),
+                ("Все файлы", "*.*")
+            ]
+        )
+
+        if filename:
+            self.view_document(filename)
+
+    def view_document(self, filename):
+        """Открытие документа только для чтения без загрузки в память"""
+        doc = self.doc_manager.open_mapped(filename)
+        if doc is None:
+            messagebox.showerror("Ошибка", "Не удалось открыть документ")
+            return
+        DocumentViewer(self.master, doc)
+
     def save_file(self):
         """Сохранение файла"""
+        if self.loading is not None:
+            messagebox.showwarning("Сохранение", "Документ еще загружается")
+            return
+
         if not self.current_file or self.is_new:
             self.save_as()
         else:
@@ -326,7 +615,6 @@ class MainWindow:
             self.save_document(filename)
             self.current_file = filename
             self.is_new = False
-            self.is_modified = False
 
             # Добавляем в список недавних файлов
             self.add_to_recent_files(filename)
@@ -334,18 +622,84 @@ class MainWindow:
             self.update_status()
 
     def save_document(self, filename=None):
-        """Сохранение документа"""
+        """Сохранение документа в фоне (окно не ждет диска)"""
         if filename is None:
             filename = self.current_file
 
-        content = self.text_widget.get('1.0', tk.END).strip()
+        self.autosaver.save(filename, self.document.snapshot(), self.edit_generation)
+        self.pending_saves += 1
+        if self.pending_saves + self.pending_autosaves == 1:
+            self.master.after(100, self.check_saves)
+        self.update_status()
+
+    def check_saves(self):
+        """Обработка завершенных фоновых сохранений"""
+        open_history = False
+        while not self.autosaver.results.empty():
+            filename, generation, ok, explicit = self.autosaver.results.get()
+            if not explicit:
+                self.pending_autosaves -= 1
+            else:
+                self.pending_saves -= 1
+                if self.history_after_save == (filename, generation):
+                    self.history_after_save = None
+                    open_history = ok
+
+            if ok:
+                # Текст не менялся с момента снимка - документ сохранен полностью
+                if filename == self.current_file and generation == self.edit_generation:
+                    self.is_modified = False
+                    self.autosaver.clear_recovery()
+                self.save_note = f"Сохранено в {datetime.now().strftime('%H:%M:%S')}"
+            elif explicit:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить документ\n{filename}")
 
-        if self.doc_manager.save_document(filename, content):
-            self.is_modified = False
+        self.update_status()
+        if self.pending_saves or self.pending_autosaves:
+            self.master.after(100, self.check_saves)
+        if open_history:
+            self.open_history_dialog()
+
+    def autosave_tick(self):
+        """Периодическое автосохранение несохраненных изменений"""
+        if self.loading is None and self.is_modified and \
+                self.edit_generation != self.autosaved_generation:
+            filename = None if self.is_new else self.current_file
+            self.autosaver.autosave(filename, self.document.snapshot(), self.edit_generation)
+            self.autosaved_generation = self.edit_generation
+            self.pending_autosaves += 1
+            if self.pending_saves + self.pending_autosaves == 1:
+                self.master.after(100, self.check_saves)
+
+        self.master.after(AppConfig.AUTOSAVE_INTERVAL * 1000, self.autosave_tick)
+
+    def offer_recovery(self):
+        """Восстановление текста, оставшегося после аварийного завершения"""
+        entries = self.recovery.pending()
+        if not entries:
+            return
+
+        entry = entries[0]
+        name = os.path.basename(entry["filepath"]) if entry["filepath"] else "новый документ"
+        response = messagebox.askyesno(
+            "Восстановление",
+            f"Прошлый сеанс завершился аварийно. Найдена несохраненная копия "
+            f"({name}, {entry['saved'].strftime('%d.%m.%Y %H:%M')}).\n\n"
+            f"Восстановить ее?"
+        )
+
+        text = self.recovery.read(entry["id"]) if response else None
+        if text is not None:
+            self.cancel_loading()
+            self.document.set_text(text)
+            self.undo_history.reset()
+            self.current_file = entry["filepath"]
+            self.is_new = entry["filepath"] is None
+            self.is_modified = True
             self.update_status()
-            messagebox.showinfo("Сохранение", "Документ успешно сохранен")
-        else:
-            messagebox.showerror("Ошибка", "Не удалось сохранить документ")
+
+        # Текст теперь в редакторе и снова попадет в копию при автосохранении
+        self.recovery.clear(entry["id"])
 
     def add_to_recent_files(self, filename):
         """Добавление файла в список недавних"""
@@ -360,13 +714,226 @@ class MainWindow:
         """Показать список документов"""
         show_documents_dialog(self.master, self.doc_manager, self.load_document_file)
 
+    def show_history(self):
+        """История версий текущего документа"""
+        if not self.current_file or self.is_new:
+            messagebox.showinfo("История версий", "Документ еще не сохранялся")
+            return
+
+        if self.is_modified and self.has_text():
+            response = messagebox.askyesnocancel(
+                "История версий",
+                "Документ изменен. Сохранить его перед просмотром истории?"
+            )
+            if response is None:  # Cancel
+                return
+            elif response:  # Yes
+                if self.loading is not None:
+                    messagebox.showwarning("Сохранение", "Документ еще загружается")
+                    return
+                # Сохранение идет в фоне: история откроется, когда оно
+                # завершится (check_saves), иначе в ней не будет этой версии
+                self.history_after_save = (self.current_file, self.edit_generation)
+                self.save_document()
+                return
+
+        self.open_history_dialog()
+
+    def open_history_dialog(self):
+        show_history_dialog(self.master, self.doc_manager, self.current_file,
+                            self.reload_document)
+
+    def reload_document(self, filename):
+        """Повторная загрузка документа после восстановления версии"""
+        self.is_modified = False
+        self.load_document_file(filename)
+
     def find_text(self):
-        """Поиск текста"""
-        show_find_dialog(self.master, self.text_widget)
+        """Поиск текста (строка поиска)"""
+        self.show_find_bar()
+
+    def find_dialog(self):
+        """Поиск с параметрами (регулярные выражения)"""
+        show_find_dialog(self.master, self.document, self.highlighter)
+
+    # --- Поиск по мере ввода ---
+
+    def show_find_bar(self):
+        if not self.find_bar.winfo_ismapped():
+            self.find_bar.pack(fill=tk.X, pady=(0, 3), before=self.text_frame)
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, tk.END)
+        if self.find_var.get():
+            self.schedule_find()
+
+    def hide_find_bar(self):
+        """Закрытие строки поиска со снятием подсветки"""
+        if self.find_job is not None:
+            self.master.after_cancel(self.find_job)
+            self.find_job = None
+        self.find_worker.cancel()
+        self.find_state = None
+        self.find_snapshot = (None, None)
+        self.highlighter.clear()
+        self.find_count_var.set("")
+        self.find_bar.pack_forget()
+        self.text_widget.focus_set()
+
+    def schedule_find(self):
+        """Поиск после паузы в наборе (не на каждую клавишу подряд)"""
+        if self.find_job is not None:
+            self.master.after_cancel(self.find_job)
+        self.find_job = self.master.after(AppConfig.FIND_DELAY, self.run_find)
+
+    def get_find_snapshot(self):
+        """Снимок документа для фонового поиска"""
+        version, snapshot = self.find_snapshot
+        if version != self.text_version:
+            snapshot = self.document.snapshot()
+            self.find_snapshot = (self.text_version, snapshot)
+        return snapshot
+
+    def run_find(self):
+        """Запуск фонового поиска текущего запроса"""
+        self.find_job = None
+        query = self.find_var.get()
+        if not query:
+            self.find_worker.cancel()
+            self.find_state = None
+            self.highlighter.clear()
+            self.find_count_var.set("")
+            return
+
+        engine = SearchEngine(query, whole_word=self.find_word_var.get(),
+                              case_sensitive=self.find_case_var.get())
+        key = (query, engine.case_sensitive, engine.whole_word)
+        previous = self.find_state
+        if previous is not None and previous["key"] == key and \
+                previous["version"] == self.text_version:
+            return
+
+        # Запрос дополнен: проверяются только прежние совпадения
+        narrow = None
+        if previous is not None and previous["version"] == self.text_version and \
+                previous["key"][1:] == key[1:] and \
+                engine.fold(query).startswith(engine.fold(previous["key"][0])):
+            narrow = (previous["starts"], previous["until"])
+
+        snapshot = self.get_find_snapshot()
+        offset = self.text_widget.count('1.0', 'insert')
+        self.find_state = {
+            "key": key,
+            "version": self.text_version,
+            "text": None,  # строку снимка присылает поток поиска
+            "starts": array('q'),
+            "ends": array('q'),
+            "until": 0,
+            "done": False,
+            "shown": False,
+            "cursor": offset[0] if offset else 0,
+            "generation": self.find_worker.start(snapshot, engine, narrow)
+        }
+        if self.find_poll_job is None:
+            self.find_poll_job = self.master.after(50, self.poll_find)
+
+    def poll_find(self):
+        """Прием найденного фоновым поиском: подсветка появляется частями"""
+        self.find_poll_job = None
+        state = self.find_state
+        while True:
+            try:
+                message = self.find_worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if state is None or message[1] != state["generation"]:
+                continue
+            if message[0] == "done":
+                state["done"] = True
+                continue
+            if message[0] == "text":
+                state["text"] = message[2]
+                continue
+
+            _, _, starts, ends, until = message
+            state["starts"].extend(starts)
+            state["ends"].extend(ends)
+            state["until"] = max(state["until"], until)
+            if not state["shown"]:
+                # Первое совпадение - ближайшее после курсора
+                current = bisect_left(starts, state["cursor"])
+                self.highlighter.set_matches(state["text"], starts, ends,
+                                             current if current < len(starts) else 0)
+                state["shown"] = True
+            else:
+                self.highlighter.add_matches(starts, ends)
+
+        self.update_find_count()
+        if state is not None and not state["done"]:
+            self.find_poll_job = self.master.after(50, self.poll_find)
+
+    def update_find_count(self):
+        state = self.find_state
+        if state is None:
+            self.find_count_var.set("")
+            return
+        total = len(state["starts"])
+        position = self.highlighter.position()
+        if not total:
+            self.find_count_var.set("Нет совпадений" if state["done"] else "Поиск...")
+        elif position is not None:
+            self.find_count_var.set(f"{position[0]} из {total}" +
+                                    ("" if state["done"] else "+"))
+        else:
+            self.find_count_var.set(f"Совпадений: {total}")
+
+    def find_step(self, forward):
+        """Переход к следующему/предыдущему совпадению без повторного поиска"""
+        if self.find_job is not None:
+            self.master.after_cancel(self.find_job)
+            self.run_find()
+            return
+        self.highlighter.next() if forward else self.highlighter.previous()
+        self.update_find_count()
+
+    def undo(self):
+        """Отмена последнего шага правки"""
+        if self.loading is None:
+            self.move_cursor(self.undo_history.undo(self.document))
+        return "break"
+
+    def redo(self):
+        """Повтор отмененного шага"""
+        if self.loading is None:
+            self.move_cursor(self.undo_history.redo(self.document))
+        return "break"
+
+    def move_cursor(self, offset):
+        """Курсор на место отмененной/повторенной правки"""
+        if offset is not None:
+            index = "%d.%d" % self.document.index(offset)
+            self.text_widget.mark_set(tk.INSERT, index)
+            self.text_widget.see(index)
 
     def replace_text(self):
         """Замена текста"""
-        show_replace_dialog(self.master, self.text_widget)
+        show_replace_dialog(self.master, self.text_widget, self.document, self.doc_manager,
+                            self.on_documents_replaced, self.undo_history)
+
+    def on_documents_replaced(self, counts):
+        """Открытый документ изменился при замене во всех документах"""
+        if self.current_file not in counts:
+            return
+        if not self.is_modified:
+            self.reload_document(self.current_file)
+        else:
+            messagebox.showwarning(
+                "Замена во всех документах",
+                "Открытый документ изменен на диске, но в редакторе есть несохраненные "
+                "правки. При сохранении замены в нем будут потеряны.")
+
+    def search_documents(self):
+        """Полнотекстовый поиск по всем документам"""
+        show_search_documents_dialog(self.master, self.doc_manager, self.load_document_file)
 
     def change_font_size(self, delta):
         """Изменение размера шрифта"""
@@ -379,8 +946,7 @@ class MainWindow:
 
     def show_stats(self):
         """Показать статистику"""
-        text = self.text_widget.get('1.0', 'end-1c')
-        stats = self.text_analyzer.analyze_text(text)
+        stats = self.text_analyzer.analyze_chunks(self.document.snapshot().chunks())
 
         stats_text = f"""Статистика документа:
 
@@ -397,7 +963,47 @@ class MainWindow:
 
 Текущий документ: {os.path.basename(self.current_file) if self.current_file else 'Не сохранен'}
 """
-        messagebox.showinfo("Статистика документа", stats_text)
+        if messagebox.askyesno("Статистика документа", stats_text + "\nСохранить как отчет?"):
+            self.save_report(stats_text)
+
+    def save_report(self, report_text):
+        """Сохранение отчета в папку отчетов с записью в индекс"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if self.current_file and not self.is_new:
+            name = f"Отчет_{os.path.splitext(os.path.basename(self.current_file))[0]}_{timestamp}.txt"
+        else:
+            name = f"Отчет_{timestamp}.txt"
+        report_path = AppPaths.REPORTS_DIR / name
+
+        try:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write(report_text)
+            self.reports_index.add_report(
+                str(report_path), self.username,
+                description="Отчет создан на основе документа.",
+                source_doc=self.current_file if self.current_file and not self.is_new
+                else "unsaved")
+        except Exception as e:
+            print(f"Ошибка сохранения отчета: {e}")
+            messagebox.showerror("Ошибка", "Не удалось сохранить отчет")
+            return
+        self.save_note = f"Отчет сохранен: {name}"
+        self.update_status()
+
+    def show_reports(self):
+        """Список отчетов (администратор видит отчеты всех пользователей)"""
+        show_reports_dialog(self.master, self.reports_index,
+                            None if self.role == "admin" else self.username,
+                            self.open_report)
+
+    def open_report(self, report_path):
+        """Просмотр отчета (пути из старого индекса - относительно папки приложения)"""
+        path = Path(report_path)
+        if not path.is_absolute():
+            path = AppPaths.BASE_DIR / path
+        if not path.exists():
+            path = AppPaths.REPORTS_DIR / path.name
+        self.view_document(str(path))
 
     def show_about(self):
         """Показать информацию о программе"""
@@ -418,7 +1024,7 @@ class MainWindow:
 
     def on_closing(self):
         """Обработчик закрытия окна"""
-        if self.is_modified and self.text_widget.get('1.0', 'end-1c').strip():
+        if self.is_modified and self.has_text():
             response = messagebox.askyesnocancel(
                 "Сохранение",
                 "Документ был изменен. Сохранить изменения перед выходом?"
@@ -428,6 +1034,25 @@ class MainWindow:
             elif response:  # Yes
                 self.save_file()
 
+        self.cancel_loading()
+        self.find_worker.cancel()
+        self.undo_history.close()
+
+        # Дожидаемся фоновых сохранений
+        self.autosaver.close()
+        failed = False
+        while not self.autosaver.results.empty():
+            _, _, ok, explicit = self.autosaver.results.get()
+            failed = failed or (explicit and not ok)
+
+        if failed:
+            # Текст не потерян: он будет предложен при следующем запуске
+            self.recovery.write(self.document.text(),
+                                None if self.is_new else self.current_file)
+            messagebox.showerror("Ошибка", "Не удалось сохранить документ. Текст будет "
+                                           "предложен для восстановления при следующем запуске.")
+        self.recovery.close(keep=failed)
+
         # Завершаем сессию
         self.session_manager.end_session(self.session_id)
 
@@ -0,0 +1,111 @@
+"""
+Перехват изменений текстового поля
+"""
+import tkinter as tk
+from typing import Callable, List, Tuple
+
+
+def parse_index(index: str) -> Tuple[int, int]:
+    """'строка.столбец' -> (строка, столбец)"""
+    line, column = index.split('.')
+    return int(line), int(column)
+
+
+class TextChangeProxy:
+    """Посредник между tk.Text и его Tcl-командой
+
+    Команда виджета переименовывается, а на ее место ставится обработчик,
+    который пропускает все операции дальше и после каждой вставки или
+    удаления сообщает подписчикам, что изменилось:
+
+        ("insert", (строка, столбец), текст)
+        ("delete", (строка, столбец), (строка, столбец), удаленный текст)
+
+    Через тот же путь проходят вставка из буфера обмена и встроенные
+    undo/redo Tk, поэтому подписчики видят все правки.
+    """
+
+    def __init__(self, widget: tk.Text):
+        self.widget = widget
+        self.listeners: List[Callable[[tuple], None]] = []
+
+        self._orig = widget._w + "_orig"
+        widget.tk.call("rename", widget._w, self._orig)
+        widget.tk.createcommand(widget._w, self._dispatch)
+
+    def add_listener(self, callback: Callable[[tuple], None]):
+        """Подписка на изменения текста"""
+        self.listeners.append(callback)
+
+    def call(self, *args):
+        """Вызов исходной команды виджета (без уведомлений)"""
+        return self.widget.tk.call((self._orig,) + args)
+
+    def _index(self, index) -> str:
+        return str(self.call("index", index))
+
+    def _compare(self, index1, op: str, index2) -> bool:
+        return self.widget.tk.getboolean(self.call("compare", index1, op, index2))
+
+    def _notify(self, event: tuple):
+        for callback in self.listeners:
+            callback(event)
+
+    def _dispatch(self, operation, *args):
+        # Заблокированное поле Tk не меняет - и сообщать не о чем
+        if operation in ("insert", "delete", "replace") and \
+                str(self.call("cget", "-state")) == "disabled":
+            return self.call(operation, *args)
+
+        if operation == "insert" and len(args) >= 2:
+            return self._insert(args)
+        if operation == "delete" and args:
+            return self._delete(args)
+        if operation == "replace" and len(args) >= 3:
+            start = self._index(args[0])
+            self._delete((start, args[1]))
+            return self._insert((start,) + args[2:])
+        return self.call(operation, *args)
+
+    def _insert(self, args):
+        index = self._index(args[0])
+        # Вставка в "end" на деле происходит перед последним переводом строки
+        if index == self._index("end"):
+            index = self._index("end-1c")
+
+        result = self.call("insert", index, *args[1:])
+        text = "".join(args[1::2])
+        if text:
+            self._notify(("insert", parse_index(index), text))
+        return result
+
+    def _delete(self, args):
+        """Удаление одного или нескольких диапазонов (index1 index2 ...)
+
+        Как и Tk, все индексы вычисляются до удаления, пересекающиеся
+        диапазоны объединяются. Диапазоны удаляются с конца, поэтому
+        о каждом подписчики узнают в координатах текста на тот момент.
+        """
+        ranges = []
+        for i in range(0, len(args), 2):
+            start = self._index(args[i])
+            end = self._index(args[i + 1] if i + 1 < len(args) else f"{args[i]}+1c")
+            # Последний перевод строки Tk не удаляет
+            if self._compare(end, ">", "end-1c"):
+                end = self._index("end-1c")
+            if self._compare(start, "<", end):
+                ranges.append((parse_index(start), parse_index(end)))
+
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        for start, end in reversed(merged):
+            start_index, end_index = f"{start[0]}.{start[1]}", f"{end[0]}.{end[1]}"
+            deleted = str(self.call("get", start_index, end_index))
+            self.call("delete", start_index, end_index)
+            self._notify(("delete", start, end, deleted))
+        return ""
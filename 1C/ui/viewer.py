@@ -0,0 +1,290 @@
+"""
+Окно просмотра больших документов
+"""
+import os
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+import tkinter.font as tkfont
+
+from core.viewer import MappedDocument
+
+
+class DocumentViewer:
+    """Просмотр документа только для чтения
+
+    Документ отображается в память (MappedDocument), а в текстовое поле
+    попадают только видимые строки. Прокрутка, переход к строке и поиск
+    работают по отображенному файлу, поэтому открытие и память не
+    зависят от размера документа.
+    """
+
+    POLL_INTERVAL = 200
+
+    def __init__(self, parent, doc: MappedDocument):
+        self.doc = doc
+        self.top_line = 0
+        self.total_lines = self.doc.line_count()
+
+        # Поиск выполняется в отдельном потоке
+        self.search_thread = None
+        self.search_stop = threading.Event()
+        self.search_result = None
+        self.match = None  # (начало, конец) в байтах
+        self.match_line = None
+        # Совпадение дальше проиндексированной части: переход к нему
+        # откладывается, пока индекс строк до него не дойдет
+        self.match_pending = False
+        self.closed = False
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"Просмотр - {os.path.basename(doc.filepath)}")
+        self.window.geometry("900x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.create_widgets()
+        self.setup_bindings()
+
+        self.window.after(self.POLL_INTERVAL, self.poll_index)
+
+    def create_widgets(self):
+        """Создание элементов окна"""
+        toolbar = tk.Frame(self.window, bg='#e0e0e0')
+        toolbar.pack(fill=tk.X, padx=2, pady=2)
+
+        tk.Label(toolbar, text="Строка:", bg='#e0e0e0').pack(side=tk.LEFT, padx=(5, 2))
+        self.line_var = tk.StringVar()
+        line_entry = tk.Entry(toolbar, textvariable=self.line_var, width=10)
+        line_entry.pack(side=tk.LEFT)
+        line_entry.bind('<Return>', lambda e: self.goto_line())
+        tk.Button(toolbar, text="Перейти", command=self.goto_line).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(toolbar, text="Найти:", bg='#e0e0e0').pack(side=tk.LEFT, padx=(15, 2))
+        self.find_var = tk.StringVar()
+        find_entry = tk.Entry(toolbar, textvariable=self.find_var, width=30)
+        find_entry.pack(side=tk.LEFT)
+        find_entry.bind('<Return>', lambda e: self.find_next())
+        self.find_button = tk.Button(toolbar, text="Найти далее", command=self.find_next)
+        self.find_button.pack(side=tk.LEFT, padx=5)
+
+        self.case_var = tk.BooleanVar()
+        tk.Checkbutton(toolbar, text="Учитывать регистр", variable=self.case_var,
+                       bg='#e0e0e0').pack(side=tk.LEFT)
+
+        self.statusbar = tk.Label(self.window, bd=1, relief=tk.SUNKEN, anchor=tk.W,
+                                  bg='#e0e0e0', fg='#333333')
+        self.statusbar.pack(side=tk.BOTTOM, fill=tk.X)
+
+        text_frame = tk.Frame(self.window)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # Полоса прокрутки управляется вручную: в поле только видимые строки
+        self.scroll_y = ttk.Scrollbar(text_frame, command=self.on_scrollbar)
+        self.scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+
+        scroll_x = tk.Scrollbar(text_frame, orient=tk.HORIZONTAL)
+        scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.text = tk.Text(text_frame, wrap='none', bg='white', fg='black',
+                            padx=10, pady=10, xscrollcommand=scroll_x.set)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        scroll_x.config(command=self.text.xview)
+
+        self.text.tag_config('found', background='yellow', foreground='black')
+        self.font = tkfont.Font(font=self.text['font'])
+        self.text.config(state=tk.DISABLED)
+
+    def setup_bindings(self):
+        """Прокрутка колесом и клавишами"""
+        self.text.bind('<Configure>', lambda e: self.render())
+        self.text.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.text.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll(3))
+
+        for key, command in (('<Up>', lambda: self.scroll(-1)),
+                             ('<Down>', lambda: self.scroll(1)),
+                             ('<Prior>', lambda: self.scroll(-self.visible_rows())),
+                             ('<Next>', lambda: self.scroll(self.visible_rows())),
+                             ('<Control-Home>', lambda: self.scroll_to(0)),
+                             ('<Control-End>', lambda: self.scroll_to(self.total_lines))):
+            self.text.bind(key, lambda e, command=command: (command(), "break")[1])
+
+        self.text.focus_set()
+
+    # --- Отрисовка ---
+
+    def visible_rows(self) -> int:
+        height = self.text.winfo_height() - 2 * int(self.text['pady'])
+        return max(1, height // self.font.metrics('linespace'))
+
+    def scroll(self, delta: int):
+        self.scroll_to(self.top_line + delta)
+
+    def scroll_to(self, line: int):
+        """Прокрутка так, чтобы line была первой видимой строкой"""
+        rows = self.visible_rows()
+        line = min(line, self.total_lines - rows)
+
+        # Дальше проиндексированной части прокрутить пока нельзя
+        line = max(0, min(line, self.doc.indexed_lines - 1))
+
+        if line != self.top_line:
+            self.top_line = line
+            self.render()
+
+    def on_scrollbar(self, action, *args):
+        """Команда полосы прокрутки"""
+        if action == 'moveto':
+            self.scroll_to(int(float(args[0]) * self.total_lines))
+        elif action == 'scroll':
+            count, unit = int(args[0]), args[1]
+            self.scroll(count * (self.visible_rows() if unit == 'pages' else 1))
+
+    def render(self):
+        """Вывод видимых строк"""
+        rows = self.visible_rows()
+        lines = self.doc.lines(self.top_line, rows)
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', '\n'.join(lines))
+        self.highlight_match()
+        self.text.config(state=tk.DISABLED)
+
+        total = max(1, self.total_lines)
+        self.scroll_y.set(self.top_line / total, min(1.0, (self.top_line + rows) / total))
+        self.update_status()
+
+    def highlight_match(self):
+        """Подсветка найденного, если оно на экране"""
+        if self.match is None:
+            return
+
+        start, end = self.match
+        row = self.match_line - self.top_line
+        if not 0 <= row < self.visible_rows():
+            return
+
+        line_start = self.doc.line_offset(self.match_line)
+        if line_start is None:
+            return
+        column = len(self.doc.decode(line_start, start))
+        length = len(self.doc.decode(start, end))
+        self.text.tag_add('found', f"{row + 1}.{column}", f"{row + 1}.{column + length}")
+        self.text.see(f"{row + 1}.{column}")
+
+    def update_status(self):
+        status = f"Строка {self.top_line + 1} из "
+        if self.doc.complete:
+            status += f"{self.total_lines:,}"
+        else:
+            status += f"~{self.total_lines:,} | Индексация строк: {self.doc.progress:.0%}"
+        status += f" | Размер: {self.doc.size:,} байт"
+        if self.search_thread is not None:
+            status += " | Поиск..."
+        elif self.match_pending:
+            status += f" | Найдено в строке {self.match_line + 1:,}, ожидание индексации"
+        self.statusbar.config(text=status)
+
+    def poll_index(self):
+        """Обновление числа строк, пока строится индекс"""
+        if self.closed:
+            return
+        self.total_lines = self.doc.line_count()
+        if self.match_pending and self.match_line < self.doc.indexed_lines:
+            self.show_match()
+        else:
+            self.render()
+        if not self.doc.complete:
+            self.window.after(self.POLL_INTERVAL, self.poll_index)
+
+    # --- Навигация ---
+
+    def goto_line(self):
+        """Переход к строке (нумерация с 1)"""
+        try:
+            line = int(self.line_var.get()) - 1
+        except ValueError:
+            messagebox.showwarning("Переход", "Введите номер строки", parent=self.window)
+            return
+
+        if self.doc.line_offset(line) is None:
+            message = "Строки с таким номером нет" if self.doc.complete else \
+                "Индекс строк еще строится, эта строка пока недоступна"
+            messagebox.showinfo("Переход", message, parent=self.window)
+            return
+
+        self.scroll_to(line)
+
+    def find_next(self):
+        """Поиск следующего вхождения в фоне"""
+        query = self.find_var.get()
+        if not query or self.search_thread is not None:
+            return
+
+        if self.match is not None:
+            start = self.match[0] + 1
+        else:
+            start = self.doc.line_offset(self.top_line) or 0
+
+        self.search_stop.clear()
+        self.search_result = None
+        self.search_thread = threading.Thread(
+            target=self.run_search, args=(query, start, self.case_var.get()),
+            name="viewer-search", daemon=True)
+        self.search_thread.start()
+
+        self.find_button.config(state=tk.DISABLED)
+        self.update_status()
+        self.window.after(50, self.check_search)
+
+    def run_search(self, query, start, case_sensitive):
+        match = self.doc.search(query, start, case_sensitive, self.search_stop)
+        line = self.doc.line_of(match[0], self.search_stop) if match else None
+        if line is None:
+            match = None
+        self.search_result = (match, line)
+
+    def check_search(self):
+        """Ожидание результата поиска без блокировки окна"""
+        if self.closed:
+            return
+        if self.search_thread.is_alive():
+            self.window.after(50, self.check_search)
+            return
+
+        self.search_thread = None
+        self.find_button.config(state=tk.NORMAL)
+        match, line = self.search_result
+
+        if match is None:
+            self.match = None
+            self.match_pending = False
+            self.render()
+            messagebox.showinfo("Поиск", "Больше совпадений не найдено", parent=self.window)
+            return
+
+        self.match = match
+        self.match_line = line
+        if line < self.doc.indexed_lines:
+            self.show_match()
+        else:
+            # poll_index перейдет к совпадению, когда индекс до него дойдет
+            self.match_pending = True
+            self.render()
+
+    def show_match(self):
+        """Прокрутка к найденному (строка уже проиндексирована)"""
+        self.match_pending = False
+        self.top_line = max(0, min(self.match_line - self.visible_rows() // 3,
+                                   self.doc.indexed_lines - 1))
+        self.render()
+
+    def close(self):
+        """Закрытие окна и освобождение файла"""
+        self.closed = True
+        self.search_stop.set()
+        if self.search_thread is not None:
+            self.search_thread.join()
+        self.doc.close()
+        self.window.destroy()